@@ -0,0 +1,260 @@
+# async_main.py
+import time
+
+IMPORT_START_TIME = time.perf_counter()
+
+import asyncio
+import itertools
+import os
+
+from aiohttp import web
+
+from block.blockchain import OrphanBlockException
+from block.chain_state import ChainState
+from common.block_export import JSON
+from common.metrics import record_startup_phase, registry, startup_phase
+from node.chain_writer import ChainWriter
+from node.mem_pool import MEM_POOL_SIZE
+from node.network import Network
+from node.node import Node
+from node.node_service import INVALID_BLOCK_EXCEPTIONS, INVALID_TRANSACTION_EXCEPTIONS, NodeService
+from transaction.transaction_exception import TransactionException
+
+MY_HOST = "127.0.0.1"
+MY_PORT = 5000
+MINE_BLOCKS = os.environ.get("MINE_BLOCKS", "0") == "1"
+EXPORT_CHUNKS_PER_WRITE = 100
+
+routes = web.RouteTableDef()
+
+
+def get_node_service(request: web.Request) -> NodeService:
+    return request.app["node_service"]
+
+
+def get_chain_writer(request: web.Request) -> ChainWriter:
+    return request.app["chain_writer"]
+
+
+async def run_concurrently(function, *args):
+    """
+    Runs an operation that does not change the chain state or the mem pool on the default executor, concurrently
+    with the other requests and the writer.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+def take_chunks(chunks) -> list:
+    return list(itertools.islice(chunks, EXPORT_CHUNKS_PER_WRITE))
+
+
+async def get_json(request: web.Request) -> dict:
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body is not valid JSON")
+
+
+@routes.post("/block")
+async def validate_block(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        await get_chain_writer(request).submit(get_node_service(request).add_block, content["block"])
+    except OrphanBlockException as orphan_block_exception:
+        return web.Response(text=f'{orphan_block_exception}', status=202)
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+        return web.Response(text=f'{new_block_exception}', status=400)
+    return web.Response(text="Transaction success")
+
+
+@routes.post("/compact_block")
+async def validate_compact_block(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        missing_indexes = await get_chain_writer(request).submit(get_node_service(request).receive_compact_block,
+                                                                 content["compact_block"])
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+        return web.Response(text=f'{new_block_exception}', status=400)
+    return web.json_response({"missing_indexes": missing_indexes})
+
+
+@routes.post("/block_transactions")
+async def validate_block_transactions(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        await get_chain_writer(request).submit(get_node_service(request).receive_block_transactions,
+                                               content["block_hash"], content["transactions"])
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+        return web.Response(text=f'{new_block_exception}', status=400)
+    return web.Response(text="Transaction success")
+
+
+@routes.post("/transactions")
+async def validate_transaction(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        await get_chain_writer(request).submit(get_node_service(request).receive_transaction, content["transaction"])
+    except INVALID_TRANSACTION_EXCEPTIONS as transaction_exception:
+        return web.Response(text=f'{transaction_exception}', status=400)
+    return web.Response(text="Transaction success")
+
+
+@routes.post("/transactions/batch")
+async def validate_transactions(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        results = await get_chain_writer(request).submit(get_node_service(request).receive_transactions,
+                                                         content["transactions"])
+    except INVALID_TRANSACTION_EXCEPTIONS as transaction_exception:
+        return web.Response(text=f'{transaction_exception}', status=400)
+    return web.json_response({"results": results})
+
+
+@routes.post("/inv")
+async def receive_inventory(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    requested_inventory = await run_concurrently(get_node_service(request).receive_inventory, content["hostname"],
+                                                 content["inventory"])
+    return web.json_response({"inventory": requested_inventory})
+
+
+@routes.get("/block")
+async def get_blocks(request: web.Request) -> web.StreamResponse:
+    """
+    The blocks are encoded on the default executor, EXPORT_CHUNKS_PER_WRITE chunks at a time, while the event loop
+    writes the previous ones.
+    """
+    try:
+        chunks, content_type = await run_concurrently(get_node_service(request).export_blocks,
+                                                      request.query.get("format", JSON),
+                                                      request.query.get("from_height"),
+                                                      request.query.get("to_height"), request.query.get("limit"))
+    except ValueError as value_error:
+        return web.Response(text=f"{value_error}", status=400)
+    response = web.StreamResponse(headers={"Content-Type": content_type})
+    await response.prepare(request)
+    chunk_batch = await run_concurrently(take_chunks, chunks)
+    while chunk_batch:
+        await response.write(b"".join(chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                                      for chunk in chunk_batch))
+        chunk_batch = await run_concurrently(take_chunks, chunks)
+    await response.write_eof()
+    return response
+
+
+@routes.get("/block/{hash_or_height}")
+async def get_block(request: web.Request) -> web.Response:
+    hash_or_height = request.match_info["hash_or_height"]
+    block = await run_concurrently(get_node_service(request).get_block, hash_or_height)
+    if block is None:
+        return web.Response(text=f"Unknown block {hash_or_height}", status=404)
+    return web.json_response(block)
+
+
+@routes.get("/headers")
+async def get_headers(request: web.Request) -> web.Response:
+    return web.json_response(await run_concurrently(get_node_service(request).get_headers,
+                                                    request.query.get("from_height")))
+
+
+@routes.get("/utxo/{user}")
+async def get_user_utxos(request: web.Request) -> web.Response:
+    return web.json_response(await run_concurrently(get_node_service(request).get_user_utxos,
+                                                    request.match_info["user"]))
+
+
+@routes.get("/transactions/{transaction_hash}")
+async def get_transaction(request: web.Request) -> web.Response:
+    return web.json_response(await run_concurrently(get_node_service(request).get_transaction,
+                                                    request.match_info["transaction_hash"]))
+
+
+@routes.get("/metrics")
+async def get_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain")
+
+
+@routes.post("/new_node_advertisement")
+async def new_node_advertisement(request: web.Request) -> web.Response:
+    content = await get_json(request)
+    try:
+        get_node_service(request).add_node(content["hostname"])
+    except TransactionException as transaction_exception:
+        return web.Response(text=f'{transaction_exception}', status=400)
+    return web.Response(text="New node advertisement success")
+
+
+@routes.get("/known_node_request")
+async def known_node_request(request: web.Request) -> web.Response:
+    return web.json_response(get_node_service(request).get_known_nodes())
+
+
+@routes.get("/create_wallet")
+async def create_wallet(request: web.Request) -> web.Response:
+    from wallet.owner import Owner
+    owner = Owner()
+    public_key_hash = await run_concurrently(lambda: owner.public_key_hash)
+    return web.json_response({"public_key": public_key_hash})
+
+
+async def start_chain_writer(app: web.Application):
+    app["chain_writer"].start()
+
+
+async def stop_chain_writer(app: web.Application):
+    await app["chain_writer"].stop()
+
+
+async def start_mining_scheduler(app: web.Application):
+    from node.mining_scheduler import MiningScheduler
+    node_service = app["node_service"]
+    with startup_phase("mining_scheduler"):
+        app["mining_scheduler"] = MiningScheduler(node_service.chain_state, node_service.network,
+                                                  chain_writer=app["chain_writer"])
+        app["mining_scheduler"].start()
+
+
+async def stop_mining_scheduler(app: web.Application):
+    """
+    Runs on the default executor: a mined block being added waits for the writer, which needs the event loop.
+    """
+    await run_concurrently(app["mining_scheduler"].stop)
+
+
+def create_app(node_service: NodeService, mine_blocks: bool = False) -> web.Application:
+    """
+    The mining scheduler, if mine_blocks is set, submits its blocks to the chain writer of the application, so it is
+    started after it and stopped before it.
+    """
+    app = web.Application()
+    app["node_service"] = node_service
+    app["chain_writer"] = ChainWriter()
+    app.add_routes(routes)
+    app.on_startup.append(start_chain_writer)
+    if mine_blocks:
+        app.on_startup.append(start_mining_scheduler)
+        app.on_cleanup.append(stop_mining_scheduler)
+    app.on_cleanup.append(stop_chain_writer)
+    return app
+
+
+def main():
+    """
+    Same routes as main.py, served by aiohttp: requests are handled concurrently, and the changes of the chain state
+    and the mem pool go through the single writer task of the application.
+    """
+    record_startup_phase("imports", time.perf_counter() - IMPORT_START_TIME)
+    network = Network(Node(f"{MY_HOST}:{MY_PORT}"))
+    with startup_phase("chain_load"):
+        chain_state = ChainState()
+    with startup_phase("join_network"):
+        network.join_network(chain_state)
+    with startup_phase("chain_refresh"):
+        chain_state.refresh()
+    MEM_POOL_SIZE.set_function(lambda: len(chain_state.mem_pool))
+    record_startup_phase("total", time.perf_counter() - IMPORT_START_TIME)
+    web.run_app(create_app(NodeService(chain_state, network), MINE_BLOCKS), host=MY_HOST, port=MY_PORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import json
 
 from block.block_header import BlockHeader
+from common.serialization import encode_block, encode_transaction
 
 
 class Block:
@@ -13,6 +14,7 @@ class Block:
         self.block_header = block_header
         self.transactions = transactions
         self.previous_block = previous_block
+        self._serialized_transactions = None
 
     def __eq__(self, other):
         try:
@@ -35,6 +37,18 @@ class Block:
                            "hash": self.block_header.hash,
                            "transactions": self.transactions})
 
+    @property
+    def serialized_transactions(self) -> list:
+        """
+        Canonical encoding of each transaction, computed once: the transactions of a block do not change.
+        """
+        if self._serialized_transactions is None:
+            self._serialized_transactions = [encode_transaction(transaction) for transaction in self.transactions]
+        return self._serialized_transactions
+
+    def serialize(self) -> bytes:
+        return encode_block(self.block_header.serialize(), self.serialized_transactions)
+
     @property
     def to_dict(self):
         block_list = []
@@ -63,41 +77,9 @@ class Block:
 
     def get_transaction(self, transaction_hash: dict) -> dict:
         current_block = self
-        while current_block.previous_block:
+        while current_block:
             for transaction in current_block.transactions:
                 if transaction["transaction_hash"] == transaction_hash:
                     return transaction
             current_block = current_block.previous_block
         return {}
-
-    def get_user_utxos(self, user: str) -> dict:
-        return_dict = {
-            "user": user,
-            "total": 0,
-            "utxos": []
-        }
-        current_block = self
-        while current_block.previous_block:
-            for transaction in current_block.transactions:
-                print(transaction)
-                for output in transaction["outputs"]:
-                    locking_script = output["locking_script"]
-                    for element in locking_script.split(" "):
-                        if not element.startswith("OP") and element == user:
-                            return_dict["total"] = return_dict["total"] + output["amount"]
-                            return_dict["utxos"].append(
-                                {"amount": output["amount"], "transaction_hash": transaction["transaction_hash"]})
-            current_block = current_block.previous_block
-        return return_dict
-
-    def get_transaction_from_utxo(self, utxo_hash: str) -> dict:
-        current_block = self
-        while current_block:
-            for transaction in current_block.transactions:
-                if utxo_hash == transaction["transaction_hash"]:
-                    return transaction
-            current_block = current_block.previous_block
-
-    def get_locking_script_from_utxo(self, utxo_hash: str, utxo_index: int):
-        transaction_data = self.get_transaction_from_utxo(utxo_hash)
-        return transaction_data["outputs"][utxo_index]["locking_script"]
\ No newline at end of file
@@ -1,16 +1,43 @@
 import json
 
+from common.constants import NUMBER_OF_LEADING_ZEROS
+from common.serialization import NONCE, encode_block_header, encode_field
 from common.utils import calculate_hash
 
 
+def get_block_work() -> int:
+    """
+    Expected number of hashes needed to find a header meeting the difficulty target, which all blocks share.
+    """
+    return 16 ** NUMBER_OF_LEADING_ZEROS
+
+
 class BlockHeader:
     def __init__(self, previous_block_hash: str, timestamp: float, nonce: int, merkle_root: str):
         self.previous_block_hash = previous_block_hash
         self.merkle_root = merkle_root
         self.timestamp = timestamp
         self.nonce = nonce
+        self._serialized_prefix = None
+        self._serialized_prefix_fields = None
         self.hash = self.get_hash()
 
+    @classmethod
+    def from_block_store(cls, header_dict: dict, block_hash: str):
+        """
+        Header read back from the local block store, whose hash was computed when the block was stored. Headers
+        received from other nodes always go through the constructor, which computes the hash from the fields.
+        """
+        block_header = cls.__new__(cls)
+        block_header.previous_block_hash = header_dict["previous_block_hash"]
+        block_header.merkle_root = header_dict["merkle_root"]
+        block_header.timestamp = header_dict["timestamp"]
+        block_header.nonce = header_dict["nonce"]
+        block_header._serialized_prefix = None
+        block_header._serialized_prefix_fields = None
+        block_header.hash = block_hash if block_hash else block_header.get_hash()
+        return block_header
+
     def __eq__(self, other):
         try:
             assert self.previous_block_hash == other.previous_block_hash
@@ -22,12 +49,33 @@ class BlockHeader:
         except AssertionError:
             return False
 
+    def get_serialized_prefix(self) -> bytes:
+        """
+        Serialized header up to the nonce, which is the last field. Miners hash this once and only vary the suffix.
+        The bytes are cached until one of the fields they cover changes.
+        """
+        fields = (self.previous_block_hash, self.merkle_root, self.timestamp)
+        if fields != self._serialized_prefix_fields:
+            self._serialized_prefix = encode_block_header(self.to_dict)[:-NONCE.size]
+            self._serialized_prefix_fields = fields
+        return self._serialized_prefix
+
+    @staticmethod
+    def serialize_nonce(nonce: int) -> bytes:
+        return NONCE.pack(nonce)
+
+    def serialize(self) -> bytes:
+        return self.get_serialized_prefix() + encode_field(NONCE, self.nonce, "Nonce")
+
     def get_hash(self) -> str:
-        header_data = {"previous_block_hash": self.previous_block_hash,
-                       "merkle_root": self.merkle_root,
-                       "timestamp": self.timestamp,
-                       "nonce": self.nonce}
-        return calculate_hash(json.dumps(header_data))
+        return calculate_hash(self.serialize())
+
+    @property
+    def work(self) -> int:
+        return get_block_work()
+
+    def has_proof_of_work(self) -> bool:
+        return self.hash.startswith("0" * NUMBER_OF_LEADING_ZEROS)
 
     @property
     def to_dict(self) -> dict:
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+from block.block import Block
+
+MAX_ORPHAN_BLOCKS = 100
+
+
+class BlockTree:
+    """
+    Blocks known besides the main chain: side branches, whose parent is known, and orphans, whose parent is not known
+    yet. The cumulative work of every block of the main chain and of the side branches is kept by hash, so that the
+    heaviest tip can be found without walking the chain.
+    """
+
+    def __init__(self, max_orphan_blocks: int = MAX_ORPHAN_BLOCKS):
+        self.max_orphan_blocks = max_orphan_blocks
+        self.chain_work_by_hash = {}
+        self.side_blocks = {}
+        self.side_heights_by_hash = {}
+        self.orphans = OrderedDict()
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self.side_blocks or block_hash in self.orphans
+
+    def set_chain_work(self, block: Block):
+        previous_chain_work = self.chain_work_by_hash.get(block.block_header.previous_block_hash, 0)
+        self.chain_work_by_hash[block.block_header.hash] = previous_chain_work + block.block_header.work
+
+    def get_chain_work(self, block_hash: str) -> int:
+        return self.chain_work_by_hash.get(block_hash, 0)
+
+    def add_side_block(self, block: Block, height: int):
+        self.side_blocks[block.block_header.hash] = block
+        self.side_heights_by_hash[block.block_header.hash] = height
+        self.set_chain_work(block)
+
+    def remove_side_block(self, block_hash: str) -> Block:
+        self.side_heights_by_hash.pop(block_hash, None)
+        return self.side_blocks.pop(block_hash, None)
+
+    def prune(self, min_height: int):
+        """
+        Forgets the side blocks below min_height, which can no longer be part of a reorganization.
+        """
+        for block_hash, height in list(self.side_heights_by_hash.items()):
+            if height < min_height:
+                self.remove_side_block(block_hash)
+                self.chain_work_by_hash.pop(block_hash, None)
+
+    def add_orphan(self, block: Block):
+        self.orphans[block.block_header.hash] = block
+        while len(self.orphans) > self.max_orphan_blocks:
+            self.orphans.popitem(last=False)
+
+    def pop_orphans(self, previous_block_hash: str) -> list:
+        """
+        Removes and returns the orphans whose parent is the given block.
+        """
+        children = [block for block in self.orphans.values()
+                    if block.block_header.previous_block_hash == previous_block_hash]
+        for block in children:
+            del self.orphans[block.block_header.hash]
+        return children
@@ -1,9 +1,16 @@
 from block.block import Block
 from block.block_header import BlockHeader
-from common.constants import BLOCK_REWARD, NUMBER_OF_LEADING_ZEROS
-from common.io_blockchain import store_blockchain_in_memory
+from block.chain_state import ChainState
+from block.utxo_set import UTXOView, get_transaction_hash
+from common.constants import BLOCK_REWARD, MAX_BLOCK_SIZE, NUMBER_OF_LEADING_ZEROS
+from contract.script_cache import script_cache
+from contract.signature_verifier import SignatureVerifier, signature_verifier as default_signature_verifier
+from node.broadcaster import BLOCK
+from node.compact_block import create_compact_block
+from node.merkle_tree import MerkleTree
 from node.network import Network
 from node.node_transaction import NodeTransaction
+from transaction.transaction_exception import TransactionException
 
 
 class NewBlockException(Exception):
@@ -12,24 +19,63 @@ class NewBlockException(Exception):
         self.message = message
 
 
+class OrphanBlockException(NewBlockException):
+    pass
+
+
 class Blockchain:
-    def __init__(self, blockchain: Block, network: Network):
-        self.blockchain = blockchain
+    """
+    Receives a block for the chain state. A block extending the tip is fully validated and connected. A block
+    extending another known block only gets the checks that do not depend on the chain state and is kept in the block
+    tree; its transactions are validated if its branch becomes the main chain. A block whose parent is unknown is kept
+    as an orphan until the parent is added, once its proof of work and merkle root are checked.
+    """
+
+    def __init__(self, chain_state: ChainState, network: Network, signature_verifier: SignatureVerifier = None):
+        self.chain_state = chain_state
+        self.blockchain = chain_state.tip
+        self.utxo_set = chain_state.utxo_set
         self.network = network
+        self.signature_verifier = signature_verifier if signature_verifier else default_signature_verifier
         self.new_block = None
+        self.added_blocks = []
 
     def receive(self, new_block: dict):
         block_header = BlockHeader(**new_block["header"])
         self.new_block = Block(transactions=new_block["transactions"], block_header=block_header)
-        try:
-            assert self.blockchain.block_header.hash == self.new_block.block_header.previous_block_hash
-        except AssertionError:
-            print("Previous block provided is not the most recent block")
-            raise NewBlockException("", "Previous block provided is not the most recent block")
+        if self.chain_state.has_block(block_header.hash):
+            print("Block is already known")
+            raise NewBlockException(block_header.hash, "Block is already known")
+        if self.chain_state.get_known_block(block_header.previous_block_hash) is None:
+            self._validate_hash()
+            self._validate_size()
+            self._validate_merkle_root()
+            print("Previous block is unknown, keeping the block as an orphan")
+            self.chain_state.block_tree.add_orphan(self.new_block)
+            raise OrphanBlockException(block_header.previous_block_hash, "Previous block is unknown")
+
+    @property
+    def extends_tip(self) -> bool:
+        return self.new_block.block_header.previous_block_hash == self.blockchain.block_header.hash
 
     def validate(self):
         self._validate_hash()
-        self._validate_transactions()
+        self._validate_size()
+        self._validate_merkle_root()
+        if self.extends_tip:
+            self._validate_transactions()
+
+    def _validate_size(self):
+        block_size = sum(len(transaction_bytes) for transaction_bytes in self.new_block.serialized_transactions)
+        if block_size > MAX_BLOCK_SIZE:
+            print('Block size validation failed')
+            raise NewBlockException("", f"Block size {block_size} exceeds {MAX_BLOCK_SIZE} bytes")
+
+    def _validate_merkle_root(self):
+        merkle_root = MerkleTree(self.new_block.serialized_transactions).root.hex()
+        if merkle_root != self.new_block.block_header.merkle_root:
+            print('Merkle root validation failed')
+            raise NewBlockException("", "Merkle root does not match the block transactions")
 
     def _validate_hash(self):
         new_block_hash = self.new_block.block_header.get_hash()
@@ -41,32 +87,107 @@ class Blockchain:
             raise NewBlockException("", "Proof of work validation failed")
 
     def _validate_transactions(self):
-        input_amount = 0
-        output_amount = 0
+        """
+        Validates the transactions in block order against a view of the UTXO set that each of them updates, so that a
+        transaction can spend the outputs of an earlier one in the block, the way block templates order them, and an
+        output spent twice in the block is detected, as is a transaction that would replace unspent outputs.
+        """
+        transaction_fees = 0
+        coinbase_amount = 0
+        signature_checks = []
+        utxo_view = UTXOView(self.utxo_set)
         for transaction in self.new_block.transactions:
-            transaction_validation = NodeTransaction(self.blockchain, self.network)
+            spent_outpoint = utxo_view.get_spent_outpoint(transaction)
+            if spent_outpoint is not None:
+                print('Block double spend validation failed')
+                raise TransactionException(f"{spent_outpoint[0]}:{spent_outpoint[1]}",
+                                           "Output is spent twice in the block")
+            if utxo_view.has_unspent_outputs(transaction):
+                print('Block transaction hash validation failed')
+                raise TransactionException(get_transaction_hash(transaction),
+                                           "Transaction has the hash of one whose outputs are unspent")
+            transaction_validation = NodeTransaction(self.blockchain, self.network, utxo_view,
+                                                     mem_pool=self.chain_state.mem_pool)
             transaction_validation.receive(transaction=transaction)
-            transaction_validation.validate()
-            input_amount = input_amount + transaction_validation.get_total_amount_in_inputs()
-            output_amount = output_amount + transaction_validation.get_total_amount_in_outputs()
-        self._validate_funds(input_amount, output_amount)
+            transaction_validation.validate(signature_checks)
+            if transaction["inputs"]:
+                transaction_validation.validate_funds()
+                transaction_fees = transaction_fees + transaction_validation.get_fee()
+            else:
+                coinbase_amount = coinbase_amount + transaction_validation.get_total_amount_in_outputs()
+            utxo_view.add_transaction(transaction)
+        self._validate_signatures(signature_checks)
+        self._validate_coinbase_amount(transaction_fees, coinbase_amount)
+
+    def _validate_signatures(self, signature_checks: list):
+        results = self.signature_verifier.verify([signature_check for _, signature_check in signature_checks])
+        for (utxo, _), result in zip(signature_checks, results):
+            if result is False:
+                print('Transaction signature validation failed')
+                raise TransactionException(f"UTXO ({utxo})", "Transaction signature validation failed")
 
     @staticmethod
-    def _validate_funds(input_amount: float, output_amount: float):
-        assert input_amount + BLOCK_REWARD == output_amount
+    def _validate_coinbase_amount(transaction_fees: float, coinbase_amount: float):
+        """
+        The coinbase can claim the block reward and the fees of the block transactions, which block templates sum in
+        block order the same way.
+        """
+        if coinbase_amount > transaction_fees + BLOCK_REWARD:
+            print('Coinbase amount validation failed')
+            raise NewBlockException(f"coinbase ({coinbase_amount}), fees ({transaction_fees})",
+                                    "Coinbase pays more than the block reward and the transaction fees")
 
     def add(self):
-        self.new_block.previous_block = self.blockchain
-        store_blockchain_in_memory(self.new_block)
+        if self.extends_tip:
+            try:
+                self.chain_state.add_block(self.new_block)
+            except ValueError as value_error:
+                raise NewBlockException(self.new_block.block_header.hash, str(value_error))
+            self._remove_from_script_cache(self.new_block)
+        else:
+            try:
+                self.chain_state.add_side_block(self.new_block, self.validate_branch_block)
+            except ValueError as value_error:
+                raise NewBlockException(self.new_block.block_header.hash, str(value_error))
+        self.added_blocks.append(self.new_block)
+        self.add_orphans()
+
+    def validate_branch_block(self, block: Block):
+        """
+        Validates the transactions of a side branch block against the chain state, once the blocks before it are
+        connected during a reorganization.
+        """
+        blockchain = Blockchain(self.chain_state, self.network, self.signature_verifier)
+        blockchain.new_block = block
+        blockchain._validate_transactions()
+        self._remove_from_script_cache(block)
+
+    @staticmethod
+    def _remove_from_script_cache(block: Block):
+        script_cache.remove_transactions([get_transaction_hash(transaction) for transaction in block.transactions])
+
+    def add_orphans(self):
+        """
+        Adds the orphans waiting for the new block, and recursively the ones waiting for them.
+        """
+        for orphan in self.chain_state.block_tree.pop_orphans(self.new_block.block_header.hash):
+            blockchain = Blockchain(self.chain_state, self.network, self.signature_verifier)
+            blockchain.new_block = orphan
+            try:
+                blockchain.validate()
+                blockchain.add()
+            except (NewBlockException, TransactionException, AssertionError) as exception:
+                print(f"Orphan block {orphan.block_header.hash} is invalid: {exception}")
+                continue
+            self.added_blocks.extend(blockchain.added_blocks)
 
     def broadcast(self):
-        node_list = self.network.known_nodes
-        for node in node_list:
-            if node.hostname != self.network.node.hostname:
-                block_content = {
-                    "block": {
-                        "header": self.new_block.block_header.to_dict,
-                        "transactions": self.new_block.transactions
-                    }
+        for block in self.added_blocks:
+            block_content = {
+                "block": {
+                    "header": block.block_header.to_dict,
+                    "transactions": block.transactions
                 }
-                node.send_new_block(block_content)
+            }
+            block_content["compact_block"] = create_compact_block(block_content["block"], block.block_header.hash)
+            self.network.announce(BLOCK, block.block_header.hash, block_content)
@@ -0,0 +1,264 @@
+import threading
+import time
+
+from block.block import Block
+from block.block_tree import BlockTree
+from block.utxo_set import UTXOSet, get_transaction_hash
+from common.constants import MAX_REORG_DEPTH
+from common.io_blockchain import get_blockchain_from_memory, get_blockchain_store_signature, store_block_in_memory, \
+    truncate_blockchain_in_memory
+from common.io_transaction_index import TransactionIndex
+from common.io_utxo_set import get_utxo_set_from_memory, store_utxo_set_changes_in_memory
+from common.metrics import gauge, histogram
+from node.mem_pool import MemPool
+
+CHAIN_LOAD_SECONDS = histogram("node_chain_load_seconds", "Duration of the load of the chain from the block store.",
+                               buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+CHAIN_HEIGHT = gauge("node_chain_height", "Number of blocks of the main chain.")
+
+
+class ChainState:
+    """
+    Keeps the chain, its UTXO set and the mem pool resident in the node process. The chain is loaded once from the
+    block store and then updated in place by add_block. If the block store is modified by another process, refresh
+    reloads it.
+
+    Blocks that do not extend the tip are kept in a block tree. When a side branch gets more cumulative work than the
+    main chain, reorganize switches to it.
+    """
+
+    def __init__(self, mem_pool: MemPool = None):
+        self.lock = threading.RLock()
+        self.mem_pool = mem_pool if mem_pool is not None else MemPool()
+        self.blocks = []
+        self.heights_by_hash = {}
+        self.block_tree = BlockTree()
+        self.transaction_index = TransactionIndex()
+        self.utxo_set = None
+        self.store_signature = None
+        self.tip_listeners = []
+        self.load()
+
+    def load(self):
+        with self.lock:
+            start_time = time.perf_counter()
+            blockchain = get_blockchain_from_memory()
+            blocks = []
+            current_block = blockchain
+            while current_block:
+                blocks.append(current_block)
+                current_block = current_block.previous_block
+            blocks.reverse()
+            self.blocks = blocks
+            self.heights_by_hash = {block.block_header.hash: height for height, block in enumerate(blocks)}
+            self.block_tree = BlockTree()
+            for block in blocks:
+                self.block_tree.set_chain_work(block)
+            self.transaction_index.load(blocks)
+            self.utxo_set = get_utxo_set_from_memory(blockchain) if blockchain else UTXOSet()
+            self.store_signature = get_blockchain_store_signature()
+            CHAIN_LOAD_SECONDS.observe(time.perf_counter() - start_time)
+        self._notify_tip_listeners()
+
+    def add_tip_listener(self, listener):
+        """
+        Registers a callable invoked with the new tip whenever it changes.
+        """
+        self.tip_listeners.append(listener)
+
+    def _notify_tip_listeners(self):
+        CHAIN_HEIGHT.set(self.height)
+        for listener in self.tip_listeners:
+            listener(self.tip)
+
+    def invalidate(self):
+        with self.lock:
+            self.store_signature = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.store_signature != get_blockchain_store_signature()
+
+    def refresh(self):
+        """
+        The lock is only taken when the block store changed, so the readers do not wait for the writer otherwise.
+        """
+        if not self.is_stale:
+            return
+        with self.lock:
+            if self.is_stale:
+                self.load()
+
+    @property
+    def tip(self) -> Block:
+        return self.blocks[-1] if self.blocks else None
+
+    @property
+    def height(self) -> int:
+        return len(self.blocks)
+
+    @property
+    def chain_work(self) -> int:
+        return self.block_tree.get_chain_work(self.tip.block_header.hash) if self.blocks else 0
+
+    def get_block(self, height: int) -> Block:
+        return self.blocks[height]
+
+    def get_block_by_hash(self, block_hash: str) -> Block:
+        """
+        Returns the main chain block with the given hash, None if there is none. Safe without the lock: a block
+        disconnected meanwhile is not returned.
+        """
+        height = self.heights_by_hash.get(block_hash)
+        try:
+            block = self.blocks[height] if height is not None else None
+        except IndexError:
+            return None
+        return block if block is not None and block.block_header.hash == block_hash else None
+
+    def get_transaction(self, transaction_hash: str) -> dict:
+        """
+        Returns the main chain transaction with the given hash, None if there is none. Safe without the lock, like
+        get_block_by_hash.
+        """
+        position = self.transaction_index.get_position(transaction_hash)
+        if position is None:
+            return None
+        height, index = position
+        try:
+            transaction = self.blocks[height].transactions[index]
+        except IndexError:
+            return None
+        return transaction if get_transaction_hash(transaction) == transaction_hash else None
+
+    def has_block(self, block_hash: str) -> bool:
+        """
+        Orphans are not counted: an orphan is not validated against its parent yet, so the block announced with the
+        same hash is still fetched and received.
+        """
+        return block_hash in self.heights_by_hash or block_hash in self.block_tree.side_blocks
+
+    def get_known_block(self, block_hash: str) -> Block:
+        """
+        Returns the block of the main chain or of a side branch with the given hash, None if there is none.
+        """
+        height = self.heights_by_hash.get(block_hash)
+        if height is not None:
+            return self.blocks[height]
+        return self.block_tree.side_blocks.get(block_hash)
+
+    def get_known_block_height(self, block_hash: str) -> int:
+        height = self.heights_by_hash.get(block_hash)
+        return height if height is not None else self.block_tree.side_heights_by_hash[block_hash]
+
+    def add_block(self, block: Block):
+        with self.lock:
+            self._connect_block(block)
+            store_block_in_memory(block)
+            self.transaction_index.add_block(block, self.height - 1)
+            store_utxo_set_changes_in_memory(self.utxo_set)
+            self.store_signature = get_blockchain_store_signature()
+            self.mem_pool.remove_transactions(block.transactions)
+        self._notify_tip_listeners()
+
+    def _connect_block(self, block: Block):
+        """
+        The UTXO set is updated first: it raises ValueError without changing anything if the block spends an output
+        that is not unspent.
+        """
+        block.previous_block = self.tip
+        self.utxo_set.connect_block(block)
+        self.blocks.append(block)
+        self.heights_by_hash[block.block_header.hash] = len(self.blocks) - 1
+        self.block_tree.remove_side_block(block.block_header.hash)
+        self.block_tree.set_chain_work(block)
+        self.block_tree.prune(len(self.blocks) - MAX_REORG_DEPTH)
+
+    def _disconnect_tip(self) -> Block:
+        block = self.blocks.pop()
+        del self.heights_by_hash[block.block_header.hash]
+        self.utxo_set.disconnect_block(block)
+        self.block_tree.add_side_block(block, len(self.blocks))
+        return block
+
+    def add_side_block(self, block: Block, validate_block) -> bool:
+        """
+        Keeps a block whose parent is known but is not the tip. If its branch now has more work than the main chain,
+        the chain is reorganized onto it, validating the branch blocks with validate_block. Returns True if the tip
+        changed.
+        """
+        with self.lock:
+            parent_height = self.get_known_block_height(block.block_header.previous_block_hash)
+            block.previous_block = self.get_known_block(block.block_header.previous_block_hash)
+            self.block_tree.add_side_block(block, parent_height + 1)
+            if self.block_tree.get_chain_work(block.block_header.hash) <= self.chain_work:
+                return False
+            self.reorganize(block, validate_block)
+        return True
+
+    def reorganize(self, new_tip: Block, validate_block):
+        """
+        Disconnects the main chain blocks after the fork point and connects the branch ending at new_tip, then updates
+        the block store, the UTXO set and the mem pool. The transactions of the disconnected blocks that are not in the
+        branch go back to the mem pool. If a branch block is invalid, the previous chain is restored and the exception
+        of validate_block is raised.
+        """
+        with self.lock:
+            branch = []
+            current_block = new_tip
+            while current_block.block_header.hash not in self.heights_by_hash:
+                branch.append(current_block)
+                current_block = current_block.previous_block
+            branch.reverse()
+            fork_height = self.heights_by_hash[current_block.block_header.hash] + 1
+            if any(block.block_header.hash not in self.utxo_set.undo_data for block in self.blocks[fork_height:]):
+                raise ValueError(f"Cannot reorganize {self.height - fork_height} blocks deep: undo data is missing")
+            print(f"Reorganizing the chain from height {fork_height} to block {new_tip.block_header.hash}")
+            disconnected_blocks = [self._disconnect_tip() for _ in range(self.height - fork_height)]
+            disconnected_blocks.reverse()
+            connected_blocks = []
+            try:
+                for block in branch:
+                    validate_block(block)
+                    self._connect_block(block)
+                    connected_blocks.append(block)
+            except Exception:
+                print("Invalid block in the new branch, restoring the previous chain")
+                for _ in connected_blocks:
+                    self._disconnect_tip()
+                for block in branch[len(connected_blocks):]:
+                    self.block_tree.remove_side_block(block.block_header.hash)
+                for block in disconnected_blocks:
+                    self._connect_block(block)
+                raise
+            truncate_blockchain_in_memory(fork_height)
+            self.transaction_index.truncate(fork_height)
+            for height, block in enumerate(connected_blocks, start=fork_height):
+                store_block_in_memory(block)
+                self.transaction_index.add_block(block, height)
+            store_utxo_set_changes_in_memory(self.utxo_set)
+            self.store_signature = get_blockchain_store_signature()
+            for block in connected_blocks:
+                self.mem_pool.remove_transactions(block.transactions)
+            self._return_transactions_to_mem_pool(disconnected_blocks)
+        self._notify_tip_listeners()
+
+    def _return_transactions_to_mem_pool(self, disconnected_blocks: list):
+        """
+        Puts back the transactions of the disconnected blocks that are not coinbase transactions and whose inputs
+        are still unspent, either in the UTXO set or by an earlier returned transaction.
+        """
+        returned_outpoints = set()
+        transactions = []
+        for block in disconnected_blocks:
+            for transaction in block.transactions:
+                if not transaction["inputs"]:
+                    continue
+                if all(self.utxo_set.get_output(tx_input["transaction_hash"], tx_input["output_index"]) is not None
+                       or (tx_input["transaction_hash"], tx_input["output_index"]) in returned_outpoints
+                       for tx_input in transaction["inputs"]):
+                    transactions.append(transaction)
+                    transaction_hash = get_transaction_hash(transaction)
+                    returned_outpoints.update((transaction_hash, output_index)
+                                              for output_index in range(len(transaction["outputs"])))
+        self.mem_pool.add_transactions(transactions)
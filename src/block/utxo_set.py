@@ -0,0 +1,268 @@
+from block.block import Block
+from common.constants import MAX_REORG_DEPTH
+from common.serialization import get_transaction_id
+from transaction.transaction_output import is_data_output
+
+
+def get_transaction_hash(transaction: dict) -> str:
+    if transaction.get("transaction_hash"):
+        return transaction["transaction_hash"]
+    return get_transaction_id(transaction)
+
+
+def get_public_key_hash(locking_script: str) -> str:
+    for element in locking_script.split(" "):
+        if not element.startswith("OP"):
+            return element
+    return ""
+
+
+class UTXOSet:
+    """
+    Set of the unspent transaction outputs of the chain, keyed by (transaction_hash, output_index).
+    A secondary index maps the public key hash found in the locking script to the outpoints it can spend.
+
+    Data outputs are never spent and are not kept. A block cannot create outputs of a transaction that still has
+    unspent ones: they would replace them, and disconnecting the block would then delete them.
+
+    The set is updated incrementally with connect_block when a block is appended to the chain. The outputs spent by
+    each block are kept as undo data so that the last MAX_REORG_DEPTH blocks can be disconnected again on a reorg.
+    Every change is also recorded in pending_changes, as ["add", transaction_hash, output_index, output],
+    ["remove", transaction_hash, output_index] or ["undo", block_hash, block undo data or None], until
+    io_utxo_set persists them, journal_records counting the journal lines written since the last snapshot.
+    """
+
+    def __init__(self):
+        self.utxos = {}
+        self.outpoints_by_public_key_hash = {}
+        self.undo_data = {}
+        self.tip_hash = ""
+        self.pending_changes = []
+        self.journal_records = 0
+
+    def __len__(self) -> int:
+        return len(self.utxos)
+
+    def __contains__(self, outpoint: tuple) -> bool:
+        return outpoint in self.utxos
+
+    def get_output(self, transaction_hash: str, output_index: int) -> dict:
+        return self.utxos.get((transaction_hash, output_index))
+
+    def get_locking_script(self, transaction_hash: str, output_index: int) -> str:
+        return self.utxos[(transaction_hash, output_index)]["locking_script"]
+
+    def get_user_utxos(self, user: str) -> dict:
+        """
+        Safe while a block is connected or disconnected: the outpoints of the user are copied first and the ones spent
+        meanwhile are skipped.
+        """
+        return_dict = {
+            "user": user,
+            "total": 0,
+            "utxos": []
+        }
+        for transaction_hash, output_index in sorted(tuple(self.outpoints_by_public_key_hash.get(user, ()))):
+            output = self.utxos.get((transaction_hash, output_index))
+            if output is None:
+                continue
+            amount = output["amount"]
+            return_dict["total"] = return_dict["total"] + amount
+            return_dict["utxos"].append(
+                {"amount": amount, "transaction_hash": transaction_hash, "output_index": output_index})
+        return return_dict
+
+    def _add(self, outpoint: tuple, output: dict):
+        self.pending_changes.append(["add", outpoint[0], outpoint[1], output])
+        self.utxos[outpoint] = output
+        public_key_hash = get_public_key_hash(output["locking_script"])
+        self.outpoints_by_public_key_hash.setdefault(public_key_hash, set()).add(outpoint)
+
+    def _remove(self, outpoint: tuple) -> dict:
+        self.pending_changes.append(["remove", outpoint[0], outpoint[1]])
+        output = self.utxos.pop(outpoint)
+        public_key_hash = get_public_key_hash(output["locking_script"])
+        outpoints = self.outpoints_by_public_key_hash[public_key_hash]
+        outpoints.discard(outpoint)
+        if not outpoints:
+            del self.outpoints_by_public_key_hash[public_key_hash]
+        return output
+
+    def _set_undo_data(self, block_hash: str, block_undo_data: list):
+        self.pending_changes.append(["undo", block_hash, block_undo_data])
+        if block_undo_data is None:
+            self.undo_data.pop(block_hash, None)
+        else:
+            self.undo_data[block_hash] = block_undo_data
+
+    def _check_block(self, block: Block):
+        """
+        Raises ValueError if an input of the block spends an output that is neither unspent before the block nor
+        created by an earlier transaction of the block, or that another input of the block already spends, or if a
+        transaction of the block has the hash of one whose outputs are still unspent.
+        """
+        created_outpoints = set()
+        spent_outpoints = set()
+        for transaction in block.transactions:
+            for tx_input in transaction["inputs"]:
+                outpoint = (tx_input["transaction_hash"], tx_input["output_index"])
+                if outpoint in spent_outpoints or (outpoint not in self.utxos and outpoint not in created_outpoints):
+                    raise ValueError(f"Block {block.block_header.hash} spends {outpoint[0]}:{outpoint[1]}, "
+                                     f"which is not unspent")
+                spent_outpoints.add(outpoint)
+            transaction_hash = get_transaction_hash(transaction)
+            outpoints = {(transaction_hash, output_index) for output_index in range(len(transaction["outputs"]))}
+            if any((outpoint in self.utxos or outpoint in created_outpoints) and outpoint not in spent_outpoints
+                   for outpoint in outpoints):
+                raise ValueError(f"Block {block.block_header.hash} creates outputs of {transaction_hash}, "
+                                 f"which are still unspent")
+            created_outpoints.update(outpoints)
+
+    def connect_block(self, block: Block):
+        self._check_block(block)
+        block_undo_data = []
+        for transaction in block.transactions:
+            spent_outputs = []
+            for tx_input in transaction["inputs"]:
+                outpoint = (tx_input["transaction_hash"], tx_input["output_index"])
+                spent_outputs.append([list(outpoint), self._remove(outpoint)])
+            transaction_hash = get_transaction_hash(transaction)
+            for output_index, output in enumerate(transaction["outputs"]):
+                if not is_data_output(output):
+                    self._add((transaction_hash, output_index),
+                              {"amount": output["amount"], "locking_script": output["locking_script"]})
+            block_undo_data.append(spent_outputs)
+        self._set_undo_data(block.block_header.hash, block_undo_data)
+        self.tip_hash = block.block_header.hash
+        self._prune_undo_data(block)
+
+    def disconnect_block(self, block: Block):
+        block_hash = block.block_header.hash
+        if block_hash != self.tip_hash or block_hash not in self.undo_data:
+            raise ValueError(f"Cannot disconnect block {block_hash}: not the tip or undo data is missing")
+        block_undo_data = self.undo_data[block_hash]
+        self._set_undo_data(block_hash, None)
+        for transaction, spent_outputs in zip(reversed(block.transactions), reversed(block_undo_data)):
+            transaction_hash = get_transaction_hash(transaction)
+            for output_index in range(len(transaction["outputs"])):
+                if (transaction_hash, output_index) in self.utxos:
+                    self._remove((transaction_hash, output_index))
+            for outpoint, output in spent_outputs:
+                self._add(tuple(outpoint), output)
+        self.tip_hash = block.block_header.previous_block_hash
+
+    def _prune_undo_data(self, block: Block):
+        current_block = block
+        depth = 0
+        while current_block and depth < MAX_REORG_DEPTH:
+            current_block = current_block.previous_block
+            depth = depth + 1
+        if current_block and current_block.block_header.hash in self.undo_data:
+            self._set_undo_data(current_block.block_header.hash, None)
+
+    @classmethod
+    def from_blockchain(cls, blockchain: Block, stop_hash: str = ""):
+        utxo_set = cls()
+        utxo_set.connect_blocks(blockchain, stop_hash)
+        return utxo_set
+
+    def connect_blocks(self, blockchain: Block, stop_hash: str = ""):
+        blocks = []
+        current_block = blockchain
+        while current_block and current_block.block_header.hash != stop_hash:
+            blocks.append(current_block)
+            current_block = current_block.previous_block
+        for block in reversed(blocks):
+            self.connect_block(block)
+
+    @property
+    def to_dict(self) -> dict:
+        return {
+            "tip_hash": self.tip_hash,
+            "utxos": [[transaction_hash, output_index, output]
+                      for (transaction_hash, output_index), output in self.utxos.items()],
+            "undo_data": self.undo_data
+        }
+
+    @classmethod
+    def from_dict(cls, utxo_set_dict: dict):
+        utxo_set = cls()
+        for transaction_hash, output_index, output in utxo_set_dict["utxos"]:
+            utxo_set._add((transaction_hash, output_index), output)
+        utxo_set.undo_data = utxo_set_dict["undo_data"]
+        utxo_set.tip_hash = utxo_set_dict["tip_hash"]
+        utxo_set.pending_changes = []
+        return utxo_set
+
+    def apply_changes(self, tip_hash: str, changes: list):
+        """
+        Replays changes recorded in pending_changes by another UTXOSet, then sets the tip.
+        """
+        for change in changes:
+            if change[0] == "add":
+                self._add((change[1], change[2]), change[3])
+            elif change[0] == "remove":
+                self._remove((change[1], change[2]))
+            else:
+                self._set_undo_data(change[1], change[2])
+        self.tip_hash = tip_hash
+
+
+class UTXOView:
+    """
+    UTXO set as seen by transactions validated one after the other, e.g. the transactions of a block: the outputs of
+    the underlying set and of the transactions added so far, minus the outputs these transactions spend. A
+    transaction can thus spend an output of an earlier one, and no output can be spent twice.
+
+    If a mem pool is given, the outputs of its transactions are visible too, so that a transaction can spend the
+    output of a transaction still waiting to be mined. Double spends within the pool are checked by the pool itself.
+    """
+
+    def __init__(self, utxo_set: UTXOSet, mem_pool=None):
+        self.utxo_set = utxo_set
+        self.mem_pool = mem_pool
+        self.added_outputs = {}
+        self.spent_outpoints = set()
+
+    def get_output(self, transaction_hash: str, output_index: int) -> dict:
+        outpoint = (transaction_hash, output_index)
+        if outpoint in self.spent_outpoints:
+            return None
+        output = self.added_outputs.get(outpoint)
+        if output is None:
+            output = self.utxo_set.get_output(transaction_hash, output_index)
+        if output is None and self.mem_pool is not None:
+            output = self.mem_pool.get_output(transaction_hash, output_index)
+        return output
+
+    def get_locking_script(self, transaction_hash: str, output_index: int) -> str:
+        output = self.get_output(transaction_hash, output_index)
+        if output is None:
+            raise KeyError((transaction_hash, output_index))
+        return output["locking_script"]
+
+    def get_spent_outpoint(self, transaction: dict) -> tuple:
+        """
+        Returns the first outpoint the transaction spends that is already spent in the view or by another of its
+        inputs, None if there is none.
+        """
+        transaction_outpoints = set()
+        for tx_input in transaction["inputs"]:
+            outpoint = (tx_input["transaction_hash"], tx_input["output_index"])
+            if outpoint in self.spent_outpoints or outpoint in transaction_outpoints:
+                return outpoint
+            transaction_outpoints.add(outpoint)
+        return None
+
+    def has_unspent_outputs(self, transaction: dict) -> bool:
+        transaction_hash = get_transaction_hash(transaction)
+        return any(self.get_output(transaction_hash, output_index) is not None
+                   for output_index in range(len(transaction["outputs"])))
+
+    def add_transaction(self, transaction: dict):
+        for tx_input in transaction["inputs"]:
+            self.spent_outpoints.add((tx_input["transaction_hash"], tx_input["output_index"]))
+        transaction_hash = get_transaction_hash(transaction)
+        for output_index, output in enumerate(transaction["outputs"]):
+            if not is_data_output(output):
+                self.added_outputs[(transaction_hash, output_index)] = output
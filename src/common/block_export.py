@@ -0,0 +1,59 @@
+import json
+
+from common.io_blockchain import LENGTH_PREFIX
+from common.serialization import decode_block
+
+# Encoders of a sequence of blocks as a stream of chunks, one or two per block, so that a response can be sent while
+# it is produced instead of being built in memory first.
+JSON = "json"
+NDJSON = "ndjson"
+BINARY = "binary"
+CONTENT_TYPES = {JSON: "application/json", NDJSON: "application/x-ndjson", BINARY: "application/octet-stream"}
+
+
+def block_to_json(block) -> str:
+    return json.dumps({"header": block.block_header.to_dict, "transactions": block.transactions})
+
+
+def iterate_blocks_json(blocks):
+    """
+    A JSON list of the blocks.
+    """
+    yield "["
+    for index, block in enumerate(blocks):
+        yield ("," if index else "") + block_to_json(block)
+    yield "]"
+
+
+def iterate_blocks_ndjson(blocks):
+    """
+    One JSON block per line.
+    """
+    for block in blocks:
+        yield block_to_json(block) + "\n"
+
+
+def iterate_blocks_binary(blocks):
+    """
+    Length-prefixed canonical encoding of each block, as in the block store segment files.
+    """
+    for block in blocks:
+        data = block.serialize()
+        yield LENGTH_PREFIX.pack(len(data)) + data
+
+
+def decode_blocks_binary(data: bytes) -> list:
+    """
+    Block dicts of a binary export.
+    """
+    block_dicts = []
+    offset = 0
+    while offset < len(data):
+        (length,) = LENGTH_PREFIX.unpack_from(data, offset)
+        offset = offset + LENGTH_PREFIX.size
+        block_dicts.append(decode_block(data[offset:offset + length]))
+        offset = offset + length
+    return block_dicts
+
+
+EXPORT_FUNCTIONS = {JSON: iterate_blocks_json, NDJSON: iterate_blocks_ndjson, BINARY: iterate_blocks_binary}
@@ -1,3 +1,6 @@
 NUMBER_OF_LEADING_ZEROS = 3
 BLOCK_REWARD = 6.25
-KNOWN_NODES_FILE = 'src/doc/known_nodes.json'
\ No newline at end of file
+KNOWN_NODES_FILE = 'src/doc/known_nodes.json'
+MAX_REORG_DEPTH = 100
+MAX_BLOCK_SIZE = 1000000
+COINBASE_RESERVED_SIZE = 1000
@@ -1,30 +1,203 @@
 import json
+import os
+import struct
 
 from block.block import Block
 from block.block_header import BlockHeader
+from common.metrics import DISK_BYTES_WRITTEN
+from common.serialization import decode_block
 
-FILENAME = "src/doc/blockchain"
+# Blocks are appended to segment files as length-prefixed records. The index file holds one fixed-size record per
+# block (block hash, segment number, offset, length), so the record of the block at a given height lives at
+# height * INDEX_RECORD.size and adding a block never rewrites what is already stored.
+DIRECTORY = "src/doc/blocks"
+INDEX_FILENAME = f"{DIRECTORY}/index"
+LEGACY_FILENAME = "src/doc/blockchain"
+SEGMENT_MAX_SIZE = 16 * 1024 * 1024
+LENGTH_PREFIX = struct.Struct(">I")
+INDEX_RECORD = struct.Struct(">32sIQI")
+
+
+def get_segment_filename(segment: int) -> str:
+    return f"{DIRECTORY}/blk{segment:05d}.dat"
+
+
+def block_to_bytes(block: Block) -> bytes:
+    return block.serialize()
+
+
+def bytes_to_block(data: bytes, block_hash: str = None) -> Block:
+    block_dict = decode_block(data)
+    block_header = BlockHeader.from_block_store(block_dict.pop("header"), block_hash)
+    return Block(**block_dict, block_header=block_header)
+
+
+class BlockIndex:
+    def __init__(self):
+        self.entries = []
+        self.heights_by_hash = {}
+        self.file_size = -1
+
+    def refresh(self):
+        try:
+            file_size = os.path.getsize(INDEX_FILENAME)
+        except FileNotFoundError:
+            _migrate_legacy_blockchain_file()
+            file_size = os.path.getsize(INDEX_FILENAME)
+        if file_size == self.file_size:
+            return
+        self.entries = []
+        self.heights_by_hash = {}
+        if file_size:
+            with open(INDEX_FILENAME, "rb") as file_obj:
+                data = file_obj.read()
+            for record in INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD.size]):
+                self._add_entry(*record)
+        self.file_size = file_size
+
+    def _add_entry(self, raw_hash: bytes, segment: int, offset: int, length: int):
+        self.heights_by_hash[raw_hash.hex()] = len(self.entries)
+        self.entries.append((raw_hash.hex(), segment, offset, length))
+
+    def append(self, block_hash: str, segment: int, offset: int, length: int):
+        record = INDEX_RECORD.pack(bytes.fromhex(block_hash), segment, offset, length)
+        with open(INDEX_FILENAME, "ab") as file_obj:
+            file_obj.write(record)
+        DISK_BYTES_WRITTEN.inc(len(record), file="block_index")
+        self._add_entry(bytes.fromhex(block_hash), segment, offset, length)
+        self.file_size = self.file_size + INDEX_RECORD.size
+
+    def truncate(self, height: int):
+        with open(INDEX_FILENAME, "r+b") as file_obj:
+            file_obj.truncate(height * INDEX_RECORD.size)
+        for block_hash, _, _, _ in self.entries[height:]:
+            del self.heights_by_hash[block_hash]
+        del self.entries[height:]
+        self.file_size = height * INDEX_RECORD.size
+
+
+block_index = BlockIndex()
+
+
+def _read_record(segment: int, offset: int, length: int) -> bytes:
+    with open(get_segment_filename(segment), "rb") as file_obj:
+        file_obj.seek(offset + LENGTH_PREFIX.size)
+        return file_obj.read(length)
+
+
+def _migrate_legacy_blockchain_file():
+    os.makedirs(DIRECTORY, exist_ok=True)
+    open(INDEX_FILENAME, "ab").close()
+    if os.path.exists(LEGACY_FILENAME):
+        with open(LEGACY_FILENAME, "rb") as file_obj:
+            block_list = json.loads(file_obj.read())
+        store_blockchain_dict_in_memory(block_list)
+
+
+def get_blockchain_store_signature() -> tuple:
+    try:
+        stat = os.stat(INDEX_FILENAME)
+    except FileNotFoundError:
+        return ()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_blockchain_height() -> int:
+    block_index.refresh()
+    return len(block_index.entries)
+
+
+def get_block_hashes_from_memory() -> list:
+    block_index.refresh()
+    return [block_hash for block_hash, _, _, _ in block_index.entries]
+
+
+def get_block_from_memory(height: int) -> Block:
+    block_index.refresh()
+    block_hash, segment, offset, length = block_index.entries[height]
+    return bytes_to_block(_read_record(segment, offset, length), block_hash)
+
+
+def get_block_by_hash_from_memory(block_hash: str) -> Block:
+    block_index.refresh()
+    return get_block_from_memory(block_index.heights_by_hash[block_hash])
 
 
 def get_blockchain_from_memory():
-    with open(FILENAME, "r") as file_obj:
-        blocks_text = file_obj.read()
-        block_list = json.loads(blocks_text)
-        previous_block = None
-        for block_dict in reversed(block_list):
-            block_header_str = block_dict.pop("header")
-            block_header = BlockHeader(**block_header_str)
-            block_object = Block(**block_dict, block_header=block_header)
-            block_object.previous_block = previous_block
-            previous_block = block_object
+    block_index.refresh()
+    block_object = None
+    segment_file = None
+    current_segment = -1
+    try:
+        for block_hash, segment, offset, length in block_index.entries:
+            if segment != current_segment:
+                if segment_file:
+                    segment_file.close()
+                segment_file = open(get_segment_filename(segment), "rb")
+                current_segment = segment
+            segment_file.seek(offset + LENGTH_PREFIX.size)
+            new_block = bytes_to_block(segment_file.read(length), block_hash)
+            new_block.previous_block = block_object
+            block_object = new_block
+    finally:
+        if segment_file:
+            segment_file.close()
     return block_object
 
 
+def store_block_in_memory(block: Block):
+    os.makedirs(DIRECTORY, exist_ok=True)
+    block_index.refresh()
+    data = block_to_bytes(block)
+    if block_index.entries:
+        _, segment, offset, length = block_index.entries[-1]
+        offset = offset + LENGTH_PREFIX.size + length
+        if offset + LENGTH_PREFIX.size + len(data) > SEGMENT_MAX_SIZE:
+            segment, offset = segment + 1, 0
+    else:
+        segment, offset = 0, 0
+    with open(get_segment_filename(segment), "ab") as file_obj:
+        file_obj.truncate(offset)
+        file_obj.write(LENGTH_PREFIX.pack(len(data)) + data)
+    DISK_BYTES_WRITTEN.inc(LENGTH_PREFIX.size + len(data), file="blocks")
+    block_index.append(block.block_header.hash, segment, offset, len(data))
+
+
+def truncate_blockchain_in_memory(height: int):
+    block_index.refresh()
+    if height >= len(block_index.entries):
+        return
+    _, first_segment, first_offset, _ = block_index.entries[height]
+    last_segment = block_index.entries[-1][1]
+    block_index.truncate(height)
+    with open(get_segment_filename(first_segment), "r+b") as file_obj:
+        file_obj.truncate(first_offset)
+    for segment in range(first_segment + 1, last_segment + 1):
+        os.remove(get_segment_filename(segment))
+
+
 def store_blockchain_in_memory(blockchain: Block):
-    store_blockchain_dict_in_memory(blockchain.to_dict)
+    """
+    Appends the blocks of the given chain that are not stored yet. If the chain forks from the stored one, the stored
+    blocks after the fork point are dropped first.
+    """
+    block_index.refresh()
+    new_blocks = []
+    current_block = blockchain
+    while current_block and current_block.block_header.hash not in block_index.heights_by_hash:
+        new_blocks.append(current_block)
+        current_block = current_block.previous_block
+    fork_height = block_index.heights_by_hash[current_block.block_header.hash] + 1 if current_block else 0
+    truncate_blockchain_in_memory(fork_height)
+    for block in reversed(new_blocks):
+        store_block_in_memory(block)
 
 
 def store_blockchain_dict_in_memory(blockchain_list: list):
-    text = json.dumps(blockchain_list).encode("utf-8")
-    with open(FILENAME, "wb") as file_obj:
-        file_obj.write(text)
\ No newline at end of file
+    previous_block = None
+    for block_dict in reversed(blockchain_list):
+        block_object = Block(transactions=block_dict["transactions"],
+                             block_header=BlockHeader(**block_dict["header"]))
+        block_object.previous_block = previous_block
+        previous_block = block_object
+    store_blockchain_in_memory(previous_block)
@@ -1,17 +1,56 @@
 import json
+import os
+
+from common.metrics import DISK_BYTES_WRITTEN
 
 
 FILENAME = "src/doc/mem_pool"
+JOURNAL_FILENAME = "src/doc/mem_pool.journal"
 
 
 def get_transactions_from_memory():
-    with open(FILENAME, "rb") as file_obj:
-        current_mem_pool_str = file_obj.read()
-        current_mem_pool_list = json.loads(current_mem_pool_str)
+    try:
+        with open(FILENAME, "rb") as file_obj:
+            current_mem_pool_str = file_obj.read()
+            current_mem_pool_list = json.loads(current_mem_pool_str)
+    except FileNotFoundError:
+        return []
     return current_mem_pool_list
 
 
-def store_transactions_in_memory(transactions: list):
-    text = json.dumps(transactions).encode("utf-8")
-    with open(FILENAME, "wb") as file_obj:
-        file_obj.write(text)
\ No newline at end of file
+def get_mem_pool_journal_from_memory() -> list:
+    """
+    The mem pool journal holds one JSON record per line: {"add": transaction} or {"remove": [transaction hashes]}.
+    A partially written last line is ignored.
+    """
+    records = []
+    try:
+        with open(JOURNAL_FILENAME, "rb") as file_obj:
+            for line in file_obj:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        return records
+    return records
+
+
+def append_to_mem_pool_journal_in_memory(records: list):
+    text = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+    with open(JOURNAL_FILENAME, "ab") as file_obj:
+        file_obj.write(text)
+    DISK_BYTES_WRITTEN.inc(len(text), file="mem_pool_journal")
+
+
+def store_mem_pool_journal_in_memory(records: list):
+    temporary_filename = f"{JOURNAL_FILENAME}.tmp"
+    text = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+    with open(temporary_filename, "wb") as file_obj:
+        file_obj.write(text)
+    os.replace(temporary_filename, JOURNAL_FILENAME)
+    DISK_BYTES_WRITTEN.inc(len(text), file="mem_pool_journal")
+
+
+def mem_pool_journal_exists() -> bool:
+    return os.path.exists(JOURNAL_FILENAME)
@@ -0,0 +1,90 @@
+import bisect
+import os
+import struct
+
+from block.block import Block
+from block.utxo_set import get_transaction_hash
+from common.metrics import DISK_BYTES_WRITTEN
+
+# One fixed-size record per transaction of the main chain (transaction hash, block height, position in the block),
+# appended in height order, so the records of the blocks from a given height on are a suffix of the file.
+FILENAME = "src/doc/transaction_index"
+INDEX_RECORD = struct.Struct(">32sII")
+
+
+class TransactionIndex:
+    """
+    Position (block height, index in the block) of every transaction of the main chain by transaction hash. It is
+    updated together with the block store: add_block after a block is stored, truncate when the store is truncated.
+    """
+
+    def __init__(self):
+        self.positions_by_hash = {}
+        self.heights = []
+
+    def __len__(self) -> int:
+        return len(self.heights)
+
+    def get_position(self, transaction_hash: str) -> (int, int):
+        return self.positions_by_hash.get(transaction_hash)
+
+    def load(self, blocks: list):
+        """
+        Reads the index file, and rebuilds it from the given main chain blocks if it does not match them.
+        """
+        self.positions_by_hash = {}
+        self.heights = []
+        try:
+            with open(FILENAME, "rb") as file_obj:
+                data = file_obj.read()
+        except FileNotFoundError:
+            data = b""
+        for raw_hash, height, position in INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD.size]):
+            self._add_entry(raw_hash.hex(), height, position)
+        if not self._matches(blocks):
+            print("Rebuilding the transaction index")
+            self.rebuild(blocks)
+
+    def _matches(self, blocks: list) -> bool:
+        if len(self.heights) != sum(len(block.transactions) for block in blocks):
+            return False
+        for height in range(len(blocks) - 1, -1, -1):
+            if blocks[height].transactions:
+                position = len(blocks[height].transactions) - 1
+                transaction_hash = get_transaction_hash(blocks[height].transactions[position])
+                return self.get_position(transaction_hash) == (height, position)
+        return True
+
+    def rebuild(self, blocks: list):
+        self.positions_by_hash = {}
+        self.heights = []
+        os.makedirs(os.path.dirname(FILENAME), exist_ok=True)
+        open(FILENAME, "wb").close()
+        for height, block in enumerate(blocks):
+            self.add_block(block, height)
+
+    def _add_entry(self, transaction_hash: str, height: int, position: int):
+        self.positions_by_hash[transaction_hash] = (height, position)
+        self.heights.append(height)
+
+    def add_block(self, block: Block, height: int):
+        records = []
+        for position, transaction in enumerate(block.transactions):
+            transaction_hash = get_transaction_hash(transaction)
+            records.append(INDEX_RECORD.pack(bytes.fromhex(transaction_hash), height, position))
+            self._add_entry(transaction_hash, height, position)
+        data = b"".join(records)
+        with open(FILENAME, "ab") as file_obj:
+            file_obj.write(data)
+        DISK_BYTES_WRITTEN.inc(len(data), file="transaction_index")
+
+    def truncate(self, height: int):
+        """
+        Drops the transactions of the blocks from the given height on.
+        """
+        number_of_records = bisect.bisect_left(self.heights, height)
+        self.positions_by_hash = {transaction_hash: position for transaction_hash, position
+                                  in self.positions_by_hash.items() if position[0] < height}
+        del self.heights[number_of_records:]
+        with open(FILENAME, "ab") as file_obj:
+            file_obj.truncate(number_of_records * INDEX_RECORD.size)
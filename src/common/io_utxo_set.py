@@ -0,0 +1,95 @@
+import json
+import os
+
+from block.block import Block
+from block.utxo_set import UTXOSet
+from common.metrics import DISK_BYTES_WRITTEN
+
+# The UTXO set is stored as a snapshot plus a journal of the changes made since. Each journal line holds the changes
+# of one update of the chain, {"tip_hash": ..., "changes": [...]}, so connecting a block writes the outputs it
+# creates and spends rather than the whole set. The snapshot is rewritten once the journal holds
+# JOURNAL_COMPACTION_RECORDS lines.
+FILENAME = "src/doc/utxo_set"
+JOURNAL_COMPACTION_RECORDS = 1000
+
+
+def get_journal_filename() -> str:
+    return f"{FILENAME}.journal"
+
+
+def get_utxo_set_from_memory(blockchain: Block) -> UTXOSet:
+    utxo_set = _read_utxo_set()
+    if utxo_set and utxo_set.tip_hash == blockchain.block_header.hash:
+        return utxo_set
+    if utxo_set and _is_in_chain(blockchain, utxo_set.tip_hash):
+        utxo_set.connect_blocks(blockchain, stop_hash=utxo_set.tip_hash)
+    else:
+        utxo_set = UTXOSet.from_blockchain(blockchain)
+    store_utxo_set_in_memory(utxo_set)
+    return utxo_set
+
+
+def _read_utxo_set() -> UTXOSet:
+    """
+    Reads the snapshot and replays the journal lines after it. A partially written last line is ignored.
+    """
+    try:
+        with open(FILENAME, "rb") as file_obj:
+            utxo_set = UTXOSet.from_dict(json.loads(file_obj.read()))
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    try:
+        with open(get_journal_filename(), "rb") as file_obj:
+            for line in file_obj:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                utxo_set.apply_changes(record["tip_hash"], record["changes"])
+                utxo_set.journal_records = utxo_set.journal_records + 1
+    except FileNotFoundError:
+        pass
+    except (KeyError, IndexError, TypeError):
+        return None
+    utxo_set.pending_changes = []
+    return utxo_set
+
+
+def _is_in_chain(blockchain: Block, block_hash: str) -> bool:
+    current_block = blockchain
+    while current_block:
+        if current_block.block_header.hash == block_hash:
+            return True
+        current_block = current_block.previous_block
+    return False
+
+
+def store_utxo_set_in_memory(utxo_set: UTXOSet):
+    """
+    Rewrites the snapshot of the whole set and empties the journal.
+    """
+    temporary_filename = f"{FILENAME}.tmp"
+    text = json.dumps(utxo_set.to_dict).encode("utf-8")
+    with open(temporary_filename, "wb") as file_obj:
+        file_obj.write(text)
+    os.replace(temporary_filename, FILENAME)
+    open(get_journal_filename(), "wb").close()
+    utxo_set.pending_changes = []
+    utxo_set.journal_records = 0
+    DISK_BYTES_WRITTEN.inc(len(text), file="utxo_set")
+
+
+def store_utxo_set_changes_in_memory(utxo_set: UTXOSet):
+    """
+    Appends the changes made to the set since it was last stored to the journal, or compacts the journal into a new
+    snapshot once it is long enough.
+    """
+    if utxo_set.journal_records >= JOURNAL_COMPACTION_RECORDS or not os.path.exists(FILENAME):
+        store_utxo_set_in_memory(utxo_set)
+        return
+    text = (json.dumps({"tip_hash": utxo_set.tip_hash, "changes": utxo_set.pending_changes}) + "\n").encode("utf-8")
+    with open(get_journal_filename(), "ab") as file_obj:
+        file_obj.write(text)
+    utxo_set.pending_changes = []
+    utxo_set.journal_records = utxo_set.journal_records + 1
+    DISK_BYTES_WRITTEN.inc(len(text), file="utxo_set_journal")
@@ -0,0 +1,215 @@
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Counters, gauges and histograms of the node, rendered in the Prometheus text exposition format by GET /metrics.
+# Each metric is created once at module level next to the code it measures; label values are given as keyword
+# arguments when updating it.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+
+    def _get_label_values(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        return lines + self._render_samples()
+
+    @abc.abstractmethod
+    def _render_samples(self) -> list:
+        pass
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        super().__init__(name, documentation, label_names)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        label_values = self._get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._get_label_values(labels), 0)
+
+    def _render_samples(self) -> list:
+        with self.lock:
+            values = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+                for label_values, value in values]
+
+
+class Gauge(Metric):
+    """
+    A value set by the code, or read from a callable when the metrics are rendered if set_function was called.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        super().__init__(name, documentation, label_names)
+        self.values = {}
+        self.function = None
+
+    def set(self, value: float, **labels):
+        label_values = self._get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self, **labels) -> float:
+        if self.function is not None:
+            return self.function()
+        return self.values.get(self._get_label_values(labels), 0)
+
+    def _render_samples(self) -> list:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        with self.lock:
+            values = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+                for label_values, value in values]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = {}
+        self.sums = {}
+
+    def observe(self, value: float, **labels):
+        label_values = self._get_label_values(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            bucket_counts = self.bucket_counts.get(label_values)
+            if bucket_counts is None:
+                bucket_counts = [0] * (len(self.buckets) + 1)
+                self.bucket_counts[label_values] = bucket_counts
+            bucket_counts[bucket_index] = bucket_counts[bucket_index] + 1
+            self.sums[label_values] = self.sums.get(label_values, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the with block in seconds.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def get_count(self, **labels) -> int:
+        return sum(self.bucket_counts.get(self._get_label_values(labels), ()))
+
+    def _render_samples(self) -> list:
+        with self.lock:
+            series = [(label_values, list(bucket_counts), self.sums[label_values])
+                      for label_values, bucket_counts in self.bucket_counts.items()]
+        lines = []
+        for label_values, bucket_counts, total in series:
+            cumulative_count = 0
+            for upper_bound, count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative_count = cumulative_count + count
+                le_label = f'le="{_format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, le_label)} "
+                             f"{cumulative_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {cumulative_count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, documentation: str, label_names: tuple, **kwargs) -> Metric:
+        """
+        Returns the metric already registered under the name if it has the same type and labels, so a module imported
+        twice gets the same metric. Raises ValueError when the name is declared again with another type or labels.
+        """
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, label_names, **kwargs)
+                self.metrics[name] = metric
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise ValueError(f"{name} is already registered as a {metric.metric_type} with the labels "
+                                 f"{metric.label_names}")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+
+DISK_BYTES_WRITTEN = counter("node_disk_bytes_written_total", "Bytes written to the node files.", ("file",))
+STARTUP_PHASE_SECONDS = gauge("node_startup_phase_seconds", "Duration of each phase of the node startup.", ("phase",))
+
+
+def record_startup_phase(phase: str, elapsed: float):
+    STARTUP_PHASE_SECONDS.set(elapsed, phase=phase)
+    print(f"Startup phase {phase}: {elapsed:.3f}s")
+
+
+@contextmanager
+def startup_phase(phase: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup_phase(phase, time.perf_counter() - start_time)
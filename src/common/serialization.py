@@ -0,0 +1,181 @@
+"""
+Canonical binary encoding of transactions, block headers and blocks. Hashes and signatures are computed over these
+bytes instead of JSON text, so that they do not depend on key order or whitespace.
+
+- variable length fields (hashes, scripts, lists) are prefixed with their length as a compact size integer
+- hashes are stored as the raw bytes of their hex string
+- amounts and timestamps are 8 byte IEEE 754 doubles, output indexes 4 byte and nonces 8 byte unsigned integers,
+  all big endian
+- the nonce is the last field of a header, so miners can hash the rest once
+"""
+
+import hashlib
+import struct
+
+AMOUNT = struct.Struct(">d")
+OUTPUT_INDEX = struct.Struct(">I")
+TIMESTAMP = struct.Struct(">d")
+NONCE = struct.Struct(">Q")
+
+
+class SerializationException(Exception):
+    def __init__(self, expression, message):
+        self.expression = expression
+        self.message = message
+
+
+def encode_field(field: struct.Struct, value, name: str) -> bytes:
+    try:
+        return field.pack(value)
+    except struct.error:
+        raise SerializationException(value, f"{name} cannot be encoded as {field.format}")
+
+
+def encode_compact_size(value: int) -> bytes:
+    if value < 0xfd:
+        return bytes([value])
+    if value <= 0xffff:
+        return b"\xfd" + struct.pack(">H", value)
+    if value <= 0xffffffff:
+        return b"\xfe" + struct.pack(">I", value)
+    return b"\xff" + struct.pack(">Q", value)
+
+
+def decode_compact_size(data: bytes, offset: int) -> (int, int):
+    prefix = data[offset]
+    if prefix < 0xfd:
+        return prefix, offset + 1
+    if prefix == 0xfd:
+        return struct.unpack_from(">H", data, offset + 1)[0], offset + 3
+    if prefix == 0xfe:
+        return struct.unpack_from(">I", data, offset + 1)[0], offset + 5
+    return struct.unpack_from(">Q", data, offset + 1)[0], offset + 9
+
+
+def encode_bytes(value: bytes) -> bytes:
+    return encode_compact_size(len(value)) + value
+
+
+def decode_bytes(data: bytes, offset: int) -> (bytes, int):
+    length, offset = decode_compact_size(data, offset)
+    if offset + length > len(data):
+        raise SerializationException(offset, "Field length exceeds the data length")
+    return data[offset:offset + length], offset + length
+
+
+def encode_hash(value: str) -> bytes:
+    try:
+        return encode_bytes(bytes.fromhex(value))
+    except (ValueError, TypeError):
+        raise SerializationException(value, "Hash is not a hex string")
+
+
+def decode_hash(data: bytes, offset: int) -> (str, int):
+    value, offset = decode_bytes(data, offset)
+    return value.hex(), offset
+
+
+def encode_string(value: str) -> bytes:
+    try:
+        return encode_bytes(value.encode("utf-8"))
+    except AttributeError:
+        raise SerializationException(value, "Script is not a string")
+
+
+def decode_string(data: bytes, offset: int) -> (str, int):
+    value, offset = decode_bytes(data, offset)
+    return value.decode("utf-8"), offset
+
+
+def encode_transaction_input(tx_input: dict, with_unlocking_script: bool = True) -> bytes:
+    data = (encode_hash(tx_input["transaction_hash"])
+            + encode_field(OUTPUT_INDEX, tx_input["output_index"], "Output index"))
+    if with_unlocking_script:
+        data = data + encode_string(tx_input.get("unlocking_script", ""))
+    return data
+
+
+def decode_transaction_input(data: bytes, offset: int) -> (dict, int):
+    transaction_hash, offset = decode_hash(data, offset)
+    output_index = OUTPUT_INDEX.unpack_from(data, offset)[0]
+    unlocking_script, offset = decode_string(data, offset + OUTPUT_INDEX.size)
+    return {"transaction_hash": transaction_hash,
+            "output_index": output_index,
+            "unlocking_script": unlocking_script}, offset
+
+
+def encode_transaction_output(tx_output: dict) -> bytes:
+    return encode_field(AMOUNT, tx_output["amount"], "Amount") + encode_string(tx_output["locking_script"])
+
+
+def decode_transaction_output(data: bytes, offset: int) -> (dict, int):
+    amount = AMOUNT.unpack_from(data, offset)[0]
+    locking_script, offset = decode_string(data, offset + AMOUNT.size)
+    return {"amount": amount, "locking_script": locking_script}, offset
+
+
+def encode_transaction(transaction: dict, with_unlocking_scripts: bool = True) -> bytes:
+    """
+    The transaction hash is not part of the encoding: it is derived from the encoding without unlocking scripts.
+    """
+    parts = [encode_compact_size(len(transaction["inputs"]))]
+    parts.extend(encode_transaction_input(tx_input, with_unlocking_scripts) for tx_input in transaction["inputs"])
+    parts.append(encode_compact_size(len(transaction["outputs"])))
+    parts.extend(encode_transaction_output(tx_output) for tx_output in transaction["outputs"])
+    return b"".join(parts)
+
+
+def decode_transaction(data: bytes, offset: int = 0) -> (dict, int):
+    start = offset
+    number_of_inputs, offset = decode_compact_size(data, offset)
+    inputs = []
+    for _ in range(number_of_inputs):
+        tx_input, offset = decode_transaction_input(data, offset)
+        inputs.append(tx_input)
+    number_of_outputs, offset = decode_compact_size(data, offset)
+    outputs = []
+    for _ in range(number_of_outputs):
+        tx_output, offset = decode_transaction_output(data, offset)
+        outputs.append(tx_output)
+    transaction = {"inputs": inputs, "outputs": outputs}
+    transaction["transaction_hash"] = get_transaction_id(transaction) if data[start:offset] else ""
+    return transaction, offset
+
+
+def get_transaction_id(transaction: dict) -> str:
+    """
+    Hash of the transaction without its unlocking scripts, i.e. of the data signed by the owner of the inputs.
+    """
+    return hashlib.sha256(encode_transaction(transaction, with_unlocking_scripts=False)).hexdigest()
+
+
+def encode_block_header(block_header: dict) -> bytes:
+    return (encode_hash(block_header["previous_block_hash"])
+            + encode_hash(block_header["merkle_root"])
+            + encode_field(TIMESTAMP, block_header["timestamp"], "Timestamp")
+            + encode_field(NONCE, block_header["nonce"], "Nonce"))
+
+
+def decode_block_header(data: bytes, offset: int = 0) -> (dict, int):
+    previous_block_hash, offset = decode_hash(data, offset)
+    merkle_root, offset = decode_hash(data, offset)
+    timestamp = TIMESTAMP.unpack_from(data, offset)[0]
+    nonce = NONCE.unpack_from(data, offset + TIMESTAMP.size)[0]
+    return {"previous_block_hash": previous_block_hash,
+            "merkle_root": merkle_root,
+            "timestamp": timestamp,
+            "nonce": nonce}, offset + TIMESTAMP.size + NONCE.size
+
+
+def encode_block(header_bytes: bytes, transactions_bytes: list) -> bytes:
+    return b"".join([header_bytes, encode_compact_size(len(transactions_bytes))] + transactions_bytes)
+
+
+def decode_block(data: bytes) -> dict:
+    header, offset = decode_block_header(data)
+    number_of_transactions, offset = decode_compact_size(data, offset)
+    transactions = []
+    for _ in range(number_of_transactions):
+        transaction, offset = decode_transaction(data, offset)
+        transactions.append(transaction)
+    return {"header": header, "transactions": transactions}
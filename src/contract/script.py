@@ -1,11 +1,35 @@
-import binascii
-import json
+import functools
+import time
 
 from Crypto.Hash import SHA256
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
 
-from common.utils import calculate_hash
+from common.metrics import histogram
+from common.serialization import encode_transaction
+from contract.signature_verifier import SIGNATURES_VERIFIED, verify_signature
+from wallet.keystore import get_public_key_hash
+
+LOCKING_SCRIPT_CACHE_SIZE = 4096
+
+OP_DUP = "OP_DUP"
+OP_HASH160 = "OP_HASH160"
+OP_EQUALVERIFY = "OP_EQUALVERIFY"
+OP_CHECKSIG = "OP_CHECKSIG"
+# Spellings of the opcodes found in existing scripts: TransactionOutput writes OP_EQUAL_VERIFY.
+OPCODE_ALIASES = {"OP_EQUAL_VERIFY": OP_EQUALVERIFY, "OP_HASH_160": OP_HASH160, "OP_CHECK_SIG": OP_CHECKSIG}
+
+SCRIPT_EXECUTION_SECONDS = histogram("node_script_execution_seconds", "Duration of the execution of an input script.",
+                                     ("template",))
+SCRIPT_OPCODE_SECONDS = histogram("node_script_opcode_seconds",
+                                  "Duration of the execution of a script opcode outside of the standard templates.",
+                                  ("opcode",))
+
+
+def get_signature_hash(transaction_data: dict) -> bytes:
+    """
+    Digest of the transaction data signed by the owner of the inputs: the canonical encoding of the transaction
+    without its unlocking scripts, as in Transaction.sign_transaction_data
+    """
+    return SHA256.new(encode_transaction(transaction_data, with_unlocking_scripts=False)).digest()
 
 
 class Stack:
@@ -19,21 +43,24 @@ class Stack:
         return self.elements.pop()
 
 
+class ScriptException(Exception):
+    def __init__(self, expression, message):
+        self.expression = expression
+        self.message = message
+
 
 class StackScript(Stack):
     """
     OP_DUP: Duplicates the top stack item (<pubKey>)
     OP_HASH_160: The top stack item (<pubKey>) is hashed twice, first with SHA-256 and then with RIPEMD-160.
-    OP_EQUAL_VERIFY: Fails if the last 2 items in the stack don’t match ( <pubKey> and <pubKeyHash>)
+    OP_EQUALVERIFY (or OP_EQUAL_VERIFY): Fails if the last 2 items in the stack don’t match ( <pubKey> and <pubKeyHash>)
     OP_CHECK_SIG: The entire transaction’s outputs, inputs, and script are hashed. The signature <sig> is validated against this hash.
     """
-    def __init__(self, transaction_data: dict):
+    def __init__(self, signature_hash: bytes, signature_checks: list = None):
         super().__init__()
-        for count, tx_input in enumerate(transaction_data["inputs"]):
-            tx_input_dict = json.loads(tx_input)
-            tx_input_dict.pop("unlocking_script")
-            transaction_data["inputs"][count] = json.dumps(tx_input_dict)
-        self.transaction_data = transaction_data
+        self.signature_hash = signature_hash
+        self.signature_checks = signature_checks
+
     def op_dup(self):
         """
         simply duplicates the top most element of the stack, which is the public key
@@ -49,7 +76,7 @@ class StackScript(Stack):
         :return:
         """
         public_key = self.pop()
-        self.push(calculate_hash(calculate_hash(public_key, hash_function="sha256"), hash_function="ripemd160"))
+        self.push(get_public_key_hash(public_key))
 
     def op_equalverify(self):
         """
@@ -60,15 +87,110 @@ class StackScript(Stack):
         last_element_2 = self.pop()
         assert last_element_1 == last_element_2
 
-    def op_checksig(self, transaction_data: dict):
+    def op_checksig(self):
         """
-        validates that the signature from the unlocking script is valid
+        validates that the signature from the unlocking script is valid. If the script collects signature checks,
+        the (public key, signature hash, signature) triple is recorded to be verified later in a batch
         """
         public_key = self.pop()
         signature = self.pop()
-        signature_decoded = binascii.unhexlify(signature.encode("utf-8"))
-        public_key_bytes = public_key.encode("utf-8")
-        public_key_object = RSA.import_key(binascii.unhexlify(public_key_bytes))
-        transaction_bytes = json.dumps(self.transaction_data, indent=2).encode('utf-8')
-        transaction_hash = SHA256.new(transaction_bytes)
-        pkcs1_15.new(public_key_object).verify(transaction_hash, signature_decoded)
\ No newline at end of file
+        signature_check = (public_key, self.signature_hash, signature)
+        if self.signature_checks is not None:
+            self.signature_checks.append(signature_check)
+        else:
+            is_valid = verify_signature(signature_check)
+            SIGNATURES_VERIFIED.inc(result="valid" if is_valid else "invalid")
+            assert is_valid
+
+
+OPCODES = {
+    OP_DUP: StackScript.op_dup,
+    OP_HASH160: StackScript.op_hash160,
+    OP_EQUALVERIFY: StackScript.op_equalverify,
+    OP_CHECKSIG: StackScript.op_checksig,
+}
+P2PKH_TEMPLATE = (OP_DUP, OP_HASH160, None, OP_EQUALVERIFY, OP_CHECKSIG)
+
+
+def compile_script(script: str) -> tuple:
+    """
+    Splits a script into a tuple of (opcode, operand) pairs: the opcode is None for the elements pushed on the stack,
+    the operand is None for the opcodes. Unknown opcodes are rejected here rather than during execution.
+    """
+    instructions = []
+    for element in script.split(" "):
+        if element.startswith("OP"):
+            opcode = OPCODE_ALIASES.get(element, element)
+            if opcode not in OPCODES:
+                raise ScriptException(element, "Unknown opcode")
+            instructions.append((opcode, None))
+        else:
+            instructions.append((None, element))
+    return tuple(instructions)
+
+
+@functools.lru_cache(maxsize=LOCKING_SCRIPT_CACHE_SIZE)
+def compile_locking_script(locking_script: str) -> tuple:
+    """
+    Locking scripts are compiled once: the outputs sent to the same address share the same script.
+    """
+    return compile_script(locking_script)
+
+
+def match_p2pkh(unlocking_instructions: tuple, locking_instructions: tuple) -> tuple:
+    """
+    Returns (signature, public key, public key hash) if the scripts are the standard pay to public key hash pair
+    "<signature> <public key>" and "OP_DUP OP_HASH160 <public key hash> OP_EQUALVERIFY OP_CHECKSIG", None otherwise.
+    """
+    if len(unlocking_instructions) != 2 or len(locking_instructions) != len(P2PKH_TEMPLATE):
+        return None
+    if unlocking_instructions[0][0] is not None or unlocking_instructions[1][0] is not None:
+        return None
+    if tuple(opcode for opcode, _ in locking_instructions) != P2PKH_TEMPLATE:
+        return None
+    return unlocking_instructions[0][1], unlocking_instructions[1][1], locking_instructions[2][1]
+
+
+def execute_p2pkh(signature: str, public_key: str, public_key_hash: str, signature_hash: bytes,
+                  signature_checks: list = None):
+    """
+    Same result as running the pay to public key hash scripts on the stack, without the stack.
+    """
+    if get_public_key_hash(public_key) != public_key_hash:
+        raise ScriptException(public_key_hash, "Public key does not match the public key hash")
+    signature_check = (public_key, signature_hash, signature)
+    if signature_checks is not None:
+        signature_checks.append(signature_check)
+        return
+    is_valid = verify_signature(signature_check)
+    SIGNATURES_VERIFIED.inc(result="valid" if is_valid else "invalid")
+    if not is_valid:
+        raise ScriptException(public_key, "Invalid signature")
+
+
+def execute_instructions(instructions: tuple, stack_script: StackScript):
+    for opcode, operand in instructions:
+        if opcode is None:
+            stack_script.push(operand)
+            continue
+        start_time = time.perf_counter()
+        OPCODES[opcode](stack_script)
+        SCRIPT_OPCODE_SECONDS.observe(time.perf_counter() - start_time, opcode=opcode)
+
+
+def execute_script(unlocking_script: str, locking_script: str, signature_hash: bytes, signature_checks: list = None):
+    """
+    Runs the unlocking script followed by the locking script. signature_hash is the digest signed for the whole
+    transaction, computed once by the caller for all its inputs. Raises an exception if the scripts fail.
+    """
+    unlocking_instructions = compile_script(unlocking_script)
+    locking_instructions = compile_locking_script(locking_script)
+    p2pkh = match_p2pkh(unlocking_instructions, locking_instructions)
+    if p2pkh is not None:
+        with SCRIPT_EXECUTION_SECONDS.time(template="p2pkh"):
+            execute_p2pkh(*p2pkh, signature_hash, signature_checks)
+        return
+    with SCRIPT_EXECUTION_SECONDS.time(template="generic"):
+        stack_script = StackScript(signature_hash, signature_checks)
+        execute_instructions(unlocking_instructions, stack_script)
+        execute_instructions(locking_instructions, stack_script)
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+
+SCRIPT_CACHE_SIZE = 100000
+
+
+class ScriptCache:
+    """
+    Bounded LRU cache of the transaction inputs whose script already passed validation, keyed by
+    (transaction hash, input index, unlocking script, locking script). Inputs validated at mem pool admission are not
+    executed again when the block containing them is validated, and are evicted once that block is connected.
+    The transaction hash must be the signature hash recomputed from the transaction data, never the hash claimed by
+    the sender: the key then binds the outputs and every other signed field, and not only the scripts.
+    """
+
+    def __init__(self, max_size: int = SCRIPT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.keys_by_transaction_hash = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def contains(self, transaction_hash: str, input_index: int, unlocking_script: str, locking_script: str) -> bool:
+        key = (transaction_hash, input_index, unlocking_script, locking_script)
+        with self.lock:
+            if key not in self.entries:
+                return False
+            self.entries.move_to_end(key)
+            return True
+
+    def add(self, transaction_hash: str, input_index: int, unlocking_script: str, locking_script: str):
+        key = (transaction_hash, input_index, unlocking_script, locking_script)
+        with self.lock:
+            self.entries[key] = True
+            self.entries.move_to_end(key)
+            self.keys_by_transaction_hash.setdefault(transaction_hash, set()).add(key)
+            while len(self.entries) > self.max_size:
+                evicted_key, _ = self.entries.popitem(last=False)
+                self._discard_key(evicted_key)
+
+    def _discard_key(self, key: tuple):
+        keys = self.keys_by_transaction_hash.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_transaction_hash[key[0]]
+
+    def remove_transactions(self, transaction_hashes: list):
+        with self.lock:
+            for transaction_hash in transaction_hashes:
+                for key in self.keys_by_transaction_hash.pop(transaction_hash, ()):
+                    self.entries.pop(key, None)
+
+
+script_cache = ScriptCache()
@@ -0,0 +1,114 @@
+import binascii
+import functools
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+
+from common.metrics import counter, histogram
+
+PUBLIC_KEY_CACHE_SIZE = 1024
+PARALLEL_VERIFICATION_THRESHOLD = 16
+VERIFICATION_CHUNK_SIZE = 8
+
+SIGNATURES_VERIFIED = counter("node_signatures_verified_total", "Signatures verified, by result.", ("result",))
+SIGNATURE_BATCH_SECONDS = histogram("node_signature_batch_verification_seconds",
+                                    "Duration of the verification of a batch of signatures.")
+
+
+class SignatureHash:
+    """
+    Already computed SHA-256 digest, usable by pkcs1_15 in place of a hash object.
+    """
+    oid = SHA256.new().oid
+    digest_size = SHA256.digest_size
+
+    def __init__(self, digest: bytes):
+        self._digest = digest
+
+    def digest(self) -> bytes:
+        return self._digest
+
+
+@functools.lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def import_public_key(public_key_hex: str) -> RSA.RsaKey:
+    return RSA.import_key(binascii.unhexlify(public_key_hex.encode("utf-8")))
+
+
+def verify_signature(signature_check: tuple) -> bool:
+    """
+    signature_check is a (public key hex, message digest, signature hex) triple.
+    """
+    public_key_hex, message_digest, signature_hex = signature_check
+    try:
+        public_key_object = import_public_key(public_key_hex)
+        signature_decoded = binascii.unhexlify(signature_hex.encode("utf-8"))
+        pkcs1_15.new(public_key_object).verify(SignatureHash(message_digest), signature_decoded)
+        return True
+    except (ValueError, TypeError, binascii.Error):
+        return False
+
+
+def verify_signature_chunk(signature_checks: list) -> list:
+    results = []
+    for signature_check in signature_checks:
+        results.append(verify_signature(signature_check))
+        if not results[-1]:
+            break
+    return results
+
+
+class SignatureVerifier:
+    """
+    Verifies batches of signatures, in a process pool when the batch is large enough. The result list has one entry
+    per signature check: True or False for the verified ones and None for the ones skipped after the first failure.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+        self.executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def verify(self, signature_checks: list) -> list:
+        with SIGNATURE_BATCH_SECONDS.time():
+            results = self._verify(signature_checks)
+        SIGNATURES_VERIFIED.inc(results.count(True), result="valid")
+        SIGNATURES_VERIFIED.inc(results.count(False), result="invalid")
+        return results
+
+    def _verify(self, signature_checks: list) -> list:
+        if len(signature_checks) < PARALLEL_VERIFICATION_THRESHOLD:
+            results = verify_signature_chunk(signature_checks)
+            return results + [None] * (len(signature_checks) - len(results))
+        results = [None] * len(signature_checks)
+        executor = self._get_executor()
+        pending = {}
+        for start in range(0, len(signature_checks), VERIFICATION_CHUNK_SIZE):
+            chunk = signature_checks[start:start + VERIFICATION_CHUNK_SIZE]
+            pending[executor.submit(verify_signature_chunk, chunk)] = start
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in done:
+                start = pending.pop(future)
+                chunk_results = future.result()
+                results[start:start + len(chunk_results)] = chunk_results
+                failed = failed or not all(chunk_results)
+            if failed:
+                for future in pending:
+                    future.cancel()
+                break
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+signature_verifier = SignatureVerifier()
@@ -1,10 +1,9 @@
+import json
 from datetime import datetime
 
-from Crypto.PublicKey import RSA
-
 from block.block import Block
 from block.block_header import BlockHeader
-from common.io_blockchain import store_blockchain_in_memory
+from common.io_blockchain import LEGACY_FILENAME, store_blockchain_in_memory
 from node.merkle_tree import get_merkle_root
 from transaction.transaction import Transaction
 from transaction.transaction_input import TransactionInput
@@ -15,20 +14,21 @@ from blockchain_user.bertrand import private_key as bertrand_private_key
 from blockchain_user.camille import private_key as camille_private_key
 
 
-satoshi_wallet = Owner()
 albert_wallet = Owner(private_key=albert_private_key)
 bertrand_wallet = Owner(private_key=bertrand_private_key)
 camille_wallet = Owner(private_key=camille_private_key)
 
 
-def initialize_blockchain():
+def get_initial_blockchain() -> Block:
+    """
+    The initial blocks shared by every node, which are not mined. Their timestamps carry a UTC offset so that their
+    hashes do not depend on the local time zone.
+    """
     # initial block
-    timestamp_0 = datetime.timestamp(datetime.fromisoformat('2011-11-04 00:05:23.111'))
-    input_0 = TransactionInput(transaction_hash="abcd1234",
-                               output_index=0)
+    timestamp_0 = datetime.timestamp(datetime.fromisoformat('2011-11-04 00:05:23.111+07:00'))
     output_0 = TransactionOutput(public_key_hash=b"Albert",
                                  amount=40)
-    transaction_0 = Transaction([input_0], [output_0])
+    transaction_0 = Transaction([], [output_0])
     block_header_0 = BlockHeader(previous_block_hash="1111",
                                  timestamp=timestamp_0,
                                  nonce=2,
@@ -38,7 +38,7 @@ def initialize_blockchain():
         block_header=block_header_0
     )
 
-    timestamp_1 = datetime.timestamp(datetime.fromisoformat('2011-11-04 00:05:23.111'))
+    timestamp_1 = datetime.timestamp(datetime.fromisoformat('2011-11-04 00:05:23.111+07:00'))
     input_0 = TransactionInput(transaction_hash=block_0.transactions[0]["transaction_hash"], output_index=0)
     output_0 = TransactionOutput(public_key_hash=bertrand_wallet.public_key_hash, amount=30)
     output_1 = TransactionOutput(public_key_hash=albert_wallet.public_key_hash, amount=10)
@@ -54,7 +54,7 @@ def initialize_blockchain():
         block_header=block_header_1,
         previous_block=block_0,
     )
-    timestamp_2 = datetime.timestamp(datetime.fromisoformat('2011-11-07 00:05:13.222'))
+    timestamp_2 = datetime.timestamp(datetime.fromisoformat('2011-11-07 00:05:13.222+07:00'))
     input_0 = TransactionInput(transaction_hash=block_1.transactions[0]["transaction_hash"], output_index=1)
     output_0 = TransactionOutput(public_key_hash=camille_wallet.public_key_hash, amount=10)
     transaction_2 = Transaction([input_0], [output_0])
@@ -70,7 +70,7 @@ def initialize_blockchain():
         previous_block=block_1,
     )
 
-    timestamp_3 = datetime.timestamp(datetime.fromisoformat('2011-11-09 00:11:13.333'))
+    timestamp_3 = datetime.timestamp(datetime.fromisoformat('2011-11-09 00:11:13.333+07:00'))
     input_0 = TransactionInput(transaction_hash=block_1.transactions[0]["transaction_hash"], output_index=0)
     output_0 = TransactionOutput(public_key_hash=camille_wallet.public_key_hash, amount=5)
     output_1 = TransactionOutput(public_key_hash=bertrand_wallet.public_key_hash, amount=25)
@@ -86,4 +86,16 @@ def initialize_blockchain():
         block_header=block_header_3,
         previous_block=block_2,
     )
-    store_blockchain_in_memory(block_3)
+    return block_3
+
+
+def initialize_blockchain():
+    store_blockchain_in_memory(get_initial_blockchain())
+
+
+def store_legacy_blockchain_file():
+    """
+    Regenerates the tracked src/doc/blockchain file, which is migrated into an empty block store.
+    """
+    with open(LEGACY_FILENAME, "w") as file_obj:
+        file_obj.write(json.dumps(get_initial_blockchain().to_dict))
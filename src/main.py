@@ -1,38 +1,66 @@
 # main.py
-from flask import Flask, request, jsonify
+import time
 
-from block.blockchain import Blockchain, NewBlockException
-from common.io_blockchain import get_blockchain_from_memory
-from init_blockchain import initialize_blockchain
+IMPORT_START_TIME = time.perf_counter()
+
+import os
+
+from flask import Flask, Response, request, jsonify
+
+from block.blockchain import OrphanBlockException
+from block.chain_state import ChainState
+from common.block_export import JSON
+from common.metrics import record_startup_phase, registry, startup_phase
+from node.mem_pool import MEM_POOL_SIZE
 from node.network import Network
 from node.node import Node
-from node.node_transaction import NodeTransaction
-from transaction.transaction import Transaction
+from node.node_service import INVALID_BLOCK_EXCEPTIONS, INVALID_TRANSACTION_EXCEPTIONS, NodeService
 from transaction.transaction_exception import TransactionException
-from wallet.owner import Owner
-from wallet.wallet import Wallet
-from blockchain_user.camille import private_key as camille_private_key
 
 
+record_startup_phase("imports", time.perf_counter() - IMPORT_START_TIME)
+
 app = Flask(__name__)
 
 MY_HOSTNAME = "127.0.0.1:5000"
+MINE_BLOCKS = os.environ.get("MINE_BLOCKS", "0") == "1"
 my_node = Node(MY_HOSTNAME)
 network = Network(my_node)
-network.join_network()
+with startup_phase("chain_load"):
+    chain_state = ChainState()
+MEM_POOL_SIZE.set_function(lambda: len(chain_state.mem_pool))
+node_service = NodeService(chain_state, network)
+mining_scheduler = None
 
 
 @app.route("/block", methods=['POST'])
 def validate_block():
     content = request.json
-    blockchain_base = get_blockchain_from_memory()
     try:
-        block = Blockchain(blockchain_base, network)
-        block.receive(new_block=content["block"])
-        block.validate()
-        block.add()
-        block.broadcast()
-    except (NewBlockException, TransactionException) as new_block_exception:
+        node_service.add_block(content["block"])
+    except OrphanBlockException as orphan_block_exception:
+        return f'{orphan_block_exception}', 202
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+        return f'{new_block_exception}', 400
+    return "Transaction success", 200
+
+
+@app.route("/compact_block", methods=['POST'])
+def validate_compact_block():
+    content = request.json
+    try:
+        missing_indexes = node_service.receive_compact_block(content["compact_block"])
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+        return f'{new_block_exception}', 400
+    return jsonify({"missing_indexes": missing_indexes})
+
+
+@app.route("/block_transactions", methods=['POST'])
+def validate_block_transactions():
+    content = request.json
+    try:
+        node_service.receive_block_transactions(content["block_hash"], content["transactions"])
+    except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
         return f'{new_block_exception}', 400
     return "Transaction success", 200
 
@@ -40,36 +68,68 @@ def validate_block():
 @app.route("/transactions", methods=['POST'])
 def validate_transaction():
     content = request.json
-    blockchain_base = get_blockchain_from_memory()
     try:
-        transaction = NodeTransaction(blockchain_base, network)
-        transaction.receive(transaction=content["transaction"])
-        if transaction.is_new:
-            transaction.validate()
-            transaction.validate_funds()
-            transaction.broadcast()
-            transaction.store()
-    except TransactionException as transaction_exception:
+        node_service.receive_transaction(content["transaction"])
+    except INVALID_TRANSACTION_EXCEPTIONS as transaction_exception:
         return f'{transaction_exception}', 400
     return "Transaction success", 200
 
 
+@app.route("/transactions/batch", methods=['POST'])
+def validate_transactions():
+    content = request.json
+    try:
+        results = node_service.receive_transactions(content["transactions"])
+    except INVALID_TRANSACTION_EXCEPTIONS as transaction_exception:
+        return f'{transaction_exception}', 400
+    return jsonify({"results": results})
+
+
+@app.route("/inv", methods=['POST'])
+def receive_inventory():
+    content = request.json
+    requested_inventory = node_service.receive_inventory(content["hostname"], content["inventory"])
+    return jsonify({"inventory": requested_inventory})
+
+
 @app.route("/block", methods=['GET'])
 def get_blocks():
-    blockchain_base = get_blockchain_from_memory()
-    return jsonify(blockchain_base.to_dict)
+    try:
+        chunks, content_type = node_service.export_blocks(request.args.get("format", default=JSON),
+                                                          request.args.get("from_height"),
+                                                          request.args.get("to_height"),
+                                                          request.args.get("limit"))
+    except ValueError as value_error:
+        return f"{value_error}", 400
+    return Response(chunks, content_type=content_type)
+
+
+@app.route("/block/<hash_or_height>", methods=['GET'])
+def get_block(hash_or_height):
+    block = node_service.get_block(hash_or_height)
+    if block is None:
+        return f"Unknown block {hash_or_height}", 404
+    return jsonify(block)
+
+
+@app.route("/headers", methods=['GET'])
+def get_headers():
+    return jsonify(node_service.get_headers(request.args.get("from_height")))
 
 
 @app.route("/utxo/<user>", methods=['GET'])
 def get_user_utxos(user):
-    blockchain_base = get_blockchain_from_memory()
-    return jsonify(blockchain_base.get_user_utxos(user))
+    return jsonify(node_service.get_user_utxos(user))
 
 
 @app.route("/transactions/<transaction_hash>", methods=['GET'])
 def get_transaction(transaction_hash):
-    blockchain_base = get_blockchain_from_memory()
-    return jsonify(blockchain_base.get_transaction(transaction_hash))
+    return jsonify(node_service.get_transaction(transaction_hash))
+
+
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    return Response(registry.render(), content_type="text/plain; version=0.0.4")
 
 
 @app.route("/new_node_advertisement", methods=['POST'])
@@ -77,8 +137,7 @@ def new_node_advertisement():
     content = request.json
     hostname = content["hostname"]
     try:
-        new_node = Node(hostname)
-        network.store_new_node(new_node)
+        node_service.add_node(hostname)
     except TransactionException as transaction_exception:
         return f'{transaction_exception}', 400
     return "New node advertisement success", 200
@@ -86,11 +145,12 @@ def new_node_advertisement():
 
 @app.route("/known_node_request", methods=['GET'])
 def known_node_request():
-    return jsonify(network.return_known_nodes())
+    return jsonify(node_service.get_known_nodes())
 
 
 @app.route("/create_wallet", methods=['GET'])
 def create_wallet():
+    from wallet.owner import Owner
     owner = Owner()
     # Wallet(owner=owner)
     return {
@@ -98,11 +158,23 @@ def create_wallet():
         "public_key": owner.public_key_hash
     }
 
+
 def main():
-    global network
-    my_node = Node(MY_HOSTNAME)
-    network = Network(my_node)
-    network.join_network()
+    """
+    Joins the network once, reusing the chain and the peers persisted by the previous run: only the blocks missing
+    from the local chain are downloaded, and they are validated and added to the chain state like received blocks.
+    """
+    global mining_scheduler
+    with startup_phase("join_network"):
+        network.join_network(chain_state)
+    with startup_phase("chain_refresh"):
+        chain_state.refresh()
+    if MINE_BLOCKS:
+        with startup_phase("mining_scheduler"):
+            from node.mining_scheduler import MiningScheduler
+            mining_scheduler = MiningScheduler(chain_state, network)
+            mining_scheduler.start()
+    record_startup_phase("total", time.perf_counter() - IMPORT_START_TIME)
     app.run()
 
 
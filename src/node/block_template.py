@@ -0,0 +1,120 @@
+import heapq
+import threading
+
+from block.utxo_set import UTXOSet, get_transaction_hash
+from common.constants import COINBASE_RESERVED_SIZE, MAX_BLOCK_SIZE
+from common.serialization import encode_transaction
+
+
+def get_transaction_size(transaction: dict) -> int:
+    return len(encode_transaction(transaction))
+
+
+class TemplateEntry:
+    def __init__(self, transaction: dict, fee: float, size: int, parent_hashes: set):
+        self.transaction = transaction
+        self.fee = fee
+        self.size = size
+        self.parent_hashes = parent_hashes
+        self.child_hashes = set()
+
+    @property
+    def fee_rate(self) -> float:
+        return self.fee / self.size
+
+
+class BlockTemplate:
+    """
+    Candidate transactions of the next block. The fee and size of each transaction are computed once when it is
+    added, its inputs being looked up in the UTXO set or in the outputs of its parents still in the template.
+    select_transactions picks the candidates with the highest fee per serialized byte first, never before their
+    parents, until the block is full.
+    """
+
+    def __init__(self, utxo_set: UTXOSet, max_block_size: int = MAX_BLOCK_SIZE):
+        self.utxo_set = utxo_set
+        self.max_block_size = max_block_size
+        self.entries = {}
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self.entries
+
+    def get_fee(self, transaction_hash: str) -> float:
+        return self.entries[transaction_hash].fee
+
+    def add_transactions(self, transactions: list):
+        with self.lock:
+            for transaction in transactions:
+                self.add_transaction(transaction)
+
+    def add_transaction(self, transaction: dict):
+        with self.lock:
+            transaction_hash = get_transaction_hash(transaction)
+            if transaction_hash in self.entries:
+                return
+            input_amount = 0
+            parent_hashes = set()
+            for tx_input in transaction["inputs"]:
+                parent_entry = self.entries.get(tx_input["transaction_hash"])
+                if parent_entry is not None:
+                    output = parent_entry.transaction["outputs"][tx_input["output_index"]]
+                    parent_hashes.add(tx_input["transaction_hash"])
+                else:
+                    output = self.utxo_set.get_output(tx_input["transaction_hash"], tx_input["output_index"])
+                if output is None:
+                    print(f"Transaction {transaction_hash} spends an unknown output, not adding it to the template")
+                    return
+                input_amount = input_amount + output["amount"]
+            output_amount = sum(tx_output["amount"] for tx_output in transaction["outputs"])
+            entry = TemplateEntry(transaction, input_amount - output_amount, get_transaction_size(transaction),
+                                  parent_hashes)
+            self.entries[transaction_hash] = entry
+            for parent_hash in parent_hashes:
+                self.entries[parent_hash].child_hashes.add(transaction_hash)
+
+    def remove_transactions(self, transaction_hashes: list):
+        """
+        Removes mined or evicted transactions. Children of a mined transaction now spend a UTXO and stay candidates.
+        """
+        with self.lock:
+            for transaction_hash in transaction_hashes:
+                entry = self.entries.pop(transaction_hash, None)
+                if entry is None:
+                    continue
+                for parent_hash in entry.parent_hashes:
+                    if parent_hash in self.entries:
+                        self.entries[parent_hash].child_hashes.discard(transaction_hash)
+                for child_hash in entry.child_hashes:
+                    if child_hash in self.entries:
+                        self.entries[child_hash].parent_hashes.discard(transaction_hash)
+
+    def select_transactions(self) -> (list, float):
+        """
+        Returns the selected transactions, parents before children, and the sum of their fees.
+        """
+        with self.lock:
+            available_size = self.max_block_size - COINBASE_RESERVED_SIZE
+            selected_hashes = set()
+            selected_transactions = []
+            total_fees = 0
+            heap = [(-entry.fee_rate, transaction_hash) for transaction_hash, entry in self.entries.items()
+                    if not entry.parent_hashes]
+            heapq.heapify(heap)
+            while heap:
+                _, transaction_hash = heapq.heappop(heap)
+                entry = self.entries[transaction_hash]
+                if entry.size > available_size:
+                    continue
+                available_size = available_size - entry.size
+                selected_hashes.add(transaction_hash)
+                selected_transactions.append(entry.transaction)
+                total_fees = total_fees + entry.fee
+                for child_hash in entry.child_hashes:
+                    child_entry = self.entries[child_hash]
+                    if child_entry.parent_hashes <= selected_hashes:
+                        heapq.heappush(heap, (-child_entry.fee_rate, child_hash))
+            return selected_transactions, total_fees
@@ -0,0 +1,205 @@
+import queue
+import threading
+import time
+
+import requests
+
+from common.metrics import histogram
+from node.node import DEFAULT_REQUEST_TIMEOUT, Node
+from node.rolling_filter import RollingFilter
+
+PEER_QUEUE_SIZE = 100
+MAX_INVENTORY_SIZE = 500
+INVENTORY_REQUEST_TIMEOUT = 30
+MAX_PEER_LABELS = 20
+OTHER_PEERS_LABEL = "other"
+
+BLOCK = "block"
+TRANSACTION = "transaction"
+INVENTORY_ENDPOINTS = {BLOCK: "block", TRANSACTION: "transactions"}
+RELAY_EXCEPTIONS = (requests.exceptions.RequestException, ValueError, KeyError, TypeError, IndexError)
+
+BROADCAST_SECONDS = histogram("node_broadcast_seconds", "Duration of the relay of an inventory batch to a peer.",
+                              ("peer",))
+
+
+class PeerRelay:
+    """
+    Announces the objects queued for one node from a background thread, over the node's kept-alive session. Queued
+    announcements are sent together in one inventory message; the node answers with the ones it does not know, and
+    only their bodies are then sent to it, in announcement order. Blocks are sent in compact form when available.
+    The queue is bounded: when the node does not keep up, new messages for it are dropped instead of delaying the
+    caller or the other nodes.
+    """
+
+    def __init__(self, node: Node, own_hostname: str, queue_size: int = PEER_QUEUE_SIZE,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT, peer_label: str = None):
+        self.node = node
+        self.own_hostname = own_hostname
+        self.peer_label = peer_label if peer_label is not None else node.hostname
+        self.timeout = timeout
+        self.messages = queue.Queue(maxsize=queue_size)
+        self.number_of_dropped_messages = 0
+        self.number_of_failed_messages = 0
+        self.thread = threading.Thread(target=self.run, name=f"relay-{node.hostname}", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, inventory_type: str, inventory_hash: str, data: dict) -> bool:
+        try:
+            self.messages.put_nowait((inventory_type, inventory_hash, data))
+            return True
+        except queue.Full:
+            self.number_of_dropped_messages = self.number_of_dropped_messages + 1
+            print(f"Relay queue of {self.node.hostname} is full, dropping {inventory_type} {inventory_hash}")
+            return False
+
+    def stop(self):
+        self.messages.put(None)
+
+    def run(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            messages = [message]
+            while len(messages) < MAX_INVENTORY_SIZE:
+                try:
+                    message = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None:
+                    self.send(messages)
+                    return
+                messages.append(message)
+            self.send(messages)
+
+    def send(self, messages: list):
+        """
+        A body that cannot be sent is counted as failed without stopping the bodies after it.
+        """
+        bodies = {inventory_hash: (inventory_type, data) for inventory_type, inventory_hash, data in messages}
+        inventory = [{"type": inventory_type, "hash": inventory_hash}
+                     for inventory_type, inventory_hash, _ in messages]
+        start_time = time.perf_counter()
+        try:
+            requested_inventory = self.node.send_inventory(self.own_hostname, inventory, timeout=self.timeout)
+        except RELAY_EXCEPTIONS as exception:
+            self.number_of_failed_messages = self.number_of_failed_messages + len(messages)
+            print(f"Could not relay inventory to {self.node.hostname}: {exception}")
+            requested_inventory = []
+        for item in requested_inventory:
+            try:
+                body = bodies.get(item["hash"])
+                if body is None:
+                    continue
+                inventory_type, data = body
+                if "compact_block" in data:
+                    self.send_compact_block(data)
+                else:
+                    self.node.post(INVENTORY_ENDPOINTS[inventory_type], data, timeout=self.timeout)
+            except RELAY_EXCEPTIONS as exception:
+                self.number_of_failed_messages = self.number_of_failed_messages + 1
+                print(f"Could not relay {item} to {self.node.hostname}: {exception}")
+        BROADCAST_SECONDS.observe(time.perf_counter() - start_time, peer=self.peer_label)
+
+    def send_compact_block(self, data: dict):
+        """
+        Sends the block in compact form, then the transactions the node could not find in its mem pool.
+        """
+        compact_block = data["compact_block"]
+        missing_indexes = self.node.send_compact_block(compact_block, timeout=self.timeout)
+        if missing_indexes:
+            transactions = data["block"]["transactions"]
+            indexed_transactions = [{"index": index, "transaction": transactions[index]} for index in missing_indexes]
+            self.node.send_block_transactions(compact_block["block_hash"], indexed_transactions, timeout=self.timeout)
+
+
+class Broadcaster:
+    """
+    Announces new blocks and transactions to all known nodes but our own. A rolling filter per node remembers the
+    hashes it already announced to us or we announced to it, so each object is announced at most once per link.
+    announce only queues the message on the relay of each node and returns, so the request that triggered it does not
+    wait for any of them.
+    The broadcast durations are labelled by hostname for the first MAX_PEER_LABELS relays only, the later ones share
+    the OTHER_PEERS_LABEL label, so peers advertising themselves cannot grow the metrics without bound.
+    """
+
+    def __init__(self, network, queue_size: int = PEER_QUEUE_SIZE, timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.network = network
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.relays = {}
+        self.peer_labels = set()
+        self.known_inventories = {}
+        self.requested_at = {}
+        self.lock = threading.Lock()
+
+    def get_relay(self, node: Node) -> PeerRelay:
+        with self.lock:
+            relay = self.relays.get(node.hostname)
+            if relay is None:
+                peer_label = node.hostname if len(self.peer_labels) < MAX_PEER_LABELS else OTHER_PEERS_LABEL
+                self.peer_labels.add(peer_label)
+                relay = PeerRelay(node, self.network.node.hostname, self.queue_size, self.timeout, peer_label)
+                self.relays[node.hostname] = relay
+            return relay
+
+    def get_known_inventory(self, hostname: str) -> RollingFilter:
+        with self.lock:
+            known_inventory = self.known_inventories.get(hostname)
+            if known_inventory is None:
+                known_inventory = RollingFilter()
+                self.known_inventories[hostname] = known_inventory
+            return known_inventory
+
+    def add_known_inventory(self, hostname: str, inventory_hashes: list):
+        known_inventory = self.get_known_inventory(hostname)
+        with self.lock:
+            for inventory_hash in inventory_hashes:
+                known_inventory.add(inventory_hash)
+
+    def announce(self, inventory_type: str, inventory_hash: str, data: dict) -> int:
+        """
+        Returns the number of nodes the announcement was queued for. A hash dropped by a full queue is not marked as
+        known for that node, so a later announcement of it is queued again.
+        """
+        number_of_queued_messages = 0
+        for node in self.network.known_nodes:
+            if node.hostname == self.network.node.hostname:
+                continue
+            known_inventory = self.get_known_inventory(node.hostname)
+            with self.lock:
+                if inventory_hash in known_inventory:
+                    continue
+            if self.get_relay(node).enqueue(inventory_type, inventory_hash, data):
+                with self.lock:
+                    known_inventory.add(inventory_hash)
+                number_of_queued_messages = number_of_queued_messages + 1
+        return number_of_queued_messages
+
+    def select_inventory_to_request(self, inventory: list, is_known) -> list:
+        """
+        Returns the announced items that is_known rejects and that were not already requested from another node in
+        the last INVENTORY_REQUEST_TIMEOUT seconds.
+        """
+        now = time.monotonic()
+        requested_inventory = []
+        with self.lock:
+            self.requested_at = {inventory_hash: requested_at for inventory_hash, requested_at
+                                 in self.requested_at.items() if now - requested_at < INVENTORY_REQUEST_TIMEOUT}
+            for item in inventory:
+                if item.get("type") not in INVENTORY_ENDPOINTS or item.get("hash") in self.requested_at:
+                    continue
+                if not is_known(item["type"], item["hash"]):
+                    self.requested_at[item["hash"]] = now
+                    requested_inventory.append(item)
+        return requested_inventory
+
+    def stop(self):
+        with self.lock:
+            relays = list(self.relays.values())
+            self.relays = {}
+        for relay in relays:
+            relay.stop()
+        for relay in relays:
+            relay.thread.join()
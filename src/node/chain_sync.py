@@ -0,0 +1,218 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
+
+from block.block import Block
+from block.block_header import BlockHeader
+from common.serialization import SerializationException
+from node.merkle_tree import MerkleTree
+from node.node import Node
+
+HEADERS_PER_REQUEST = 2000
+BLOCKS_PER_REQUEST = 50
+REQUEST_TIMEOUT = 10
+
+
+class ChainSyncException(Exception):
+    def __init__(self, expression, message):
+        self.expression = expression
+        self.message = message
+
+
+@lru_cache(maxsize=1)
+def get_initial_block_hashes() -> tuple:
+    """
+    Hashes of the initial blocks created by init_blockchain, which every node shares and which are not mined.
+    """
+    from init_blockchain import get_initial_blockchain
+    block_hashes = []
+    current_block = get_initial_blockchain()
+    while current_block:
+        block_hashes.append(current_block.block_header.hash)
+        current_block = current_block.previous_block
+    return tuple(reversed(block_hashes))
+
+
+def is_initial_block(height: int, block_hash: str) -> bool:
+    initial_block_hashes = get_initial_block_hashes()
+    return height < len(initial_block_hashes) and initial_block_hashes[height] == block_hash
+
+
+def validate_headers(header_dicts: list) -> list:
+    """
+    Builds the headers of a chain starting at the genesis block, checking that each one links to the previous one and
+    meets the difficulty target. Only the known initial blocks are exempt from the proof of work. Hashes are always
+    computed from the header fields.
+    """
+    headers = []
+    for height, header_dict in enumerate(header_dicts):
+        try:
+            header = BlockHeader(**header_dict)
+        except (TypeError, KeyError, SerializationException):
+            raise ChainSyncException(height, "Malformed header")
+        if headers and header.previous_block_hash != headers[-1].hash:
+            raise ChainSyncException(height, "Header does not link to the previous header")
+        if not header.has_proof_of_work() and not is_initial_block(height, header.hash):
+            raise ChainSyncException(height, "Header does not meet the difficulty target")
+        headers.append(header)
+    return headers
+
+
+def get_chain_work(headers: list) -> int:
+    return sum(header.work for header in headers)
+
+
+class ChainSync:
+    """
+    Headers-first synchronization of the chain state with the known nodes. The header list of every node is
+    downloaded and validated, and the chain with the most cumulative work is selected. The blocks it has after the
+    fork point with the local chain are then downloaded in ranges of BLOCKS_PER_REQUEST, spread over the nodes
+    serving that chain, and each block is checked against its header. Only once every range is downloaded are the
+    blocks added to the chain state, with the same validation as received blocks, transactions included.
+
+    The downloads do not hold the chain state lock; it is only taken to read the local chain and to add the blocks.
+    """
+
+    def __init__(self, network, chain_state, timeout: float = REQUEST_TIMEOUT):
+        self.network = network
+        self.chain_state = chain_state
+        self.timeout = timeout
+
+    @property
+    def peers(self) -> list:
+        return [node for node in self.network.known_nodes if node.hostname != self.network.node.hostname]
+
+    def get_peer_headers(self, node: Node) -> list:
+        header_dicts = []
+        while True:
+            page = node.get_headers(len(header_dicts), timeout=self.timeout)
+            header_dicts.extend(page)
+            if len(page) < HEADERS_PER_REQUEST:
+                return validate_headers(header_dicts)
+
+    def get_peer_chains(self) -> dict:
+        """
+        Returns the validated headers of every node that answered, by node hostname.
+        """
+        peer_chains = {}
+        peers = self.peers
+        if not peers:
+            return peer_chains
+        with ThreadPoolExecutor(max_workers=len(peers)) as executor:
+            futures = {node.hostname: (node, executor.submit(self.get_peer_headers, node)) for node in peers}
+            for hostname, (node, future) in futures.items():
+                try:
+                    peer_chains[hostname] = (node, future.result())
+                except (requests.exceptions.RequestException, ValueError, ChainSyncException) as exception:
+                    print(f"Could not get headers from {hostname}: {exception}")
+        return peer_chains
+
+    @staticmethod
+    def get_fork_height(local_hashes: list, headers: list) -> int:
+        fork_height = 0
+        while (fork_height < min(len(local_hashes), len(headers))
+               and local_hashes[fork_height] == headers[fork_height].hash):
+            fork_height = fork_height + 1
+        return fork_height
+
+    def download_range(self, nodes: list, headers: list, from_height: int, to_height: int) -> list:
+        """
+        Downloads the blocks of [from_height, to_height) from the first of the given nodes that answers with blocks
+        matching the headers.
+        """
+        for node in nodes:
+            try:
+                block_dicts = node.get_blocks(from_height, to_height, timeout=self.timeout)
+                return self.build_blocks(block_dicts, headers[from_height:to_height])
+            except (requests.exceptions.RequestException, ValueError, ChainSyncException) as exception:
+                print(f"Could not get blocks {from_height} to {to_height} from {node.hostname}: {exception}")
+        raise ChainSyncException(from_height, f"No node served blocks {from_height} to {to_height}")
+
+    @staticmethod
+    def build_blocks(block_dicts: list, headers: list) -> list:
+        if len(block_dicts) != len(headers):
+            raise ChainSyncException(len(block_dicts), "Unexpected number of blocks")
+        blocks = []
+        for block_dict, header in zip(block_dicts, headers):
+            try:
+                block_header = BlockHeader(**block_dict["header"])
+                block = Block(transactions=block_dict["transactions"], block_header=block_header)
+                merkle_root = MerkleTree(block.serialized_transactions).root.hex()
+            except (TypeError, KeyError, SerializationException):
+                raise ChainSyncException(header.hash, "Malformed block")
+            if block_header.hash != header.hash:
+                raise ChainSyncException(block_header.hash, "Block does not match its header")
+            if merkle_root != block_header.merkle_root:
+                raise ChainSyncException(block_header.hash, "Merkle root does not match the block transactions")
+            blocks.append(block)
+        return blocks
+
+    def connect_blocks(self, blocks: list):
+        """
+        Adds the downloaded blocks like received ones: the main chain only switches to their branch once it has more
+        work, and the previous chain is restored if a block of the branch is invalid. Raises ChainSyncException at
+        the first invalid block.
+        """
+        from block.blockchain import Blockchain, NewBlockException
+        from transaction.transaction_exception import TransactionException
+        with self.chain_state.lock:
+            self.chain_state.refresh()
+            for block in blocks:
+                if self.chain_state.has_block(block.block_header.hash):
+                    continue
+                blockchain = Blockchain(self.chain_state, self.network)
+                try:
+                    blockchain.receive(new_block={"header": block.block_header.to_dict,
+                                                  "transactions": block.transactions})
+                    blockchain.validate()
+                    blockchain.add()
+                except (NewBlockException, TransactionException, SerializationException, AssertionError, ValueError,
+                        KeyError, TypeError) as exception:
+                    raise ChainSyncException(block.block_header.hash, f"Invalid block: {exception}")
+
+    def synchronize(self) -> bool:
+        """
+        Returns True if the tip of the chain state changed.
+        """
+        peer_chains = self.get_peer_chains()
+        if not peer_chains:
+            print("No node answered with a valid header list")
+            return False
+        best_headers = max((headers for _, headers in peer_chains.values()), key=get_chain_work)
+        with self.chain_state.lock:
+            self.chain_state.refresh()
+            local_hashes = [block.block_header.hash for block in self.chain_state.blocks]
+            local_chain_work = self.chain_state.chain_work
+            tip_hash = self.chain_state.tip.block_header.hash if self.chain_state.tip else None
+        if get_chain_work(best_headers) <= local_chain_work:
+            print("Local blockchain already has the most work")
+            return False
+        fork_height = self.get_fork_height(local_hashes, best_headers)
+        best_tip_hash = best_headers[-1].hash
+        serving_nodes = [node for node, headers in peer_chains.values()
+                         if len(headers) >= len(best_headers) and headers[len(best_headers) - 1].hash == best_tip_hash]
+        ranges = [(from_height, min(from_height + BLOCKS_PER_REQUEST, len(best_headers)))
+                  for from_height in range(fork_height, len(best_headers), BLOCKS_PER_REQUEST)]
+        print(f"Downloading blocks {fork_height} to {len(best_headers)} from {len(serving_nodes)} nodes")
+        blocks = []
+        with ThreadPoolExecutor(max_workers=len(serving_nodes)) as executor:
+            futures = []
+            for range_index, (from_height, to_height) in enumerate(ranges):
+                start = range_index % len(serving_nodes)
+                nodes = serving_nodes[start:] + serving_nodes[:start]
+                futures.append(executor.submit(self.download_range, nodes, best_headers, from_height, to_height))
+            try:
+                for future in futures:
+                    blocks.extend(future.result())
+            except ChainSyncException as chain_sync_exception:
+                print(f"Chain synchronization stopped: {chain_sync_exception.message}")
+                for future in futures:
+                    future.cancel()
+                return False
+        try:
+            self.connect_blocks(blocks)
+        except ChainSyncException as chain_sync_exception:
+            print(f"Chain synchronization stopped: {chain_sync_exception.message}")
+        with self.chain_state.lock:
+            return (self.chain_state.tip.block_header.hash if self.chain_state.tip else None) != tip_hash
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChainWriter:
+    """
+    Single writer of the asyncio node server. Every change of the chain state or the mem pool is submitted here and
+    run by one task, one at a time and in submission order, on a dedicated thread so that the event loop keeps serving
+    the read-only routes meanwhile.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.loop = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chain-writer")
+        self.task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.task = self.loop.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.executor.shutdown(wait=True)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            function, args, future = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, function, *args)
+            except Exception as exception:
+                if not future.done():
+                    future.set_exception(exception)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def submit(self, function, *args):
+        """
+        Runs function(*args) after the changes submitted before it and returns its result or raises its exception.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((function, args, future))
+        return await future
+
+    def submit_from_thread(self, function, *args):
+        """
+        Same as submit for a thread other than the one of the event loop, e.g. the mining scheduler: blocks it until
+        function(*args) was run by the writer.
+        """
+        return asyncio.run_coroutine_threadsafe(self.submit(function, *args), self.loop).result()
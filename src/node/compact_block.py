@@ -0,0 +1,160 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from block.block_header import BlockHeader
+from block.utxo_set import get_transaction_hash
+from common.serialization import encode_transaction
+from node.merkle_tree import MerkleTree
+
+SHORT_ID_SIZE = 6
+MAX_PENDING_COMPACT_BLOCKS = 20
+
+
+class CompactBlockException(Exception):
+    def __init__(self, expression, message):
+        self.expression = expression
+        self.message = message
+
+
+def get_short_id(block_hash: str, transaction_hash: str) -> str:
+    """
+    Transaction hash truncated to SHORT_ID_SIZE bytes, keyed with the block hash so that collisions cannot be
+    prepared in advance.
+    """
+    key = bytes.fromhex(block_hash)[:hashlib.blake2b.MAX_KEY_SIZE]
+    return hashlib.blake2b(bytes.fromhex(transaction_hash), key=key, digest_size=SHORT_ID_SIZE).hexdigest()
+
+
+def create_compact_block(block_content: dict, block_hash: str) -> dict:
+    """
+    The header, the short id of each transaction and the full coinbase transactions, which receivers cannot have in
+    their mem pool.
+    """
+    short_ids = []
+    prefilled_transactions = []
+    for index, transaction in enumerate(block_content["transactions"]):
+        if transaction["inputs"]:
+            short_ids.append(get_short_id(block_hash, get_transaction_hash(transaction)))
+        else:
+            short_ids.append(None)
+            prefilled_transactions.append({"index": index, "transaction": transaction})
+    return {"header": block_content["header"],
+            "block_hash": block_hash,
+            "short_ids": short_ids,
+            "prefilled_transactions": prefilled_transactions}
+
+
+class PartialBlock:
+    """
+    The block hash is computed from the header: short ids are keyed with it and pending blocks are looked up by it,
+    so the hash announced by the sender is only checked against it.
+    """
+
+    def __init__(self, compact_block: dict):
+        self.header = compact_block["header"]
+        self.block_hash = BlockHeader(**self.header).hash
+        if compact_block.get("block_hash", self.block_hash) != self.block_hash:
+            raise CompactBlockException(compact_block["block_hash"], "Block hash does not match the block header")
+        self.short_ids = compact_block["short_ids"]
+        self.transactions = [None] * len(self.short_ids)
+        self.prefilled_indexes = set()
+        for prefilled_transaction in compact_block["prefilled_transactions"]:
+            index = prefilled_transaction["index"]
+            if not 0 <= index < len(self.transactions):
+                raise CompactBlockException(index, "Prefilled transaction index out of range")
+            self.transactions[index] = prefilled_transaction["transaction"]
+            self.prefilled_indexes.add(index)
+
+    def fill_from_mem_pool(self, mem_pool_transactions: list):
+        """
+        Fills the slots whose short id matches exactly one mem pool transaction.
+        """
+        transactions_by_short_id = {}
+        for transaction in mem_pool_transactions:
+            short_id = get_short_id(self.block_hash, get_transaction_hash(transaction))
+            transactions_by_short_id[short_id] = None if short_id in transactions_by_short_id else transaction
+        for index, short_id in enumerate(self.short_ids):
+            if self.transactions[index] is None:
+                self.transactions[index] = transactions_by_short_id.get(short_id)
+
+    def fill(self, indexed_transactions: list):
+        """
+        Fills the slots of the given transactions. A malformed item or an index out of range is skipped, so that the
+        other transactions are still used and the slot is requested again.
+        """
+        for indexed_transaction in indexed_transactions:
+            try:
+                index = indexed_transaction["index"]
+                transaction = indexed_transaction["transaction"]
+                if not isinstance(index, int) or not 0 <= index < len(self.transactions):
+                    raise CompactBlockException(index, "Block transaction index out of range")
+            except (CompactBlockException, KeyError, TypeError) as exception:
+                print(f"Skipping block transaction {indexed_transaction} of {self.block_hash}: {exception}")
+                continue
+            if index not in self.prefilled_indexes:
+                self.transactions[index] = transaction
+
+    @property
+    def missing_indexes(self) -> list:
+        return [index for index, transaction in enumerate(self.transactions) if transaction is None]
+
+    def check_merkle_root(self) -> bool:
+        """
+        A short id collision with a mem pool transaction shows up as a Merkle root mismatch. In that case every
+        transaction that was not prefilled is dropped, to be requested again.
+        """
+        merkle_root = MerkleTree([encode_transaction(transaction) for transaction in self.transactions]).root.hex()
+        if merkle_root == self.header["merkle_root"]:
+            return True
+        for index in range(len(self.transactions)):
+            if index not in self.prefilled_indexes:
+                self.transactions[index] = None
+        return False
+
+    @property
+    def block_content(self) -> dict:
+        return {"header": self.header, "transactions": self.transactions}
+
+
+class CompactBlockReceiver:
+    """
+    Rebuilds blocks received in compact form from the mem pool. Blocks still missing transactions wait here, at most
+    MAX_PENDING_COMPACT_BLOCKS of them, until the sender provides those transactions.
+    """
+
+    def __init__(self, max_pending_blocks: int = MAX_PENDING_COMPACT_BLOCKS):
+        self.max_pending_blocks = max_pending_blocks
+        self.pending_blocks = OrderedDict()
+        self.lock = threading.Lock()
+
+    def receive(self, compact_block: dict, mem_pool_transactions: list) -> (dict, list):
+        """
+        Returns the block content if it could be rebuilt, or None and the indexes of the missing transactions.
+        """
+        partial_block = PartialBlock(compact_block)
+        partial_block.fill_from_mem_pool(mem_pool_transactions)
+        return self._complete(partial_block)
+
+    def receive_transactions(self, block_hash: str, indexed_transactions: list) -> (dict, list):
+        """
+        The block stays pending until it is complete, even if the given transactions cannot be used.
+        """
+        with self.lock:
+            partial_block = self.pending_blocks.get(block_hash)
+        if partial_block is None:
+            raise CompactBlockException(block_hash, "No pending compact block with this hash")
+        partial_block.fill(indexed_transactions)
+        return self._complete(partial_block)
+
+    def _complete(self, partial_block: PartialBlock) -> (dict, list):
+        if not partial_block.missing_indexes and partial_block.check_merkle_root():
+            with self.lock:
+                self.pending_blocks.pop(partial_block.block_hash, None)
+            return partial_block.block_content, []
+        with self.lock:
+            self.pending_blocks[partial_block.block_hash] = partial_block
+            self.pending_blocks.move_to_end(partial_block.block_hash)
+            while len(self.pending_blocks) > self.max_pending_blocks:
+                self.pending_blocks.popitem(last=False)
+        return None, partial_block.missing_indexes
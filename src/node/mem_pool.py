@@ -0,0 +1,201 @@
+import threading
+
+from block.utxo_set import get_transaction_hash
+from common.io_mem_pool import append_to_mem_pool_journal_in_memory, get_mem_pool_journal_from_memory, \
+    get_transactions_from_memory, mem_pool_journal_exists, store_mem_pool_journal_in_memory
+from common.metrics import gauge
+from transaction.transaction_exception import TransactionException
+
+JOURNAL_COMPACTION_MIN_RECORDS = 1000
+
+MEM_POOL_SIZE = gauge("node_mem_pool_transactions", "Number of transactions in the mem pool.")
+
+
+class MemPool:
+    """
+    Resident pool of the transactions waiting to be mined, indexed by transaction hash and by the outpoints
+    (transaction_hash, output_index) their inputs spend, so that duplicates and double spends within the pool are
+    detected in O(1). Changes are appended to a journal, which is compacted once it holds mostly removed transactions.
+    """
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self.lock = threading.RLock()
+        self.transactions_by_hash = {}
+        self.spending_transaction_hashes = {}
+        self.journal_records = 0
+        self.listeners = []
+        if persist:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.transactions_by_hash)
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self.transactions_by_hash
+
+    @property
+    def transactions(self) -> list:
+        with self.lock:
+            return list(self.transactions_by_hash.values())
+
+    def get_transaction(self, transaction_hash: str) -> dict:
+        return self.transactions_by_hash.get(transaction_hash)
+
+    def get_output(self, transaction_hash: str, output_index: int) -> dict:
+        """
+        Returns the output of a pool transaction, whether or not another pool transaction spends it.
+        """
+        transaction = self.transactions_by_hash.get(transaction_hash)
+        if transaction is None or not 0 <= output_index < len(transaction["outputs"]):
+            return None
+        output = transaction["outputs"][output_index]
+        return {"amount": output["amount"], "locking_script": output["locking_script"]}
+
+    def get_spending_transaction_hash(self, transaction_hash: str, output_index: int) -> str:
+        return self.spending_transaction_hashes.get((transaction_hash, output_index))
+
+    def add_listener(self, listener):
+        """
+        Registers a callable invoked with (added transactions, removed transaction hashes) on every change.
+        """
+        self.listeners.append(listener)
+
+    def _notify_listeners(self, added_transactions: list, removed_transaction_hashes: list):
+        for listener in self.listeners:
+            listener(added_transactions, removed_transaction_hashes)
+
+    def load(self):
+        with self.lock:
+            if mem_pool_journal_exists():
+                records = get_mem_pool_journal_from_memory()
+            else:
+                records = [{"add": transaction} for transaction in get_transactions_from_memory()]
+                store_mem_pool_journal_in_memory(records)
+            self.transactions_by_hash = {}
+            self.spending_transaction_hashes = {}
+            for record in records:
+                if "add" in record:
+                    self._add(record["add"])
+                else:
+                    self._remove(record["remove"])
+            self.journal_records = len(records)
+
+    def get_conflicting_transaction_hash(self, transaction: dict) -> str:
+        conflicting_transaction_hashes = self.get_conflicting_transaction_hashes(transaction)
+        return conflicting_transaction_hashes[0] if conflicting_transaction_hashes else None
+
+    def get_conflicting_transaction_hashes(self, transaction: dict) -> list:
+        """
+        Returns the pool transactions other than the given one that spend one of its inputs, in input order.
+        """
+        transaction_hash = get_transaction_hash(transaction)
+        conflicting_transaction_hashes = []
+        for tx_input in transaction["inputs"]:
+            spending_transaction_hash = self.get_spending_transaction_hash(tx_input["transaction_hash"],
+                                                                           tx_input["output_index"])
+            if spending_transaction_hash is not None and spending_transaction_hash != transaction_hash:
+                conflicting_transaction_hashes.append(spending_transaction_hash)
+        return list(dict.fromkeys(conflicting_transaction_hashes))
+
+    def get_descendant_hashes(self, transaction_hashes: list) -> list:
+        """
+        Returns the pool transactions spending an output of the given ones, and recursively their own spenders.
+        """
+        descendant_hashes = {}
+        parent_hashes = list(transaction_hashes)
+        while parent_hashes:
+            parent = self.transactions_by_hash.get(parent_hashes.pop())
+            if parent is None:
+                continue
+            parent_hash = get_transaction_hash(parent)
+            for output_index in range(len(parent["outputs"])):
+                child_hash = self.get_spending_transaction_hash(parent_hash, output_index)
+                if child_hash is not None and child_hash not in descendant_hashes:
+                    descendant_hashes[child_hash] = True
+                    parent_hashes.append(child_hash)
+        return list(descendant_hashes)
+
+    def add(self, transaction: dict):
+        with self.lock:
+            transaction_hash = get_transaction_hash(transaction)
+            if transaction_hash in self.transactions_by_hash:
+                return
+            conflicting_transaction_hash = self.get_conflicting_transaction_hash(transaction)
+            if conflicting_transaction_hash is not None:
+                raise TransactionException(conflicting_transaction_hash, "Transaction double spends a mem pool transaction")
+            self._add(transaction)
+            self._append_to_journal([{"add": transaction}])
+        self._notify_listeners([transaction], [])
+
+    def add_transactions(self, transactions: list) -> list:
+        """
+        Adds the given transactions in one journal write, skipping the ones already in the pool or double spending
+        a pool transaction. Returns the added transactions.
+        """
+        with self.lock:
+            added_transactions = []
+            for transaction in transactions:
+                if get_transaction_hash(transaction) in self.transactions_by_hash:
+                    continue
+                if self.get_conflicting_transaction_hash(transaction) is not None:
+                    continue
+                self._add(transaction)
+                added_transactions.append(transaction)
+            if not added_transactions:
+                return added_transactions
+            self._append_to_journal([{"add": transaction} for transaction in added_transactions])
+        self._notify_listeners(added_transactions, [])
+        return added_transactions
+
+    def remove_transactions(self, transactions: list):
+        """
+        Removes the given transactions, typically the ones of a connected block, every pool transaction spending one
+        of the same outpoints since they are now double spends, and the descendants of those evicted transactions,
+        which spend outputs that will never exist. The children of the given transactions stay in the pool.
+        """
+        with self.lock:
+            transaction_hashes = []
+            conflicting_transaction_hashes = []
+            for transaction in transactions:
+                transaction_hashes.append(get_transaction_hash(transaction))
+                conflicting_transaction_hashes.extend(self.get_conflicting_transaction_hashes(transaction))
+            transaction_hashes.extend(conflicting_transaction_hashes)
+            transaction_hashes.extend(self.get_descendant_hashes(conflicting_transaction_hashes))
+            transaction_hashes = [transaction_hash for transaction_hash in dict.fromkeys(transaction_hashes)
+                                  if transaction_hash in self.transactions_by_hash]
+            if not transaction_hashes:
+                return
+            self._remove(transaction_hashes)
+            self._append_to_journal([{"remove": transaction_hashes}])
+        self._notify_listeners([], transaction_hashes)
+
+    def _add(self, transaction: dict):
+        transaction_hash = get_transaction_hash(transaction)
+        self.transactions_by_hash[transaction_hash] = transaction
+        for tx_input in transaction["inputs"]:
+            self.spending_transaction_hashes[(tx_input["transaction_hash"], tx_input["output_index"])] = \
+                transaction_hash
+
+    def _remove(self, transaction_hashes: list):
+        for transaction_hash in transaction_hashes:
+            transaction = self.transactions_by_hash.pop(transaction_hash, None)
+            if transaction is None:
+                continue
+            for tx_input in transaction["inputs"]:
+                self.spending_transaction_hashes.pop((tx_input["transaction_hash"], tx_input["output_index"]), None)
+
+    def _append_to_journal(self, records: list):
+        if not self.persist:
+            return
+        if self.journal_records > max(JOURNAL_COMPACTION_MIN_RECORDS, 2 * len(self.transactions_by_hash)):
+            self.compact()
+        else:
+            append_to_mem_pool_journal_in_memory(records)
+            self.journal_records = self.journal_records + len(records)
+
+    def compact(self):
+        with self.lock:
+            records = [{"add": transaction} for transaction in self.transactions_by_hash.values()]
+            store_mem_pool_journal_in_memory(records)
+            self.journal_records = len(records)
@@ -1,62 +1,98 @@
-import json
-import math
-
-from common.utils import calculate_hash
-
-
-class TreeNode:
-    def __init__(self, value: str, left_child=None, right_child=None):
-        self.value = value
-        self.left_child = left_child
-        self.right_child = right_child
-
-
-def compute_tree_depth(number_of_leaves: int) -> int:
-    return math.ceil(math.log2(number_of_leaves))
-
-
-def is_power_of_2(number_of_leaves: int) -> bool:
-    return math.log2(number_of_leaves).is_integer()
-
-
-def fill_set(list_of_nodes: list):
-    current_number_of_leaves = len(list_of_nodes)
-    if is_power_of_2(current_number_of_leaves):
-        return list_of_nodes
-    total_number_of_leaves = 2 ** compute_tree_depth(current_number_of_leaves)
-    if current_number_of_leaves % 2 == 0:
-        for i in range(current_number_of_leaves, total_number_of_leaves, 2):
-            list_of_nodes = list_of_nodes + [list_of_nodes[-2], list_of_nodes[-1]]
-    else:
-        for i in range(current_number_of_leaves, total_number_of_leaves):
-            list_of_nodes.append(list_of_nodes[-1])
-    return list_of_nodes
-
-
-def build_merkle_tree(node_data: [str]) -> TreeNode:
-    complete_set = fill_set(node_data)
-    old_set_of_nodes = [TreeNode(calculate_hash(data)) for data in complete_set]
-    tree_depth = compute_tree_depth(len(old_set_of_nodes))
-    new_set_of_nodes = []
-    for i in range(0, tree_depth):
-        num_nodes = 2 ** (tree_depth - i)
-        new_set_of_nodes = []
-        for j in range(0, num_nodes, 2):
-            child_node_0 = old_set_of_nodes[j]
-            child_node_1 = old_set_of_nodes[j + 1]
-            new_node = TreeNode(
-                value=calculate_hash(f"{child_node_0.value}{child_node_1.value}"),
-                left_child=child_node_0,
-                right_child=child_node_1
-            )
-            new_set_of_nodes.append(new_node)
-        old_set_of_nodes = new_set_of_nodes
-    if len(new_set_of_nodes) > 0:
-        return new_set_of_nodes[0]
-    return old_set_of_nodes[0]
+import hashlib
+
+from common.metrics import histogram
+from common.serialization import encode_transaction
+
+MERKLE_TREE_BUILD_SECONDS = histogram("node_merkle_tree_build_seconds", "Duration of the construction of a Merkle tree.")
+
+
+def hash_bytes(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def to_bytes(data) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+class MerkleTree:
+    """
+    Merkle tree stored as one array of raw SHA-256 digests per level, leaves first. A level with an odd number of
+    nodes pairs its last node with itself. Appending a leaf only recomputes the nodes on the path to the root.
+    """
+
+    def __init__(self, leaves_data: list = ()):
+        with MERKLE_TREE_BUILD_SECONDS.time():
+            self.levels = [[hash_bytes(to_bytes(leaf_data)) for leaf_data in leaves_data]]
+            while len(self.levels[-1]) > 1:
+                nodes = self.levels[-1]
+                self.levels.append([self._hash_pair(nodes, index) for index in range(0, len(nodes), 2)])
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @staticmethod
+    def _hash_pair(nodes: list, left_index: int) -> bytes:
+        left = nodes[left_index]
+        right = nodes[left_index + 1] if left_index + 1 < len(nodes) else left
+        return hash_bytes(left + right)
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0] if self.levels[0] else b""
+
+    def append(self, leaf_data):
+        self.levels[0].append(hash_bytes(to_bytes(leaf_data)))
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            parent_index = index // 2
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            parent_nodes = self.levels[level + 1]
+            parent = self._hash_pair(self.levels[level], 2 * parent_index)
+            if parent_index < len(parent_nodes):
+                parent_nodes[parent_index] = parent
+            else:
+                parent_nodes.append(parent)
+            index = parent_index
+            level = level + 1
+
+    def get_proof(self, leaf_index: int) -> list:
+        """
+        Returns the sibling digests from the leaf up to the root, each with the side it is on.
+        """
+        proof = []
+        index = leaf_index
+        for nodes in self.levels[:-1]:
+            sibling_index = index ^ 1
+            sibling = nodes[sibling_index] if sibling_index < len(nodes) else nodes[index]
+            proof.append({"hash": sibling.hex(), "position": "left" if sibling_index < index else "right"})
+            index = index // 2
+        return proof
+
+
+def verify_merkle_proof(leaf_data, proof: list, merkle_root: str) -> bool:
+    node = hash_bytes(to_bytes(leaf_data))
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        node = hash_bytes(sibling + node) if step["position"] == "left" else hash_bytes(node + sibling)
+    return node.hex() == merkle_root
+
+
+def get_transaction_leaf_data(transaction: dict) -> bytes:
+    return encode_transaction(transaction)
+
+
+def get_merkle_tree(transactions: list) -> MerkleTree:
+    return MerkleTree([get_transaction_leaf_data(transaction) for transaction in transactions])
 
 
 def get_merkle_root(transactions: list) -> str:
-    transactions_bytes = [json.dumps(transaction, indent=2).encode('utf-8') for transaction in transactions]
-    merkle_tree = build_merkle_tree(transactions_bytes)
-    return merkle_tree.value
+    return get_merkle_tree(transactions).root.hex()
+
+
+def get_merkle_proof(transactions: list, transaction_hash: str) -> list:
+    for leaf_index, transaction in enumerate(transactions):
+        if transaction.get("transaction_hash") == transaction_hash:
+            return get_merkle_tree(transactions).get_proof(leaf_index)
+    return None
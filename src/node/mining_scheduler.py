@@ -0,0 +1,109 @@
+import threading
+
+from block.block import Block
+from block.block_exception import BlockException
+from block.blockchain import Blockchain
+from block.chain_state import ChainState
+from node.block_template import BlockTemplate
+from node.chain_writer import ChainWriter
+from node.network import Network
+from node.node_service import INVALID_BLOCK_EXCEPTIONS
+from node.parallel_miner import ParallelMiner
+from node.proof_of_work import ProofOfWork
+
+
+class MiningScheduler:
+    """
+    Background mining loop of the node. A new block template is built from the mem pool on top of the current tip and
+    its nonce search is aborted as soon as the tip or the mem pool changes, so that no time is spent mining on an
+    orphaned parent. Solved blocks go through Blockchain.add and Blockchain.broadcast like received ones, submitted to
+    the chain writer of the asyncio server when one is given.
+    """
+
+    def __init__(self, chain_state: ChainState, network: Network, miner: ParallelMiner = None,
+                 chain_writer: ChainWriter = None):
+        self.chain_state = chain_state
+        self.network = network
+        self.miner = miner if miner is not None else ParallelMiner()
+        self.chain_writer = chain_writer
+        self.condition = threading.Condition()
+        self.template_is_stale = True
+        self.is_running = False
+        self.thread = None
+        self.block_template = BlockTemplate(chain_state.utxo_set)
+        self.block_template.add_transactions(chain_state.mem_pool.transactions)
+        self.chain_state.add_tip_listener(self.notify_tip_changed)
+        self.chain_state.mem_pool.add_listener(self.notify_mem_pool_changed)
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, name="mining-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+        self.miner.cancel()
+        if self.thread:
+            self.thread.join()
+        self.miner.close()
+
+    def notify_tip_changed(self, tip: Block = None):
+        self.block_template.utxo_set = self.chain_state.utxo_set
+        self._mark_template_stale()
+
+    def notify_mem_pool_changed(self, added_transactions: list = (), removed_transaction_hashes: list = ()):
+        self.block_template.remove_transactions(removed_transaction_hashes)
+        self.block_template.add_transactions(added_transactions)
+        self._mark_template_stale()
+
+    def _mark_template_stale(self):
+        with self.condition:
+            self.template_is_stale = True
+            self.condition.notify()
+        self.miner.cancel()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.is_running and not self.template_is_stale:
+                    self.condition.wait()
+                if not self.is_running:
+                    return
+                self.template_is_stale = False
+                self.miner.reset()
+            self.mine_block()
+
+    def mine_block(self):
+        proof_of_work = ProofOfWork(self.chain_state, self.miner, self.block_template)
+        try:
+            proof_of_work.create_new_block()
+        except BlockException as block_exception:
+            print(f"No block mined: {block_exception.message}")
+            return
+        self.submit(proof_of_work.new_block)
+
+    def submit(self, new_block: Block):
+        """
+        Validates the mined block like a received one: the template may hold transactions that became invalid while
+        the nonce was searched. A rejected block is discarded without stopping the mining loop.
+        """
+        try:
+            if self.chain_writer is not None:
+                block = self.chain_writer.submit_from_thread(self.add_block, new_block)
+            else:
+                block = self.add_block(new_block)
+        except INVALID_BLOCK_EXCEPTIONS as new_block_exception:
+            print(f"Mined block is stale or invalid, discarding it: {new_block_exception}")
+            return
+        print(f"Mined new block {new_block.block_header.hash}")
+        block.broadcast()
+
+    def add_block(self, new_block: Block) -> Blockchain:
+        with self.chain_state.lock:
+            block = Blockchain(self.chain_state, self.network)
+            block.receive(new_block={"header": new_block.block_header.to_dict, "transactions": new_block.transactions})
+            block.validate()
+            block.add()
+        return block
@@ -1,23 +1,19 @@
-import json
-from common.io_blockchain import store_blockchain_dict_in_memory
-from init_blockchain import initialize_blockchain
+from node.broadcaster import Broadcaster
+from common.io_blockchain import get_blockchain_height
+from node.chain_sync import ChainSync
 from node.node import Node
+from node.peer_table import PeerTable
 
 
 class Network:
 
-    KNOWN_NODES_FILE = 'src/doc/known_nodes.json'
     FIRST_KNOWN_NODE_HOSTNAME = "127.0.0.1:5000"
 
-    def __init__(self, node: Node):
+    def __init__(self, node: Node, peer_table: PeerTable = None):
         self.node = node
-        self.initialize_known_nodes_file()
-
-    def initialize_known_nodes_file(self):
-        print("Initializing known nodes file")
-        initial_known_node = Node(hostname=self.FIRST_KNOWN_NODE_HOSTNAME)
-        with open(self.KNOWN_NODES_FILE, "w") as jsonFile:
-            json.dump([initial_known_node.dict], jsonFile)
+        self.peer_table = peer_table if peer_table is not None else PeerTable()
+        self.peer_table.add(self.FIRST_KNOWN_NODE_HOSTNAME)
+        self.broadcaster = Broadcaster(self)
 
     def advertise_to_all_known_nodes(self):
         print("Advertising to all known nodes")
@@ -35,64 +31,55 @@ class Network:
         return known_nodes_of_known_nodes
 
     @property
-    def known_nodes(self):
-        with open(self.KNOWN_NODES_FILE) as f:
-            nodes = json.load(f)
-            known_nodes = [Node(hostname=node["hostname"]) for node in nodes]
-        return known_nodes
+    def known_nodes(self) -> list:
+        """
+        Reachable known nodes, the ones with the lowest latency first.
+        """
+        return [Node(hostname=hostname, peer_table=self.peer_table) for hostname in self.peer_table.get_hostnames()]
 
     def store_new_node(self, new_node: Node):
-        print(f"Storing new node: {new_node.hostname}")
-        with open(self.KNOWN_NODES_FILE, "r+") as f:
-            current_nodes_json = json.load(f)
-            current_nodes = [Node(hostname=node["hostname"]) for node in current_nodes_json]
-            if new_node not in current_nodes:
-                current_nodes_json.append(new_node.dict)
-                f.seek(0)
-                json.dump(current_nodes_json, f)
+        self.peer_table.add(new_node.hostname)
 
     def store_nodes(self, nodes):
         for node in nodes:
             self.store_new_node(node)
 
-    def initialize_blockchain(self):
-        longest_blockchain = self.get_longest_blockchain()
-        store_blockchain_dict_in_memory(longest_blockchain)
+    def announce(self, inventory_type: str, inventory_hash: str, data: dict) -> int:
+        return self.broadcaster.announce(inventory_type, inventory_hash, data)
 
-    def get_longest_blockchain(self):
-        longest_blockchain_size = 0
-        longest_blockchain = None
-        for node in self.known_nodes:
-            if node.hostname != self.node.hostname:
-                blockchain = node.get_blockchain()
-                blockchain_length = len(blockchain)
-                if blockchain_length > longest_blockchain_size:
-                    longest_blockchain_size = blockchain_length
-                    longest_blockchain = blockchain
-        return longest_blockchain
+    def initialize_blockchain(self, chain_state):
+        ChainSync(self, chain_state).synchronize()
 
     @property
     def other_nodes_exist(self) -> bool:
-        if len(self.known_nodes) == 0:
-            return False
-        elif len(self.known_nodes) == 1 and self.known_nodes[0].hostname == self.node.hostname:
-            return False
-        else:
-            return True
+        return any(hostname != self.node.hostname for hostname in self.peer_table.get_hostnames())
 
-    def join_network(self):
+    def join_network(self, chain_state):
+        """
+        The initial blocks are created locally if the block store is empty, so that the blocks downloaded from the
+        other nodes are validated on top of them like received blocks.
+        """
         print("Joining network")
+        self.peer_table.start()
+        self.initialize_local_blockchain()
         if self.other_nodes_exist:
             self.advertise_to_all_known_nodes()
             known_nodes_of_known_node = self.ask_known_nodes_for_their_known_nodes()
             self.store_nodes(known_nodes_of_known_node)
             self.advertise_to_all_known_nodes()
-            self.initialize_blockchain()
+            self.initialize_blockchain(chain_state)
         else:
             print("No other node exists. This could be caused by a network issue or because we are the first node out here.")
-            initialize_blockchain()
 
-    def return_known_nodes(self):
-        with open(self.KNOWN_NODES_FILE) as f:
-            current_nodes_json = json.load(f)
-        return current_nodes_json
\ No newline at end of file
+    @staticmethod
+    def initialize_local_blockchain():
+        """
+        Creates the initial blocks if the block store is empty. A chain persisted by a previous run is kept as is.
+        """
+        if get_blockchain_height():
+            return
+        from init_blockchain import initialize_blockchain
+        initialize_blockchain()
+
+    def return_known_nodes(self) -> list:
+        return [{"hostname": hostname} for hostname in self.peer_table.get_hostnames(include_unreachable=True)]
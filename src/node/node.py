@@ -1,10 +1,39 @@
+import threading
+import time
+
 import requests
 
+DEFAULT_REQUEST_TIMEOUT = 10
+CONNECTION_POOL_SIZE = 4
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(hostname: str) -> requests.Session:
+    """
+    Returns the session of the given node, created once per process so that its connections are kept alive and
+    reused across requests.
+    """
+    with _sessions_lock:
+        session = _sessions.get(hostname)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE)
+            session.mount("http://", adapter)
+            _sessions[hostname] = session
+        return session
+
 
 class Node:
-    def __init__(self, hostname: str):
+    def __init__(self, hostname: str, peer_table=None):
         self.hostname = hostname
         self.base_url = f"http://{hostname}/"
+        self.peer_table = peer_table
+
+    @property
+    def session(self) -> requests.Session:
+        return get_session(self.hostname)
 
     def __eq__(self, other):
         return self.hostname == other.hostname
@@ -15,18 +44,35 @@ class Node:
             "hostname": self.hostname
         }
 
-    def post(self, endpoint: str, data: dict) -> requests.Response:
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends the request over the node session and, if the node is in a peer table, records its latency or the
+        failure to reach it there.
+        """
+        start = time.monotonic()
+        try:
+            req_return = self.session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if self.peer_table is not None:
+                self.peer_table.record_failure(self.hostname)
+            raise
+        if self.peer_table is not None:
+            self.peer_table.record_success(self.hostname, time.monotonic() - start)
+        return req_return
+
+    def post(self, endpoint: str, data: dict, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> requests.Response:
         url = f"{self.base_url}{endpoint}"
-        req_return = requests.post(url, json=data)
+        req_return = self.request("POST", url, json=data, timeout=timeout)
         req_return.raise_for_status()
         return req_return
 
-    def get(self, endpoint: str, data: dict = None) -> list:
+    def get(self, endpoint: str, data: dict = None, params: dict = None,
+            timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
         url = f"{self.base_url}{endpoint}"
         if data:
-            req_return = requests.get(url, json=data)
+            req_return = self.request("GET", url, json=data, params=params, timeout=timeout)
         else:
-            req_return = requests.get(url)
+            req_return = self.request("GET", url, params=params, timeout=timeout)
         req_return.raise_for_status()
         return req_return.json()
 
@@ -41,8 +87,42 @@ class Node:
     def send_new_block(self, block: dict) -> requests.Response:
         return self.post(endpoint="block", data=block)
 
+    def send_inventory(self, hostname: str, inventory: list, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
+        """
+        Announces [{"type", "hash"}] items and returns the ones the node wants to receive.
+        """
+        data = {"hostname": hostname, "inventory": inventory}
+        return self.post(endpoint="inv", data=data, timeout=timeout).json()["inventory"]
+
+    def send_compact_block(self, compact_block: dict, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
+        """
+        Returns the indexes of the block transactions the node is missing.
+        """
+        data = {"compact_block": compact_block}
+        return self.post(endpoint="compact_block", data=data, timeout=timeout).json()["missing_indexes"]
+
+    def send_block_transactions(self, block_hash: str, indexed_transactions: list,
+                                timeout: float = DEFAULT_REQUEST_TIMEOUT) -> requests.Response:
+        data = {"block_hash": block_hash, "transactions": indexed_transactions}
+        return self.post(endpoint="block_transactions", data=data, timeout=timeout)
+
     def send_transaction(self, transaction_data: dict) -> requests.Response:
         return self.post("transactions", transaction_data)
 
+    def send_transactions(self, transactions: list, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
+        """
+        Submits a batch of transactions and returns one {"transaction_hash", "status", "error"} result per
+        transaction, in the same order.
+        """
+        data = {"transactions": transactions}
+        return self.post(endpoint="transactions/batch", data=data, timeout=timeout).json()["results"]
+
     def get_blockchain(self) -> list:
-        return self.get(endpoint="block")
\ No newline at end of file
+        return self.get(endpoint="block")
+
+    def get_headers(self, from_height: int, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
+        return self.get(endpoint="headers", params={"from_height": from_height}, timeout=timeout)
+
+    def get_blocks(self, from_height: int, to_height: int, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> list:
+        return self.get(endpoint="block", params={"from_height": from_height, "to_height": to_height},
+                        timeout=timeout)
@@ -0,0 +1,186 @@
+import threading
+
+from block.blockchain import Blockchain, NewBlockException, OrphanBlockException
+from block.chain_state import ChainState
+from block.utxo_set import UTXOView
+from common.block_export import CONTENT_TYPES, EXPORT_FUNCTIONS, JSON
+from common.serialization import SerializationException
+from node.broadcaster import BLOCK
+from node.chain_sync import BLOCKS_PER_REQUEST, HEADERS_PER_REQUEST, ChainSync
+from node.compact_block import CompactBlockException, CompactBlockReceiver
+from node.network import Network
+from node.node import Node
+from node.node_transaction import NodeTransaction
+from node.transaction_batch import TransactionBatch
+from transaction.transaction_exception import TransactionException
+
+INVALID_BLOCK_EXCEPTIONS = (NewBlockException, TransactionException, SerializationException, CompactBlockException,
+                            AssertionError, KeyError, TypeError)
+INVALID_TRANSACTION_EXCEPTIONS = (TransactionException, SerializationException, KeyError, TypeError)
+
+
+def parse_int(value, default: int) -> int:
+    """
+    Integer value of a query parameter, default if it is missing or not an integer.
+    """
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class NodeService:
+    """
+    What the node routes do, independently of the web server running them. The methods changing the chain state or
+    the mem pool (add_block, receive_compact_block, receive_block_transactions, receive_transaction,
+    receive_transactions) hold chain_state.lock, so they never interleave; the asyncio server also submits them to a
+    single writer task, in arrival order. The other methods only read, without the lock, and can run concurrently
+    with them: they copy what they read or check it is still in the main chain, and see the state just before or just
+    after a concurrent change.
+    """
+
+    def __init__(self, chain_state: ChainState, network: Network, compact_block_receiver: CompactBlockReceiver = None):
+        self.chain_state = chain_state
+        self.network = network
+        self.compact_block_receiver = compact_block_receiver if compact_block_receiver is not None \
+            else CompactBlockReceiver()
+        self.chain_sync_lock = threading.Lock()
+
+    def add_block(self, block_content: dict):
+        self.chain_state.refresh()
+        try:
+            with self.chain_state.lock:
+                block = Blockchain(self.chain_state, self.network)
+                block.receive(new_block=block_content)
+                block.validate()
+                block.add()
+        except OrphanBlockException:
+            self.synchronize_in_background()
+            raise
+        block.broadcast()
+
+    def synchronize_in_background(self):
+        """
+        Downloads the blocks missing before an orphan block from the other nodes, one synchronization at a time.
+        ChainSync only takes chain_state.lock to read the local chain and to connect the downloaded blocks, so the
+        node keeps serving requests meanwhile.
+        """
+        if not self.chain_sync_lock.acquire(blocking=False):
+            return
+
+        def synchronize():
+            try:
+                ChainSync(self.network, self.chain_state).synchronize()
+            finally:
+                self.chain_sync_lock.release()
+
+        threading.Thread(target=synchronize, name="chain-sync", daemon=True).start()
+
+    def receive_compact_block(self, compact_block: dict) -> list:
+        """
+        Rebuilds the block from the mem pool and adds it if it is complete. Returns the indexes of the transactions
+        still missing, which the sender then posts to /block_transactions.
+        """
+        self.chain_state.refresh()
+        block_content, missing_indexes = self.compact_block_receiver.receive(compact_block,
+                                                                             self.chain_state.mem_pool.transactions)
+        if block_content is not None:
+            self.add_block(block_content)
+        return missing_indexes
+
+    def receive_block_transactions(self, block_hash: str, transactions: list):
+        block_content, missing_indexes = self.compact_block_receiver.receive_transactions(block_hash, transactions)
+        if block_content is None:
+            raise CompactBlockException(missing_indexes, "Block transactions are still missing")
+        self.add_block(block_content)
+
+    def receive_transaction(self, transaction_data: dict):
+        self.chain_state.refresh()
+        with self.chain_state.lock:
+            utxo_view = UTXOView(self.chain_state.utxo_set, self.chain_state.mem_pool)
+            transaction = NodeTransaction(self.chain_state.tip, self.network, utxo_view,
+                                          mem_pool=self.chain_state.mem_pool)
+            transaction.receive(transaction=transaction_data)
+            if transaction.is_new:
+                transaction.validate_double_spend()
+                transaction.validate()
+                transaction.validate_funds()
+                transaction.broadcast()
+                transaction.store()
+
+    def receive_transactions(self, transactions: list) -> list:
+        """
+        Validates a batch of transactions with a shared UTXO context and returns one result per transaction.
+        """
+        self.chain_state.refresh()
+        return TransactionBatch(self.chain_state, self.network).submit(transactions)
+
+    def receive_inventory(self, hostname: str, inventory: list) -> list:
+        """
+        Returns the announced blocks and transactions this node does not know yet, which the announcing node then
+        sends.
+        """
+        self.chain_state.refresh()
+        self.network.broadcaster.add_known_inventory(hostname, [item["hash"] for item in inventory])
+        return self.network.broadcaster.select_inventory_to_request(inventory, self.is_inventory_known)
+
+    def is_inventory_known(self, inventory_type: str, inventory_hash: str) -> bool:
+        if inventory_type == BLOCK:
+            return self.chain_state.has_block(inventory_hash)
+        return inventory_hash in self.chain_state.mem_pool
+
+    def export_blocks(self, export_format: str = JSON, from_height: str = None, to_height: str = None,
+                      limit: str = None) -> tuple:
+        """
+        Returns (chunk generator, content type) for GET /block. Without from_height, to_height and limit, the whole
+        chain is exported from the tip. Otherwise the blocks of [from_height, to_height) are exported in height order,
+        at most limit of them (BLOCKS_PER_REQUEST by default). Raises ValueError for an unknown format.
+        """
+        self.chain_state.refresh()
+        if export_format not in EXPORT_FUNCTIONS:
+            raise ValueError(f"Unknown format {export_format}")
+        if from_height is None and to_height is None and limit is None:
+            blocks = self.chain_state.blocks[::-1]
+        else:
+            height = self.chain_state.height
+            first_height = max(parse_int(from_height, 0), 0)
+            limit = max(parse_int(limit, BLOCKS_PER_REQUEST), 0)
+            last_height = min(parse_int(to_height, height), height, first_height + limit)
+            blocks = self.chain_state.blocks[first_height:last_height]
+        return EXPORT_FUNCTIONS[export_format](blocks), CONTENT_TYPES[export_format]
+
+    def get_block(self, hash_or_height: str) -> dict:
+        """
+        Returns the main chain block with the given hash, or at the given height when a number shorter than a hash is
+        given, None if there is none.
+        """
+        self.chain_state.refresh()
+        if hash_or_height.isdigit() and len(hash_or_height) < 64:
+            blocks = self.chain_state.blocks[int(hash_or_height):int(hash_or_height) + 1]
+            block = blocks[0] if blocks else None
+        else:
+            block = self.chain_state.get_block_by_hash(hash_or_height)
+        if block is None:
+            return None
+        return {"header": block.block_header.to_dict, "transactions": block.transactions}
+
+    def get_headers(self, from_height: str = None) -> list:
+        self.chain_state.refresh()
+        first_height = max(parse_int(from_height, 0), 0)
+        return [block.block_header.to_dict
+                for block in self.chain_state.blocks[first_height:first_height + HEADERS_PER_REQUEST]]
+
+    def get_user_utxos(self, user: str) -> dict:
+        self.chain_state.refresh()
+        return self.chain_state.utxo_set.get_user_utxos(user)
+
+    def get_transaction(self, transaction_hash: str) -> dict:
+        self.chain_state.refresh()
+        transaction = self.chain_state.get_transaction(transaction_hash)
+        return transaction if transaction is not None else {}
+
+    def add_node(self, hostname: str):
+        self.network.store_new_node(Node(hostname))
+
+    def get_known_nodes(self) -> list:
+        return self.network.return_known_nodes()
@@ -1,17 +1,11 @@
-import requests
-from Crypto.Hash import SHA256
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
-import json
-import binascii
-import copy
-
-from common.io_mem_pool import get_transactions_from_memory, store_transactions_in_memory
-from contract.script import StackScript
+from contract.script import execute_script, get_signature_hash
+from contract.script_cache import ScriptCache, script_cache as default_script_cache
 from block.block import Block
-from common.utils import calculate_hash
+from block.utxo_set import UTXOSet, get_transaction_hash
+from common.serialization import SerializationException
+from node.broadcaster import TRANSACTION
+from node.mem_pool import MemPool
 from node.network import Network
-from node.other_node import OtherNode
 from transaction.transaction_exception import TransactionException
 
 
@@ -38,67 +32,118 @@ class NodeTransaction:
     }
     """
 
-    def __init__(self, blockchain: Block, network: Network):
+    def __init__(self, blockchain: Block, network: Network, utxo_set: UTXOSet, mem_pool: MemPool,
+                 script_cache: ScriptCache = None):
+        """
+        The UTXO set and the mem pool are the resident ones of the chain state: loading them here would read, and
+        possibly rewrite, their files for every transaction.
+        """
         self.blockchain = blockchain
         self.network = network
+        self.utxo_set = utxo_set
+        self.mem_pool = mem_pool
+        self.script_cache = script_cache if script_cache is not None else default_script_cache
         self.transaction_data = {}
         self.inputs = []
         self.outputs = []
         self.is_valid = False
         self.is_funds_sufficient = False
+        self._signature_hash = None
+        self.unverified_cache_keys = []
 
     def receive(self, transaction: dict):
         self.transaction_data = transaction
+        self._signature_hash = None
+        self.unverified_cache_keys = []
         self.inputs = transaction["inputs"]
         self.outputs = transaction["outputs"]
 
     @property
     def is_new(self):
-        current_transactions = get_transactions_from_memory()
-        if self.transaction_data in current_transactions:
-            return False
-        return True
-
-    def execute_script(self, unlocking_script, locking_script):
-        unlocking_script_list = unlocking_script.split(" ")
-        locking_script_list = locking_script.split(" ")
-        transaction_data = copy.deepcopy(self.transaction_data)
-        if "transaction_hash" in transaction_data:
-            transaction_data.pop("transaction_hash")
-        stack_script = StackScript(transaction_data)
-        for element in unlocking_script_list:
-            if element.startswith("OP"):
-                class_method = getattr(StackScript, element.lower())
-                class_method(stack_script)
-            else:
-                stack_script.push(element)
-        for element in locking_script_list:
-            if element.startswith("OP"):
-                class_method = getattr(StackScript, element.lower())
-                class_method(stack_script)
-            else:
-                stack_script.push(element)
+        return get_transaction_hash(self.transaction_data) not in self.mem_pool
 
-    def validate(self):
-        for tx_input in self.inputs:
-            transaction_hash = tx_input["transaction_hash"]
+    def validate_double_spend(self):
+        outpoints = {(tx_input["transaction_hash"], tx_input["output_index"]) for tx_input in self.inputs}
+        if len(outpoints) != len(self.inputs):
+            print('Transaction spends the same output twice')
+            raise TransactionException(get_transaction_hash(self.transaction_data),
+                                       "Transaction spends the same output twice")
+        conflicting_transaction_hash = self.mem_pool.get_conflicting_transaction_hash(self.transaction_data)
+        if conflicting_transaction_hash is not None:
+            print('Transaction double spends a mem pool transaction')
+            raise TransactionException(conflicting_transaction_hash, "Transaction double spends a mem pool transaction")
+
+    @property
+    def signature_hash(self) -> bytes:
+        if self._signature_hash is None:
+            try:
+                self._signature_hash = get_signature_hash(self.transaction_data)
+            except SerializationException as serialization_exception:
+                raise TransactionException(serialization_exception.expression, serialization_exception.message)
+        return self._signature_hash
+
+    def validate_transaction_hash(self) -> str:
+        """
+        The transaction hash is the digest of the signed data, so it is checked against the one given by the sender.
+        """
+        transaction_hash = self.signature_hash.hex()
+        if self.transaction_data.get("transaction_hash", transaction_hash) != transaction_hash:
+            print('Transaction hash validation failed')
+            raise TransactionException(self.transaction_data["transaction_hash"],
+                                       "Transaction hash does not match the transaction data")
+        return transaction_hash
+
+    def execute_script(self, unlocking_script, locking_script, signature_checks: list = None):
+        execute_script(unlocking_script, locking_script, self.signature_hash, signature_checks)
+
+    def validate(self, signature_checks: list = None):
+        """
+        Runs the script of every input that is not already in the script cache. If signature_checks is given,
+        signatures are not verified here: a (utxo, (public key, signature hash, signature)) entry is appended to it
+        for each of them instead, and the inputs are only cached by cache_verified_scripts once their signatures pass.
+        """
+        signature_hash = self.validate_transaction_hash()
+        for input_index, tx_input in enumerate(self.inputs):
+            utxo_hash = tx_input["transaction_hash"]
             output_index = tx_input["output_index"]
             try:
-                locking_script = self.blockchain.get_locking_script_from_utxo(transaction_hash, output_index)
-            except Exception:
-                raise TransactionException(f"{transaction_hash}:{output_index}", "Could not find locking script for utxo")
+                locking_script = self.utxo_set.get_locking_script(utxo_hash, output_index)
+            except KeyError:
+                raise TransactionException(f"{utxo_hash}:{output_index}", "Could not find locking script for utxo")
+            cache_key = (signature_hash, input_index, tx_input["unlocking_script"], locking_script)
+            if self.script_cache.contains(*cache_key):
+                self.is_valid = True
+                continue
+            input_signature_checks = [] if signature_checks is not None else None
             try:
-                self.execute_script(tx_input["unlocking_script"], locking_script)
+                self.execute_script(tx_input["unlocking_script"], locking_script, input_signature_checks)
                 self.is_valid = True
             except Exception:
                 print('Transaction script validation failed')
-                raise TransactionException(f"UTXO ({transaction_hash}:{output_index})", "Transaction script validation failed")
+                raise TransactionException(f"UTXO ({utxo_hash}:{output_index})", "Transaction script validation failed")
+            if signature_checks is not None:
+                signature_checks.extend((f"{utxo_hash}:{output_index}", signature_check)
+                                        for signature_check in input_signature_checks)
+                self.unverified_cache_keys.append(cache_key)
+            else:
+                self.script_cache.add(*cache_key)
+
+    def cache_verified_scripts(self):
+        """
+        Caches the inputs validated with signature_checks, once every signature they appended has been verified.
+        """
+        for cache_key in self.unverified_cache_keys:
+            self.script_cache.add(*cache_key)
+        self.unverified_cache_keys = []
 
     def get_total_amount_in_inputs(self) -> int:
         total_in = 0
         for tx_input in self.inputs:
-            transaction_data = self.blockchain.get_transaction_from_utxo(tx_input["transaction_hash"])
-            utxo_amount = transaction_data["outputs"][tx_input["output_index"]]["amount"]
+            utxo = self.utxo_set.get_output(tx_input["transaction_hash"], tx_input["output_index"])
+            if utxo is None:
+                raise TransactionException(f"{tx_input['transaction_hash']}:{tx_input['output_index']}",
+                                           "Could not find utxo")
+            utxo_amount = utxo["amount"]
             total_in = total_in + utxo_amount
         return total_in
 
@@ -109,28 +154,31 @@ class NodeTransaction:
             total_out = total_out + amount
         return total_out
 
+    def get_fee(self) -> float:
+        return self.get_total_amount_in_inputs() - self.get_total_amount_in_outputs()
+
     def validate_funds(self):
+        """
+        The inputs must cover the outputs. What they do not spend is the fee, which the miner of the block collects.
+        """
+        if any(tx_output["amount"] < 0 for tx_output in self.outputs):
+            print('Transaction output amount validation failed')
+            raise TransactionException(get_transaction_hash(self.transaction_data),
+                                       "Transaction output amounts cannot be negative")
         inputs_total = self.get_total_amount_in_inputs()
         outputs_total = self.get_total_amount_in_outputs()
         try:
-            assert inputs_total == outputs_total
+            assert inputs_total >= outputs_total
             self.is_funds_sufficient = True
         except AssertionError:
-            print('Transaction inputs and outputs did not match')
+            print('Transaction outputs exceed its inputs')
             raise TransactionException(f"inputs ({inputs_total}), outputs ({outputs_total})",
-                                       "Transaction inputs and outputs did not match")
+                                       "Transaction outputs exceed its inputs")
 
     def broadcast(self):
-        node_list = self.network.known_nodes
-        for node in node_list:
-            if node.hostname != self.network.node.hostname:
-                try:
-                    node.send_transaction(self.transaction_data)
-                except requests.ConnectionError:
-                    pass
+        self.network.announce(TRANSACTION, get_transaction_hash(self.transaction_data),
+                              {"transaction": self.transaction_data})
 
     def store(self):
         if self.is_valid and self.is_funds_sufficient:
-            current_transactions = get_transactions_from_memory()
-            current_transactions.append(self.transaction_data)
-            store_transactions_in_memory(current_transactions)
\ No newline at end of file
+            self.mem_pool.add(self.transaction_data)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import hashlib
+import multiprocessing
+import os
+import time
+
+from block.block_header import BlockHeader
+from common.constants import NUMBER_OF_LEADING_ZEROS
+from common.metrics import counter, gauge
+
+MAX_NONCE = 2 ** 64 - 1
+NONCE_CHUNK_SIZE = 100000
+CANCEL_CHECK_INTERVAL = 5000
+
+POW_HASHES = counter("node_pow_hashes_total", "Block header hashes computed while mining.")
+POW_HASH_RATE = gauge("node_pow_hash_rate", "Hashes per second of all workers during the last nonce search.")
+
+_found_event = None
+_cancel_event = None
+
+
+def _initialize_worker(found_event, cancel_event):
+    global _found_event, _cancel_event
+    _found_event = found_event
+    _cancel_event = cancel_event
+
+
+def search_nonce(prefix: bytes, starting_zeros: str, worker_id: int, number_of_workers: int, start_nonce: int) -> tuple:
+    """
+    Searches the chunks of the nonce space assigned to this worker: chunk k of the round r starts at
+    start_nonce + (r * number_of_workers + worker_id) * NONCE_CHUNK_SIZE. The header prefix is hashed once and only
+    the nonce suffix is fed to a copy of that hash state for each attempt.
+    Returns (worker_id, nonce or None, number of hashes, elapsed seconds).
+    """
+    prefix_hash = hashlib.sha256(prefix)
+    hashes = 0
+    start_time = time.perf_counter()
+    chunk_start = start_nonce + worker_id * NONCE_CHUNK_SIZE
+    while chunk_start <= MAX_NONCE:
+        chunk_stop = min(chunk_start + NONCE_CHUNK_SIZE, MAX_NONCE + 1)
+        for nonce in range(chunk_start, chunk_stop):
+            nonce_hash = prefix_hash.copy()
+            nonce_hash.update(BlockHeader.serialize_nonce(nonce))
+            hashes = hashes + 1
+            if nonce_hash.hexdigest().startswith(starting_zeros):
+                _found_event.set()
+                return worker_id, nonce, hashes, time.perf_counter() - start_time
+            if hashes % CANCEL_CHECK_INTERVAL == 0 and (_found_event.is_set() or _cancel_event.is_set()):
+                return worker_id, None, hashes, time.perf_counter() - start_time
+        chunk_start = chunk_start + number_of_workers * NONCE_CHUNK_SIZE
+    return worker_id, None, hashes, time.perf_counter() - start_time
+
+
+class ParallelMiner:
+    """
+    Splits the nonce search of a block header across a pool of worker processes. The search stops as soon as one
+    worker finds a valid nonce or cancel is called (e.g. when a new tip arrives). The pool is started on the first
+    search and kept for the next ones until close is called, e.g. on leaving a with block.
+    """
+
+    def __init__(self, number_of_workers: int = None):
+        self.number_of_workers = number_of_workers if number_of_workers else os.cpu_count()
+        self.found_event = multiprocessing.Event()
+        self.cancel_event = multiprocessing.Event()
+        self.pool = None
+        self.hash_rates = {}
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(processes=self.number_of_workers,
+                                             initializer=_initialize_worker,
+                                             initargs=(self.found_event, self.cancel_event))
+        return self.pool
+
+    def get_nonce(self, block_header: BlockHeader) -> int:
+        """
+        Returns a nonce giving a hash with NUMBER_OF_LEADING_ZEROS leading zeros, or None if the search was cancelled
+        or the nonce space is exhausted. A cancelled miner stays cancelled until reset is called.
+        """
+        pool = self._get_pool()
+        self.found_event.clear()
+        prefix = block_header.get_serialized_prefix()
+        starting_zeros = "0" * NUMBER_OF_LEADING_ZEROS
+        async_results = [
+            pool.apply_async(search_nonce, (prefix, starting_zeros, worker_id, self.number_of_workers,
+                                            block_header.nonce + 1))
+            for worker_id in range(self.number_of_workers)
+        ]
+        found_nonce = None
+        self.hash_rates = {}
+        for async_result in async_results:
+            worker_id, nonce, hashes, elapsed = async_result.get()
+            self.hash_rates[worker_id] = hashes / elapsed if elapsed else 0.0
+            POW_HASHES.inc(hashes)
+            if nonce is not None and found_nonce is None:
+                found_nonce = nonce
+        POW_HASH_RATE.set(self.total_hash_rate)
+        return found_nonce
+
+    @property
+    def total_hash_rate(self) -> float:
+        return sum(self.hash_rates.values())
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def reset(self):
+        self.cancel_event.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+from common.constants import KNOWN_NODES_FILE
+from common.metrics import DISK_BYTES_WRITTEN
+
+PEER_FLUSH_INTERVAL = 30
+LATENCY_SMOOTHING = 0.2
+DEFAULT_LATENCY = 1.0
+MAX_PEER_FAILURES = 3
+PEER_RETRY_INTERVAL = 300
+
+
+class Peer:
+    def __init__(self, hostname: str, latency: float = None, number_of_failures: int = 0):
+        self.hostname = hostname
+        self.latency = latency
+        self.number_of_failures = number_of_failures
+        self.last_failure_time = None
+
+    @property
+    def score(self) -> float:
+        """
+        Expected cost of a request to the peer, lower is better: its smoothed latency, penalized for each
+        consecutive failure.
+        """
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return latency * (1 + self.number_of_failures) ** 2
+
+    @property
+    def is_reachable(self) -> bool:
+        if self.number_of_failures < MAX_PEER_FAILURES or self.last_failure_time is None:
+            return True
+        return time.monotonic() - self.last_failure_time > PEER_RETRY_INTERVAL
+
+    @property
+    def to_dict(self) -> dict:
+        return {"hostname": self.hostname, "latency": self.latency, "number_of_failures": self.number_of_failures}
+
+
+class PeerTable:
+    """
+    Known nodes of the network, kept in memory by hostname and ranked by score. The latency and failures of each peer
+    are recorded by Node after every request. The table is written to the known nodes file by a background thread
+    every PEER_FLUSH_INTERVAL seconds when it changed, instead of on every update.
+    Peers that failed MAX_PEER_FAILURES times in a row are left out of get_hostnames for PEER_RETRY_INTERVAL seconds.
+    """
+
+    def __init__(self, filename: str = KNOWN_NODES_FILE, flush_interval: float = PEER_FLUSH_INTERVAL):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.peers = {}
+        self.is_dirty = False
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.load()
+
+    def __contains__(self, hostname: str) -> bool:
+        return hostname in self.peers
+
+    def __len__(self) -> int:
+        return len(self.peers)
+
+    def load(self):
+        try:
+            with open(self.filename) as file_obj:
+                peer_dicts = json.load(file_obj)
+        except (FileNotFoundError, ValueError):
+            peer_dicts = []
+        with self.lock:
+            for peer_dict in peer_dicts:
+                self.peers[peer_dict["hostname"]] = Peer(peer_dict["hostname"], peer_dict.get("latency"),
+                                                         peer_dict.get("number_of_failures", 0))
+
+    def add(self, hostname: str) -> bool:
+        """
+        Returns True if the hostname was not known yet.
+        """
+        with self.lock:
+            if hostname in self.peers:
+                return False
+            print(f"Storing new node: {hostname}")
+            self.peers[hostname] = Peer(hostname)
+            self.is_dirty = True
+            return True
+
+    def record_success(self, hostname: str, latency: float):
+        with self.lock:
+            peer = self.peers.get(hostname)
+            if peer is None:
+                return
+            if peer.latency is None:
+                peer.latency = latency
+            else:
+                peer.latency = (1 - LATENCY_SMOOTHING) * peer.latency + LATENCY_SMOOTHING * latency
+            peer.number_of_failures = 0
+            self.is_dirty = True
+
+    def record_failure(self, hostname: str):
+        with self.lock:
+            peer = self.peers.get(hostname)
+            if peer is None:
+                return
+            peer.number_of_failures = peer.number_of_failures + 1
+            peer.last_failure_time = time.monotonic()
+            self.is_dirty = True
+
+    def get_hostnames(self, include_unreachable: bool = False) -> list:
+        """
+        Returns the hostnames of the peers, best score first.
+        """
+        with self.lock:
+            peers = [peer for peer in self.peers.values() if include_unreachable or peer.is_reachable]
+        return [peer.hostname for peer in sorted(peers, key=lambda peer: peer.score)]
+
+    @property
+    def to_dict(self) -> list:
+        with self.lock:
+            return [peer.to_dict for peer in self.peers.values()]
+
+    def flush(self):
+        with self.lock:
+            if not self.is_dirty:
+                return
+            self.is_dirty = False
+            text = json.dumps([peer.to_dict for peer in self.peers.values()])
+        temporary_filename = f"{self.filename}.tmp"
+        with open(temporary_filename, "w") as file_obj:
+            file_obj.write(text)
+        os.replace(temporary_filename, self.filename)
+        DISK_BYTES_WRITTEN.inc(len(text), file="known_nodes")
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="peer-table-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,53 @@
+import hashlib
+import math
+
+ROLLING_FILTER_CAPACITY = 50000
+ROLLING_FILTER_FALSE_POSITIVE_RATE = 0.000001
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.number_of_bits = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.number_of_hashes = max(1, round(self.number_of_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.number_of_bits + 7) // 8)
+        self.number_of_items = 0
+
+    def _get_positions(self, item: str) -> list:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "big")
+        second_hash = int.from_bytes(digest[8:], "big") | 1
+        return [(first_hash + index * second_hash) % self.number_of_bits for index in range(self.number_of_hashes)]
+
+    def add(self, item: str):
+        for position in self._get_positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.number_of_items = self.number_of_items + 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._get_positions(item))
+
+
+class RollingFilter:
+    """
+    Remembers roughly the last `capacity` items added, in constant memory. Items go to the current of two bloom
+    filters; when it holds half the capacity it replaces the previous one, which is forgotten. Lookups may return
+    false positives at about the given rate, never false negatives for recent items.
+    """
+
+    def __init__(self, capacity: int = ROLLING_FILTER_CAPACITY,
+                 false_positive_rate: float = ROLLING_FILTER_FALSE_POSITIVE_RATE):
+        self.generation_size = max(1, capacity // 2)
+        self.false_positive_rate = false_positive_rate
+        self.current = BloomFilter(self.generation_size, false_positive_rate / 2)
+        self.previous = None
+
+    def add(self, item: str):
+        if item in self:
+            return
+        if self.current.number_of_items >= self.generation_size:
+            self.previous = self.current
+            self.current = BloomFilter(self.generation_size, self.false_positive_rate / 2)
+        self.current.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.current or (self.previous is not None and item in self.previous)
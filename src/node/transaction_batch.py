@@ -0,0 +1,115 @@
+from block.chain_state import ChainState
+from block.utxo_set import UTXOView, get_transaction_hash
+from common.serialization import SerializationException
+from contract.signature_verifier import SignatureVerifier, signature_verifier as default_signature_verifier
+from node.broadcaster import TRANSACTION
+from node.network import Network
+from node.node_transaction import NodeTransaction
+from transaction.transaction_exception import TransactionException
+
+MAX_BATCH_SIZE = 1000
+
+ACCEPTED = "accepted"
+KNOWN = "known"
+REJECTED = "rejected"
+
+
+class TransactionBatch:
+    """
+    Validates a batch of transactions against one chain tip and UTXO set, in batch order, then adds the valid ones to
+    the mem pool in one journal write and announces them, in batch order. A transaction can spend the outputs of a
+    mem pool transaction or of an earlier transaction of the batch: blocks are validated the same way, so a template
+    holding both is valid. The signatures of the whole batch are verified together.
+    If one of them is invalid, its transaction is rejected and the rest of the batch is validated again, since the
+    transactions spending its outputs are now invalid too.
+    """
+
+    def __init__(self, chain_state: ChainState, network: Network, signature_verifier: SignatureVerifier = None):
+        self.chain_state = chain_state
+        self.network = network
+        self.signature_verifier = signature_verifier if signature_verifier else default_signature_verifier
+
+    def submit(self, transactions: list) -> list:
+        """
+        Returns one {"transaction_hash", "status", "error"} result per transaction, in batch order. The status is
+        accepted, known (already in the mem pool) or rejected, with the reason in error.
+        """
+        if len(transactions) > MAX_BATCH_SIZE:
+            raise TransactionException(len(transactions), f"Batches are limited to {MAX_BATCH_SIZE} transactions")
+        with self.chain_state.lock:
+            results = [None] * len(transactions)
+            remaining_indexes = list(range(len(transactions)))
+            while True:
+                accepted_indexes, invalid_signature_indexes = self._validate(transactions, remaining_indexes, results)
+                if not invalid_signature_indexes:
+                    break
+                for index in invalid_signature_indexes:
+                    results[index] = self._get_result(transactions[index], REJECTED,
+                                                      "Transaction signature validation failed")
+                remaining_indexes = [index for index in remaining_indexes if results[index] is None]
+            accepted_transactions = [transactions[index] for index in accepted_indexes]
+            self.chain_state.mem_pool.add_transactions(accepted_transactions)
+            for index in accepted_indexes:
+                results[index] = self._get_result(transactions[index], ACCEPTED)
+        for transaction in accepted_transactions:
+            self.network.announce(TRANSACTION, get_transaction_hash(transaction), {"transaction": transaction})
+        return results
+
+    def _validate(self, transactions: list, indexes: list, results: list) -> (list, list):
+        """
+        Validates the transactions at the given indexes, sets the result of the known and invalid ones and returns
+        the indexes of the valid ones and of the ones whose signature is invalid.
+        """
+        utxo_view = UTXOView(self.chain_state.utxo_set, self.chain_state.mem_pool)
+        batch_transaction_hashes = set()
+        valid_indexes = []
+        valid_transaction_validations = []
+        signature_checks = []
+        signature_check_indexes = []
+        for index in indexes:
+            transaction = transactions[index]
+            try:
+                transaction_validation = NodeTransaction(self.chain_state.tip, self.network, utxo_view,
+                                                         mem_pool=self.chain_state.mem_pool)
+                transaction_validation.receive(transaction=transaction)
+                transaction_hash = transaction_validation.validate_transaction_hash()
+                if not transaction_validation.is_new:
+                    results[index] = self._get_result(transaction, KNOWN)
+                    continue
+                if transaction_hash in batch_transaction_hashes:
+                    raise TransactionException(transaction_hash, "Transaction is already in the batch")
+                transaction_validation.validate_double_spend()
+                transaction_signature_checks = []
+                transaction_validation.validate(transaction_signature_checks)
+                transaction_validation.validate_funds()
+            except (TransactionException, SerializationException) as exception:
+                results[index] = self._get_result(transaction, REJECTED, exception.message)
+                continue
+            except (KeyError, TypeError) as exception:
+                results[index] = self._get_result(transaction, REJECTED, f"Malformed transaction: {exception}")
+                continue
+            batch_transaction_hashes.add(transaction_hash)
+            utxo_view.add_transaction(transaction)
+            valid_indexes.append(index)
+            valid_transaction_validations.append(transaction_validation)
+            signature_checks.extend(signature_check for _, signature_check in transaction_signature_checks)
+            signature_check_indexes.extend([index] * len(transaction_signature_checks))
+        signature_results = self.signature_verifier.verify(signature_checks)
+        if all(signature_results):
+            for transaction_validation in valid_transaction_validations:
+                transaction_validation.cache_verified_scripts()
+            return valid_indexes, []
+        invalid_signature_indexes = sorted({index for index, result in zip(signature_check_indexes, signature_results)
+                                            if result is False})
+        return valid_indexes, invalid_signature_indexes
+
+    @staticmethod
+    def _get_result(transaction: dict, status: str, error: str = None) -> dict:
+        try:
+            transaction_hash = get_transaction_hash(transaction)
+        except (SerializationException, KeyError, TypeError):
+            transaction_hash = None
+        result = {"transaction_hash": transaction_hash, "status": status}
+        if error is not None:
+            result["error"] = error
+        return result
@@ -1,9 +1,8 @@
 import binascii
-import json
 
 from Crypto.Hash import SHA256
 from Crypto.Signature import pkcs1_15
-from common.utils import calculate_hash
+from common.serialization import encode_transaction, get_transaction_id
 from transaction.transaction_input import TransactionInput
 from transaction.transaction_output import TransactionOutput
 from wallet.owner import Owner
@@ -20,13 +19,12 @@ class Transaction:
             "inputs": [i.to_dict() for i in self.inputs],
             "outputs": [i.to_dict() for i in self.outputs]
         }
-        transaction_bytes = json.dumps(transaction_data, indent=2)
-        return calculate_hash(transaction_bytes)
+        return get_transaction_id(transaction_data)
 
     def sign_transaction_data(self, owner):
         transaction_dict = {"inputs": [tx_input.to_dict(with_unlocking_script=False) for tx_input in self.inputs],
                             "outputs": [tx_output.to_dict() for tx_output in self.outputs]}
-        transaction_bytes = json.dumps(transaction_dict, indent=2).encode('utf-8')
+        transaction_bytes = encode_transaction(transaction_dict, with_unlocking_scripts=False)
         hash_object = SHA256.new(transaction_bytes)
         signature = pkcs1_15.new(owner.private_key).sign(hash_object)
         return signature
@@ -16,3 +16,18 @@ class TransactionOutput:
             "amount": self.amount,
             "locking_script": self.locking_script
         }
+
+
+# A data output carries data after OP_RETURN in its locking script instead of a receiver address. It can never be
+# spent, so it is not kept in the UTXO set. Coinbase transactions use one to commit the block height.
+OP_RETURN = "OP_RETURN"
+
+
+class DataOutput(TransactionOutput):
+    def __init__(self, data: str):
+        self.amount = 0
+        self.locking_script = f"{OP_RETURN} {data}"
+
+
+def is_data_output(output: dict) -> bool:
+    return output["locking_script"].split(" ", 1)[0] == OP_RETURN
@@ -0,0 +1,36 @@
+import binascii
+import functools
+
+from Crypto.PublicKey import RSA
+
+from common.utils import calculate_hash
+
+KEY_CACHE_SIZE = 256
+PUBLIC_KEY_HASH_CACHE_SIZE = 4096
+RSA_KEY_SIZE = 2048
+
+# Parsed keys and the values derived from them, cached by key material: importing an RSA key and hashing a public
+# key are done once per key for the whole process, however many Owner objects or scripts use it.
+
+
+def generate_private_key() -> bytes:
+    return RSA.generate(RSA_KEY_SIZE).export_key("DER")
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def import_private_key(private_key: bytes) -> RSA.RsaKey:
+    return RSA.import_key(private_key)
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def get_public_key_hex(private_key: bytes) -> str:
+    public_key = import_private_key(private_key).publickey().export_key("DER")
+    return binascii.hexlify(public_key).decode("utf-8")
+
+
+@functools.lru_cache(maxsize=PUBLIC_KEY_HASH_CACHE_SIZE)
+def get_public_key_hash(public_key_hex: str) -> str:
+    """
+    RIPEMD-160 of the SHA-256 hex digest of the public key hex, as computed by OP_HASH160.
+    """
+    return calculate_hash(calculate_hash(public_key_hex, hash_function="sha256"), hash_function="ripemd160")
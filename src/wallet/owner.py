@@ -1,17 +1,31 @@
-import binascii
-
-import base58
 from Crypto.PublicKey import RSA
 
-from common.utils import calculate_hash
+from wallet.keystore import generate_private_key, get_public_key_hash, get_public_key_hex, import_private_key
+
 
 class Owner:
-    def __init__(self, private_key: str = ""):
-        if private_key:
-            self.private_key = RSA.importKey(private_key)
-        else:
-            self.private_key = RSA.generate(2048)
-        public_key = self.private_key.publickey().export_key("DER")
-        self.public_key_hex = binascii.hexlify(public_key).decode("utf-8")
-        self.public_key_hash = calculate_hash(calculate_hash(self.public_key_hex, hash_function="sha256"),
-                                              hash_function="ripemd160")
+    """
+    Key pair of a user. The private key is imported, or generated if none is given, on first use only, and the
+    public key and its hash are derived through the keystore caches.
+    """
+
+    def __init__(self, private_key: bytes = b""):
+        self._key_material = private_key
+
+    @property
+    def key_material(self) -> bytes:
+        if not self._key_material:
+            self._key_material = generate_private_key()
+        return self._key_material
+
+    @property
+    def private_key(self) -> RSA.RsaKey:
+        return import_private_key(self.key_material)
+
+    @property
+    def public_key_hex(self) -> str:
+        return get_public_key_hex(self.key_material)
+
+    @property
+    def public_key_hash(self) -> str:
+        return get_public_key_hash(self.public_key_hex)
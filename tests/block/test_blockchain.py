@@ -0,0 +1,99 @@
+import pytest
+
+from block.block import Block
+from block.block_header import BlockHeader
+from block.blockchain import Blockchain, NewBlockException, OrphanBlockException
+from block.chain_state import ChainState
+from common.constants import BLOCK_REWARD
+from conftest import FakeNetwork, GENESIS_COINBASE_HASH, albert, bertrand, camille, create_chain_state, \
+    create_coinbase, create_transaction, mine_block
+from node.block_template import BlockTemplate
+from node.proof_of_work import ProofOfWork
+from node.transaction_batch import ACCEPTED, TransactionBatch
+from transaction.transaction_exception import TransactionException
+
+
+def mine_block_content(chain_state: ChainState, transactions: list, previous_block_hash: str = None) -> dict:
+    previous_block_hash = previous_block_hash if previous_block_hash is not None else chain_state.tip.block_header.hash
+    block = mine_block(transactions + [create_coinbase(camille, BLOCK_REWARD)], previous_block_hash, 2.0)
+    return {"header": block.block_header.to_dict, "transactions": block.transactions}
+
+
+def test_given_block_with_parent_and_child_transactions_when_validating_then_block_is_added():
+    chain_state = create_chain_state()
+    parent = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    child = create_transaction(bertrand, parent["transaction_hash"], camille)
+    blockchain = Blockchain(chain_state, None)
+
+    blockchain.receive(mine_block_content(chain_state, [parent, child]))
+    blockchain.validate()
+    blockchain.add()
+
+    assert chain_state.height == 2
+    assert chain_state.utxo_set.get_output(parent["transaction_hash"], 0) is None
+    assert chain_state.utxo_set.get_output(child["transaction_hash"], 0)["amount"] == 40
+
+
+def test_given_block_spending_an_output_twice_when_validating_then_block_is_rejected():
+    chain_state = create_chain_state()
+    transactions = [create_transaction(albert, GENESIS_COINBASE_HASH, bertrand),
+                    create_transaction(albert, GENESIS_COINBASE_HASH, camille)]
+    blockchain = Blockchain(chain_state, None)
+    blockchain.receive(mine_block_content(chain_state, transactions))
+
+    with pytest.raises(TransactionException):
+        blockchain.validate()
+    assert chain_state.height == 1
+
+
+def test_given_orphan_block_when_receiving_then_it_is_kept_but_not_counted_as_known():
+    chain_state = create_chain_state()
+    block_content = mine_block_content(chain_state, [], previous_block_hash="2222")
+
+    with pytest.raises(OrphanBlockException):
+        Blockchain(chain_state, None).receive(block_content)
+    block_hash = BlockHeader(**block_content["header"]).hash
+    assert block_hash in chain_state.block_tree.orphans
+    assert not chain_state.has_block(block_hash)
+
+
+def test_given_orphan_block_with_wrong_merkle_root_when_receiving_then_it_is_not_kept():
+    chain_state = create_chain_state()
+    block_content = mine_block_content(chain_state, [], previous_block_hash="2222")
+    block_content["transactions"] = [create_transaction(albert, "2222", bertrand)]
+
+    with pytest.raises(NewBlockException) as exception_info:
+        Blockchain(chain_state, None).receive(block_content)
+    assert not isinstance(exception_info.value, OrphanBlockException)
+    assert len(chain_state.block_tree.orphans) == 0
+
+
+def test_given_transactions_paying_fees_when_mining_the_template_then_highest_fee_comes_first_and_is_collected():
+    albert_coinbase, bertrand_coinbase = create_coinbase(albert), create_coinbase(bertrand)
+    block_header = BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="")
+    chain_state = create_chain_state([Block(transactions=[albert_coinbase, bertrand_coinbase],
+                                            block_header=block_header)])
+    low_fee = create_transaction(albert, albert_coinbase["transaction_hash"], camille, amount=39.5)
+    high_fee = create_transaction(bertrand, bertrand_coinbase["transaction_hash"], camille, amount=38)
+    results = TransactionBatch(chain_state, FakeNetwork()).submit([low_fee, high_fee])
+    block_template = BlockTemplate(chain_state.utxo_set)
+    block_template.add_transactions(chain_state.mem_pool.transactions)
+    transactions, transaction_fees = block_template.select_transactions()
+    greedy_coinbase = ProofOfWork.get_coinbase_transaction(transaction_fees + 1, chain_state.height)
+    greedy_block = mine_block(transactions + [greedy_coinbase], chain_state.tip.block_header.hash, 2.0)
+    coinbase = ProofOfWork.get_coinbase_transaction(transaction_fees, chain_state.height)
+    block = mine_block(transactions + [coinbase], chain_state.tip.block_header.hash, 2.0)
+
+    assert [result["status"] for result in results] == [ACCEPTED, ACCEPTED]
+    assert [transaction["transaction_hash"] for transaction in transactions] == \
+        [high_fee["transaction_hash"], low_fee["transaction_hash"]]
+    assert transaction_fees == 2.5
+    blockchain = Blockchain(chain_state, FakeNetwork())
+    blockchain.receive({"header": greedy_block.block_header.to_dict, "transactions": greedy_block.transactions})
+    with pytest.raises(NewBlockException):
+        blockchain.validate()
+    blockchain = Blockchain(chain_state, FakeNetwork())
+    blockchain.receive({"header": block.block_header.to_dict, "transactions": block.transactions})
+    blockchain.validate()
+    blockchain.add()
+    assert chain_state.utxo_set.get_output(coinbase["transaction_hash"], 0)["amount"] == BLOCK_REWARD + 2.5
@@ -0,0 +1,112 @@
+import pytest
+
+import common.io_blockchain as io_blockchain
+from block.block import Block
+from block.block_header import BlockHeader
+from block.chain_state import ChainState
+from common.serialization import get_transaction_id
+from node.mem_pool import MemPool
+
+
+def make_transaction(inputs: list, amount: float) -> dict:
+    transaction = {"inputs": inputs, "outputs": [{"amount": amount, "locking_script": "OP_DUP"}]}
+    transaction["transaction_hash"] = get_transaction_id(transaction)
+    return transaction
+
+
+def make_block(previous_block: Block, transactions: list, timestamp: float = 1.0) -> Block:
+    previous_block_hash = previous_block.block_header.hash if previous_block else "1111"
+    block_header = BlockHeader(previous_block_hash=previous_block_hash, timestamp=timestamp, nonce=0,
+                               merkle_root="")
+    return Block(transactions=transactions, block_header=block_header, previous_block=previous_block)
+
+
+def test_given_side_branch_with_more_work_when_adding_it_then_chain_is_reorganized():
+    chain_state = ChainState(MemPool(persist=False))
+    coinbase = make_transaction([], 40)
+    genesis_block = make_block(None, [coinbase])
+    chain_state.add_block(genesis_block)
+    spending_transaction = make_transaction([{"transaction_hash": coinbase["transaction_hash"], "output_index": 0}],
+                                            40)
+    main_block = make_block(genesis_block, [make_transaction([], 1), spending_transaction])
+    chain_state.add_block(main_block)
+    side_block_1 = make_block(genesis_block, [make_transaction([], 2)], timestamp=2.0)
+    side_block_2 = make_block(side_block_1, [make_transaction([], 3)], timestamp=2.0)
+    validated_blocks = []
+
+    assert not chain_state.add_side_block(side_block_1, validated_blocks.append)
+    assert chain_state.tip == main_block
+    assert chain_state.add_side_block(side_block_2, validated_blocks.append)
+
+    assert validated_blocks == [side_block_1, side_block_2]
+    assert chain_state.tip == side_block_2
+    assert io_blockchain.get_block_hashes_from_memory() == [block.block_header.hash for block in
+                                                            (genesis_block, side_block_1, side_block_2)]
+    assert chain_state.utxo_set.get_output(coinbase["transaction_hash"], 0)["amount"] == 40
+    assert spending_transaction["transaction_hash"] in chain_state.mem_pool
+    assert chain_state.get_transaction(spending_transaction["transaction_hash"]) is None
+    assert chain_state.get_transaction(side_block_2.transactions[0]["transaction_hash"]) == side_block_2.transactions[0]
+    assert main_block.block_header.hash in chain_state.block_tree.side_blocks
+
+
+def test_given_invalid_side_branch_when_reorganizing_then_previous_chain_is_restored():
+    chain_state = ChainState(MemPool(persist=False))
+    genesis_block = make_block(None, [make_transaction([], 40)])
+    chain_state.add_block(genesis_block)
+    main_block = make_block(genesis_block, [make_transaction([], 1)])
+    chain_state.add_block(main_block)
+    side_block_1 = make_block(genesis_block, [make_transaction([], 2)], timestamp=2.0)
+    side_block_2 = make_block(side_block_1, [make_transaction([], 3)], timestamp=2.0)
+    chain_state.add_side_block(side_block_1, print)
+    utxo_set_before = chain_state.utxo_set.to_dict
+
+    def validate_block(block: Block):
+        raise ValueError(block.block_header.hash)
+
+    with pytest.raises(ValueError):
+        chain_state.add_side_block(side_block_2, validate_block)
+
+    assert chain_state.tip == main_block
+    assert chain_state.utxo_set.to_dict == utxo_set_before
+    assert side_block_1.block_header.hash not in chain_state.block_tree
+
+
+def test_given_stored_chain_when_loading_then_transactions_are_found_by_hash_including_genesis():
+    chain_state = ChainState(MemPool(persist=False))
+    genesis_block = make_block(None, [make_transaction([], 40)])
+    chain_state.add_block(genesis_block)
+    block = make_block(genesis_block, [make_transaction([], 1), make_transaction([], 2)])
+    chain_state.add_block(block)
+
+    reloaded_chain_state = ChainState(MemPool(persist=False))
+    transaction_hash = block.transactions[1]["transaction_hash"]
+
+    assert reloaded_chain_state.transaction_index.get_position(transaction_hash) == (1, 1)
+    assert reloaded_chain_state.get_transaction(genesis_block.transactions[0]["transaction_hash"]) is not None
+    assert reloaded_chain_state.get_block_by_hash(block.block_header.hash) == block
+    assert block.get_transaction(genesis_block.transactions[0]["transaction_hash"]) == genesis_block.transactions[0]
+
+
+def test_given_block_store_changed_by_another_process_when_refreshing_then_chain_is_reloaded():
+    chain_state = ChainState(MemPool(persist=False))
+    genesis_block = make_block(None, [make_transaction([], 40)])
+    chain_state.add_block(genesis_block)
+    other_chain_state = ChainState(MemPool(persist=False))
+    block = make_block(genesis_block, [make_transaction([], 1)])
+    other_chain_state.add_block(block)
+
+    assert chain_state.is_stale
+    chain_state.refresh()
+
+    assert not chain_state.is_stale
+    assert chain_state.tip == block
+    assert chain_state.utxo_set.to_dict == other_chain_state.utxo_set.to_dict
+
+
+def test_given_header_with_block_hash_when_received_then_hash_cannot_be_chosen_by_the_sender():
+    block_header = BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="")
+    header_dict = dict(block_header.to_dict, block_hash="0" * 64)
+
+    with pytest.raises(TypeError):
+        BlockHeader(**header_dict)
+    assert BlockHeader.from_block_store(block_header.to_dict, block_header.hash) == block_header
@@ -0,0 +1,112 @@
+import pytest
+
+import common.io_utxo_set as io_utxo_set
+from block.block import Block
+from block.block_header import BlockHeader
+from block.utxo_set import UTXOSet
+
+
+def make_block(transactions: list, previous_block: Block = None) -> Block:
+    previous_block_hash = previous_block.block_header.hash if previous_block else "1111"
+    block_header = BlockHeader(previous_block_hash=previous_block_hash, timestamp=1.0, nonce=0, merkle_root="")
+    return Block(transactions=transactions, block_header=block_header, previous_block=previous_block)
+
+
+def make_output(public_key_hash: str, amount: float) -> dict:
+    return {"amount": amount, "locking_script": f"OP_DUP OP_HASH160 {public_key_hash} OP_EQUAL_VERIFY OP_CHECKSIG"}
+
+
+def make_chain() -> (Block, Block):
+    block_0 = make_block([{"inputs": [], "outputs": [make_output("albert", 40)], "transaction_hash": "tx0"}])
+    block_1 = make_block([{"inputs": [{"transaction_hash": "tx0", "output_index": 0}],
+                           "outputs": [make_output("bertrand", 30), make_output("albert", 10)],
+                           "transaction_hash": "tx1"}], previous_block=block_0)
+    return block_0, block_1
+
+
+def test_given_a_chain_when_building_utxo_set_then_spent_outputs_are_removed():
+    _, block_1 = make_chain()
+    utxo_set = UTXOSet.from_blockchain(block_1)
+
+    assert utxo_set.get_output("tx0", 0) is None
+    assert utxo_set.get_output("tx1", 0)["amount"] == 30
+    assert utxo_set.tip_hash == block_1.block_header.hash
+
+
+def test_given_a_chain_when_getting_user_utxos_then_only_unspent_outputs_are_counted():
+    _, block_1 = make_chain()
+    utxo_set = UTXOSet.from_blockchain(block_1)
+
+    assert utxo_set.get_user_utxos("albert") == {
+        "user": "albert",
+        "total": 10,
+        "utxos": [{"amount": 10, "transaction_hash": "tx1", "output_index": 1}]
+    }
+
+
+def test_given_a_connected_block_when_disconnecting_it_then_utxo_set_is_rolled_back():
+    block_0, block_1 = make_chain()
+    utxo_set = UTXOSet.from_blockchain(block_0)
+    utxo_set_before = utxo_set.to_dict
+    utxo_set.connect_block(block_1)
+    utxo_set.disconnect_block(block_1)
+
+    assert utxo_set.to_dict == utxo_set_before
+    assert utxo_set.get_user_utxos("albert")["total"] == 40
+    assert utxo_set.get_user_utxos("bertrand")["total"] == 0
+
+
+def test_given_block_spending_a_missing_or_already_spent_output_when_connecting_it_then_set_is_unchanged():
+    block_0, block_1 = make_chain()
+    utxo_set = UTXOSet.from_blockchain(block_1)
+    utxo_set_before = utxo_set.to_dict
+    double_spend = make_block([{"inputs": [{"transaction_hash": "tx1", "output_index": 0}],
+                                "outputs": [make_output("camille", 30)], "transaction_hash": "tx2"},
+                               {"inputs": [{"transaction_hash": "tx1", "output_index": 0}],
+                                "outputs": [make_output("albert", 30)], "transaction_hash": "tx3"}], block_1)
+
+    with pytest.raises(ValueError):
+        utxo_set.connect_block(make_block([{"inputs": [{"transaction_hash": "tx0", "output_index": 0}],
+                                            "outputs": [], "transaction_hash": "tx2"}], block_1))
+    with pytest.raises(ValueError):
+        utxo_set.connect_block(double_spend)
+    assert utxo_set.to_dict == utxo_set_before
+
+
+def test_given_stored_set_when_connecting_blocks_then_only_changes_are_appended_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(io_utxo_set, "FILENAME", str(tmp_path / "utxo_set"))
+    block_0, block_1 = make_chain()
+    utxo_set = UTXOSet.from_blockchain(block_0)
+    io_utxo_set.store_utxo_set_in_memory(utxo_set)
+    snapshot = (tmp_path / "utxo_set").read_bytes()
+    utxo_set.connect_block(block_1)
+    io_utxo_set.store_utxo_set_changes_in_memory(utxo_set)
+
+    assert (tmp_path / "utxo_set").read_bytes() == snapshot
+    assert io_utxo_set.get_utxo_set_from_memory(block_1).to_dict == utxo_set.to_dict
+    assert (tmp_path / "utxo_set").read_bytes() == snapshot
+
+
+def test_given_two_blocks_mined_by_the_same_owner_when_connecting_and_disconnecting_them_then_both_coinbases_count():
+    coinbases = [{"inputs": [], "outputs": [make_output("miner", 6.25),
+                                            {"amount": 0, "locking_script": f"OP_RETURN {height}"}]}
+                 for height in range(2)]
+    block_0 = make_block([coinbases[0]])
+    block_1 = make_block([coinbases[1]], previous_block=block_0)
+    utxo_set = UTXOSet.from_blockchain(block_1)
+
+    assert len(utxo_set) == 2
+    assert utxo_set.get_user_utxos("miner")["total"] == 12.5
+    utxo_set.disconnect_block(block_1)
+    assert len(utxo_set) == 1
+    assert utxo_set.get_user_utxos("miner")["total"] == 6.25
+
+
+def test_given_transaction_with_the_hash_of_unspent_outputs_when_connecting_it_then_exception_is_raised():
+    block_0 = make_block([{"inputs": [], "outputs": [make_output("miner", 6.25)]}])
+    utxo_set = UTXOSet.from_blockchain(block_0)
+
+    with pytest.raises(ValueError):
+        utxo_set.connect_block(make_block([{"inputs": [], "outputs": [make_output("miner", 6.25)]}], block_0))
+    assert len(utxo_set) == 1
+    assert utxo_set.tip_hash == block_0.block_header.hash
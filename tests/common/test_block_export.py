@@ -0,0 +1,39 @@
+import json
+
+from block.block import Block
+from block.block_header import BlockHeader
+from common.block_export import decode_blocks_binary, iterate_blocks_binary, iterate_blocks_json, \
+    iterate_blocks_ndjson
+from common.serialization import get_transaction_id
+
+
+def make_blocks(length: int) -> list:
+    blocks = []
+    for nonce in range(length):
+        previous_block_hash = blocks[-1].block_header.hash if blocks else "1111"
+        block_header = BlockHeader(previous_block_hash=previous_block_hash, timestamp=1.0, nonce=nonce,
+                                   merkle_root="")
+        transaction = {"inputs": [], "outputs": [{"amount": nonce, "locking_script": "OP_DUP"}]}
+        transaction["transaction_hash"] = get_transaction_id(transaction)
+        blocks.append(Block(transactions=[transaction], block_header=block_header))
+    return blocks
+
+
+def test_given_blocks_when_exporting_as_json_or_ndjson_then_each_block_is_a_json_object():
+    blocks = make_blocks(3)
+    expected_block_dicts = [{"header": block.block_header.to_dict, "transactions": block.transactions}
+                            for block in blocks]
+
+    assert json.loads("".join(iterate_blocks_json(blocks))) == expected_block_dicts
+    assert json.loads("".join(iterate_blocks_json([]))) == []
+    assert [json.loads(line) for line in iterate_blocks_ndjson(blocks)] == expected_block_dicts
+
+
+def test_given_blocks_when_exporting_as_binary_then_blocks_are_decoded_back():
+    blocks = make_blocks(3)
+
+    block_dicts = decode_blocks_binary(b"".join(iterate_blocks_binary(blocks)))
+
+    assert [BlockHeader(**block_dict["header"]).get_hash() for block_dict in block_dicts] == \
+        [block.block_header.hash for block in blocks]
+    assert [block_dict["transactions"] for block_dict in block_dicts] == [block.transactions for block in blocks]
@@ -0,0 +1,56 @@
+import json
+
+import common.io_blockchain as io_blockchain
+from block.block import Block
+from block.block_header import BlockHeader
+from common.serialization import get_transaction_id
+from init_blockchain import get_initial_blockchain
+from node.merkle_tree import get_merkle_root
+
+
+def make_chain(length: int) -> Block:
+    block = None
+    for nonce in range(length):
+        previous_block_hash = block.block_header.hash if block else "1111"
+        block_header = BlockHeader(previous_block_hash=previous_block_hash, timestamp=1.0, nonce=nonce,
+                                   merkle_root="")
+        transaction = {"inputs": [], "outputs": [{"amount": nonce, "locking_script": "OP_DUP"}]}
+        transaction["transaction_hash"] = get_transaction_id(transaction)
+        block = Block(transactions=[transaction], block_header=block_header, previous_block=block)
+    return block
+
+
+def test_given_stored_blockchain_when_reading_single_block_then_it_matches_the_block_at_that_height():
+    blockchain = make_chain(5)
+    io_blockchain.store_blockchain_in_memory(blockchain)
+
+    assert io_blockchain.get_blockchain_height() == 5
+    assert io_blockchain.get_block_from_memory(3) == blockchain.previous_block
+    assert io_blockchain.get_block_by_hash_from_memory(blockchain.block_header.hash) == blockchain
+    assert io_blockchain.get_blockchain_from_memory() == blockchain
+
+
+def test_given_stored_blockchain_when_storing_a_fork_then_blocks_after_the_fork_point_are_replaced():
+    blockchain = make_chain(5)
+    io_blockchain.store_blockchain_in_memory(blockchain)
+    fork = blockchain.previous_block.previous_block
+    for nonce in range(2):
+        block_header = BlockHeader(previous_block_hash=fork.block_header.hash, timestamp=2.0, nonce=nonce,
+                                   merkle_root="")
+        fork = Block(transactions=[], block_header=block_header, previous_block=fork)
+    io_blockchain.store_blockchain_in_memory(fork)
+
+    assert io_blockchain.get_blockchain_height() == 5
+    assert io_blockchain.get_blockchain_from_memory() == fork
+    assert len(io_blockchain.get_blockchain_from_memory()) == 5
+
+
+def test_given_tracked_legacy_blockchain_file_when_migrating_it_then_it_is_the_initial_chain():
+    with open("src/doc/blockchain", "rb") as file_obj:
+        legacy_block_list = json.loads(file_obj.read())
+    io_blockchain.store_blockchain_dict_in_memory(legacy_block_list)
+
+    assert legacy_block_list == get_initial_blockchain().to_dict
+    assert io_blockchain.get_blockchain_from_memory() == get_initial_blockchain()
+    for block_dict in legacy_block_list:
+        assert block_dict["header"]["merkle_root"] == get_merkle_root(block_dict["transactions"])
@@ -0,0 +1,43 @@
+import pytest
+
+from common.metrics import Metric, MetricsRegistry
+
+
+def test_given_observed_values_when_rendering_histogram_then_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test durations.", ("peer",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, peer="a")
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP test_seconds Test durations.", "# TYPE test_seconds histogram"]
+    assert lines[2:5] == ['test_seconds_bucket{peer="a",le="0.1"} 1', 'test_seconds_bucket{peer="a",le="1.0"} 2',
+                          'test_seconds_bucket{peer="a",le="+Inf"} 3']
+    assert lines[5:] == ['test_seconds_sum{peer="a"} 2.55', 'test_seconds_count{peer="a"} 3']
+
+
+def test_given_counter_and_gauge_when_rendering_then_values_are_listed_by_label():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test counter.", ("file",))
+    counter.inc(10, file="blocks")
+    counter.inc(5, file="blocks")
+    registry.gauge("test_size", "Test gauge.").set_function(lambda: 3)
+
+    rendered = registry.render()
+
+    assert 'test_total{file="blocks"} 15' in rendered
+    assert "test_size 3" in rendered
+    assert registry.counter("test_total", "Test counter.", ("file",)) is counter
+
+
+def test_given_registered_metric_when_declaring_it_again_with_other_labels_or_type_then_exception_is_raised():
+    registry = MetricsRegistry()
+    registry.histogram("test_seconds", "Test durations.")
+
+    with pytest.raises(ValueError):
+        registry.histogram("test_seconds", "Test durations.", ("template",))
+    with pytest.raises(ValueError):
+        registry.counter("test_seconds", "Test durations.")
+    with pytest.raises(TypeError):
+        Metric("test_metric", "Test metric.")
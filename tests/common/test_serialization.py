@@ -0,0 +1,45 @@
+import pytest
+
+from block.block import Block
+from block.block_header import BlockHeader
+from common.serialization import SerializationException, decode_block, encode_transaction, get_transaction_id
+
+
+def make_transaction() -> dict:
+    transaction = {"inputs": [{"transaction_hash": "ab" * 32, "output_index": 1, "unlocking_script": "sig pub"}],
+                   "outputs": [{"amount": 6.25, "locking_script": "OP_DUP OP_HASH160 abc OP_EQUAL_VERIFY OP_CHECKSIG"}]}
+    transaction["transaction_hash"] = get_transaction_id(transaction)
+    return transaction
+
+
+def test_given_transaction_when_reordering_keys_or_changing_unlocking_script_then_transaction_id_is_unchanged():
+    transaction = make_transaction()
+    reordered_transaction = {"outputs": [{"locking_script": output["locking_script"], "amount": output["amount"]}
+                                         for output in transaction["outputs"]],
+                             "inputs": [{"unlocking_script": "other sig", "output_index": 1,
+                                         "transaction_hash": "ab" * 32}]}
+
+    assert get_transaction_id(reordered_transaction) == transaction["transaction_hash"]
+    assert encode_transaction(reordered_transaction) != encode_transaction(transaction)
+
+
+def test_given_block_when_encoding_and_decoding_then_block_is_unchanged():
+    block_header = BlockHeader(previous_block_hash="cd" * 32, timestamp=1700000000.5, nonce=2 ** 40, merkle_root="")
+    block = Block(transactions=[make_transaction()], block_header=block_header)
+
+    block_dict = decode_block(block.serialize())
+
+    assert block_dict["transactions"] == block.transactions
+    assert BlockHeader(**block_dict["header"]) == block_header
+    assert block_header.serialize().endswith(BlockHeader.serialize_nonce(2 ** 40))
+
+
+def test_given_fields_of_the_wrong_type_when_encoding_then_serialization_exception_is_raised():
+    transaction = make_transaction()
+
+    with pytest.raises(SerializationException):
+        encode_transaction(dict(transaction, inputs=[dict(transaction["inputs"][0], transaction_hash="not hex")]))
+    with pytest.raises(SerializationException):
+        encode_transaction(dict(transaction, outputs=[dict(transaction["outputs"][0], amount="6.25")]))
+    with pytest.raises(SerializationException):
+        BlockHeader(previous_block_hash="cd" * 32, timestamp=1700000000.5, nonce=1.5, merkle_root="")
@@ -0,0 +1,93 @@
+import pytest
+
+import common.io_blockchain as io_blockchain
+import common.io_transaction_index as io_transaction_index
+import common.io_utxo_set as io_utxo_set
+from block.block import Block
+from block.block_header import BlockHeader
+from block.chain_state import ChainState
+from blockchain_user.albert import private_key as albert_private_key
+from blockchain_user.bertrand import private_key as bertrand_private_key
+from blockchain_user.camille import private_key as camille_private_key
+from node.mem_pool import MemPool
+from node.merkle_tree import get_merkle_root
+from transaction.transaction import Transaction
+from transaction.transaction_input import TransactionInput
+from transaction.transaction_output import TransactionOutput
+from wallet.owner import Owner
+
+albert = Owner(private_key=albert_private_key)
+bertrand = Owner(private_key=bertrand_private_key)
+camille = Owner(private_key=camille_private_key)
+
+LOCAL_HOSTNAME = "127.0.0.1:5000"
+
+
+@pytest.fixture(autouse=True)
+def block_store(tmp_path, monkeypatch):
+    """
+    Stores the blocks, the UTXO set and the transaction index of every test in its own directory.
+    """
+    monkeypatch.setattr(io_blockchain, "DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(io_blockchain, "INDEX_FILENAME", str(tmp_path / "index"))
+    monkeypatch.setattr(io_blockchain, "LEGACY_FILENAME", str(tmp_path / "blockchain"))
+    monkeypatch.setattr(io_blockchain, "block_index", io_blockchain.BlockIndex())
+    monkeypatch.setattr(io_utxo_set, "FILENAME", str(tmp_path / "utxo_set"))
+    monkeypatch.setattr(io_transaction_index, "FILENAME", str(tmp_path / "transaction_index"))
+
+
+def create_coinbase(owner: Owner, amount: float = 40) -> dict:
+    return Transaction([], [TransactionOutput(public_key_hash=owner.public_key_hash, amount=amount)]).transaction_data
+
+
+GENESIS_COINBASE_HASH = create_coinbase(albert)["transaction_hash"]
+
+
+def create_chain_state(blocks: list = None) -> ChainState:
+    """
+    Returns a chain state holding the given blocks, by default a single block whose coinbase, GENESIS_COINBASE_HASH,
+    pays 40 to albert.
+    """
+    chain_state = ChainState(MemPool(persist=False))
+    if blocks is None:
+        block_header = BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="")
+        blocks = [Block(transactions=[create_coinbase(albert)], block_header=block_header)]
+    for block in blocks:
+        chain_state.add_block(block)
+    return chain_state
+
+
+def create_transaction(owner: Owner, transaction_hash: str, receiver: Owner, amount: float = 40) -> dict:
+    transaction = Transaction([TransactionInput(transaction_hash=transaction_hash, output_index=0)],
+                              [TransactionOutput(public_key_hash=receiver.public_key_hash, amount=amount)])
+    transaction.sign(owner)
+    return transaction.transaction_data
+
+
+def mine_block(transactions: list, previous_block_hash: str, timestamp: float) -> Block:
+    block_header = BlockHeader(previous_block_hash=previous_block_hash, timestamp=timestamp, nonce=0,
+                               merkle_root=get_merkle_root(transactions))
+    while not block_header.has_proof_of_work():
+        block_header.nonce = block_header.nonce + 1
+        block_header.hash = block_header.get_hash()
+    return Block(transactions=transactions, block_header=block_header)
+
+
+class FakeLocalNode:
+    def __init__(self, hostname: str = LOCAL_HOSTNAME):
+        self.hostname = hostname
+
+
+class FakeNetwork:
+    """
+    Network of the given nodes and of the local node, which records the announced hashes.
+    """
+
+    def __init__(self, known_nodes: list = (), node=None):
+        self.node = node if node is not None else FakeLocalNode()
+        self.known_nodes = [self.node] + list(known_nodes)
+        self.announced_hashes = []
+
+    def announce(self, inventory_type: str, inventory_hash: str, data: dict) -> int:
+        self.announced_hashes.append(inventory_hash)
+        return 0
@@ -0,0 +1,47 @@
+import pytest
+
+from blockchain_user.albert import private_key as albert_private_key
+from contract.script import ScriptException, compile_script, execute_script, get_signature_hash, match_p2pkh
+from transaction.transaction import Transaction
+from transaction.transaction_input import TransactionInput
+from transaction.transaction_output import TransactionOutput
+from wallet.owner import Owner
+
+
+def get_signed_transaction() -> (Owner, Transaction):
+    owner = Owner(private_key=albert_private_key)
+    transaction = Transaction([TransactionInput(transaction_hash="abcd1234", output_index=0)],
+                              [TransactionOutput(public_key_hash=owner.public_key_hash, amount=10)])
+    transaction.sign(owner)
+    return owner, transaction
+
+
+def test_given_standard_scripts_when_compiling_then_p2pkh_template_is_matched_with_either_opcode_spelling():
+    owner, transaction = get_signed_transaction()
+    unlocking_instructions = compile_script(transaction.inputs[0].unlocking_script)
+
+    for locking_script in (transaction.outputs[0].locking_script,
+                           f"OP_DUP OP_HASH160 {owner.public_key_hash} OP_EQUALVERIFY OP_CHECKSIG"):
+        signature, public_key, public_key_hash = match_p2pkh(unlocking_instructions, compile_script(locking_script))
+        assert public_key == owner.public_key_hex
+        assert public_key_hash == owner.public_key_hash
+    assert match_p2pkh(unlocking_instructions, compile_script(f"{owner.public_key_hex} OP_CHECKSIG")) is None
+    with pytest.raises(ScriptException):
+        compile_script("OP_RETURN")
+
+
+def test_given_signed_transaction_when_executing_scripts_then_only_the_owner_key_passes():
+    owner, transaction = get_signed_transaction()
+    signature_hash = get_signature_hash(transaction.transaction_data)
+    unlocking_script = transaction.inputs[0].unlocking_script
+    signature = unlocking_script.split(" ")[0]
+
+    execute_script(unlocking_script, transaction.outputs[0].locking_script, signature_hash)
+    execute_script(signature, f"{owner.public_key_hex} OP_CHECKSIG", signature_hash)
+    signature_checks = []
+    execute_script(unlocking_script, transaction.outputs[0].locking_script, signature_hash, signature_checks)
+    assert signature_checks == [(owner.public_key_hex, signature_hash, signature)]
+    with pytest.raises(ScriptException):
+        execute_script(unlocking_script, transaction.outputs[0].locking_script, bytes(32))
+    with pytest.raises(ScriptException):
+        execute_script(unlocking_script, "OP_DUP OP_HASH160 00 OP_EQUAL_VERIFY OP_CHECKSIG", signature_hash)
@@ -0,0 +1,24 @@
+from contract.script_cache import ScriptCache
+
+
+def test_given_full_script_cache_when_adding_an_entry_then_least_recently_used_entry_is_evicted():
+    script_cache = ScriptCache(max_size=2)
+    script_cache.add("tx0", 0, "sig pub", "lock")
+    script_cache.add("tx1", 0, "sig pub", "lock")
+    script_cache.contains("tx0", 0, "sig pub", "lock")
+    script_cache.add("tx2", 0, "sig pub", "lock")
+
+    assert script_cache.contains("tx0", 0, "sig pub", "lock")
+    assert not script_cache.contains("tx1", 0, "sig pub", "lock")
+    assert script_cache.contains("tx2", 0, "sig pub", "lock")
+
+
+def test_given_cached_transaction_when_its_block_is_connected_then_all_its_inputs_are_evicted():
+    script_cache = ScriptCache()
+    script_cache.add("tx0", 0, "sig pub", "lock")
+    script_cache.add("tx0", 1, "sig pub", "lock")
+    script_cache.add("tx1", 0, "sig pub", "lock")
+    script_cache.remove_transactions(["tx0"])
+
+    assert len(script_cache) == 1
+    assert not script_cache.contains("tx0", 1, "sig pub", "lock")
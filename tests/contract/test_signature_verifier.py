@@ -0,0 +1,34 @@
+from blockchain_user.albert import private_key as albert_private_key
+from contract.script import get_signature_hash
+from contract.signature_verifier import PARALLEL_VERIFICATION_THRESHOLD, SignatureVerifier
+from transaction.transaction import Transaction
+from transaction.transaction_input import TransactionInput
+from transaction.transaction_output import TransactionOutput
+from wallet.owner import Owner
+
+
+def get_signature_check() -> tuple:
+    owner = Owner(private_key=albert_private_key)
+    transaction = Transaction([TransactionInput(transaction_hash="abcd1234", output_index=0)],
+                              [TransactionOutput(public_key_hash=owner.public_key_hash, amount=10)])
+    transaction.sign(owner)
+    signature, public_key = transaction.inputs[0].unlocking_script.split(" ")
+    return public_key, get_signature_hash(transaction.transaction_data), signature
+
+
+def test_given_signed_transaction_when_verifying_signature_then_it_is_valid():
+    assert SignatureVerifier().verify([get_signature_check()]) == [True]
+
+
+def test_given_batch_with_invalid_signature_when_verifying_in_parallel_then_first_failure_is_reported():
+    public_key, signature_hash, signature = get_signature_check()
+    signature_checks = [(public_key, signature_hash, signature)] * PARALLEL_VERIFICATION_THRESHOLD
+    signature_checks[3] = (public_key, bytes(32), signature)
+    signature_verifier = SignatureVerifier(max_workers=2)
+    try:
+        results = signature_verifier.verify(signature_checks)
+    finally:
+        signature_verifier.close()
+
+    assert results[:4] == [True, True, True, False]
+    assert False not in results[4:]
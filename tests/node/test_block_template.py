@@ -0,0 +1,45 @@
+from block.utxo_set import UTXOSet
+from node.block_template import BlockTemplate, get_transaction_size
+
+
+def make_transaction(transaction_hash: str, spent_transaction_hash: str, amount: float) -> dict:
+    return {"inputs": [{"transaction_hash": spent_transaction_hash, "output_index": 0, "unlocking_script": "sig pub"}],
+            "outputs": [{"amount": amount, "locking_script": "OP_DUP OP_HASH160 abc OP_EQUAL_VERIFY OP_CHECKSIG"}],
+            "transaction_hash": transaction_hash}
+
+
+UTXO_0, UTXO_1, LOW, HIGH, PARENT, CHILD = "f0", "f1", "01", "02", "03", "04"
+
+
+def make_utxo_set() -> UTXOSet:
+    utxo_set = UTXOSet()
+    for transaction_hash in (UTXO_0, UTXO_1):
+        utxo_set._add((transaction_hash, 0), {"amount": 10, "locking_script": "OP_DUP OP_HASH160 abc"})
+    return utxo_set
+
+
+def test_given_candidates_when_selecting_transactions_then_highest_fee_rate_comes_first():
+    block_template = BlockTemplate(make_utxo_set())
+    block_template.add_transactions([make_transaction(LOW, UTXO_0, 9), make_transaction(HIGH, UTXO_1, 5)])
+    transactions, total_fees = block_template.select_transactions()
+
+    assert [transaction["transaction_hash"] for transaction in transactions] == [HIGH, LOW]
+    assert total_fees == 6
+
+
+def test_given_child_paying_more_than_parent_when_selecting_transactions_then_parent_comes_first():
+    block_template = BlockTemplate(make_utxo_set())
+    block_template.add_transactions([make_transaction(PARENT, UTXO_0, 9.5), make_transaction(CHILD, PARENT, 1)])
+    transactions, total_fees = block_template.select_transactions()
+
+    assert [transaction["transaction_hash"] for transaction in transactions] == [PARENT, CHILD]
+    assert total_fees == 9
+
+
+def test_given_limited_block_size_when_selecting_transactions_then_block_is_not_overfilled():
+    transaction = make_transaction(HIGH, UTXO_1, 5)
+    block_template = BlockTemplate(make_utxo_set(), max_block_size=get_transaction_size(transaction) + 1000)
+    block_template.add_transactions([make_transaction(LOW, UTXO_0, 9), transaction])
+    transactions, _ = block_template.select_transactions()
+
+    assert transactions == [transaction]
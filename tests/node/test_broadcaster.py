@@ -0,0 +1,120 @@
+import threading
+import time
+
+import requests
+
+from conftest import LOCAL_HOSTNAME, FakeNetwork
+from node.broadcaster import BLOCK, MAX_PEER_LABELS, OTHER_PEERS_LABEL, TRANSACTION, Broadcaster, PeerRelay
+
+
+class FakeNode:
+    def __init__(self, hostname: str, is_blocked: bool = False, known_hashes: tuple = (), failing_hashes: tuple = ()):
+        self.hostname = hostname
+        self.failing_hashes = failing_hashes
+        self.unblocked = threading.Event()
+        if not is_blocked:
+            self.unblocked.set()
+        self.known_hashes = set(known_hashes)
+        self.announced = []
+        self.received = []
+
+    def send_inventory(self, hostname: str, inventory: list, timeout: float = None) -> list:
+        self.unblocked.wait()
+        self.announced.extend(item["hash"] for item in inventory)
+        return [item for item in inventory if item["hash"] not in self.known_hashes]
+
+    def post(self, endpoint: str, data: dict, timeout: float = None):
+        if data.get("transaction") in self.failing_hashes:
+            raise requests.exceptions.ConnectionError(self.hostname)
+        self.received.append((endpoint, data))
+
+
+def wait_until_taken(relay: PeerRelay):
+    while not relay.messages.empty():
+        time.sleep(0.001)
+
+
+def test_given_blocked_node_when_announcing_then_its_queue_overflows_without_delaying_other_nodes():
+    fast_node, slow_node = FakeNode("fast"), FakeNode("slow", is_blocked=True)
+    broadcaster = Broadcaster(FakeNetwork([fast_node, slow_node], FakeNode(LOCAL_HOSTNAME)), queue_size=10)
+
+    for index in range(12):
+        broadcaster.announce(TRANSACTION, f"{index:02x}", {"transaction": {}})
+    fast_relay, slow_relay = broadcaster.relays["fast"], broadcaster.relays["slow"]
+    broadcaster.relays = {"fast": fast_relay}
+    broadcaster.stop()
+
+    assert len(fast_node.received) == 12 - fast_relay.number_of_dropped_messages
+    assert slow_relay.number_of_dropped_messages > 0
+    assert not broadcaster.network.node.announced
+    slow_node.unblocked.set()
+    slow_relay.stop()
+    slow_relay.thread.join()
+    assert len(slow_node.received) == 12 - slow_relay.number_of_dropped_messages
+
+
+def test_given_node_knowing_objects_when_announcing_then_only_unknown_bodies_are_sent_once():
+    node = FakeNode("node", known_hashes=("aa",))
+    broadcaster = Broadcaster(FakeNetwork([node], FakeNode(LOCAL_HOSTNAME)))
+    broadcaster.add_known_inventory("node", ["bb"])
+
+    broadcaster.announce(BLOCK, "aa", {"block": "aa"})
+    broadcaster.announce(BLOCK, "bb", {"block": "bb"})
+    broadcaster.announce(TRANSACTION, "cc", {"transaction": "cc"})
+    broadcaster.announce(TRANSACTION, "cc", {"transaction": "cc"})
+    broadcaster.stop()
+
+    assert node.announced == ["aa", "cc"]
+    assert node.received == [("transactions", {"transaction": "cc"})]
+
+
+def test_given_item_requested_from_a_node_when_another_node_announces_it_then_it_is_not_requested_again():
+    broadcaster = Broadcaster(FakeNetwork([]))
+    inventory = [{"type": BLOCK, "hash": "aa"}, {"type": TRANSACTION, "hash": "bb"}, {"type": "other", "hash": "cc"}]
+
+    first_request = broadcaster.select_inventory_to_request(inventory, lambda _, inventory_hash: inventory_hash == "bb")
+    second_request = broadcaster.select_inventory_to_request(inventory, lambda _, inventory_hash: False)
+
+    assert first_request == [{"type": BLOCK, "hash": "aa"}]
+    assert second_request == [{"type": TRANSACTION, "hash": "bb"}]
+
+
+def test_given_body_that_cannot_be_sent_when_relaying_then_the_next_bodies_are_still_sent():
+    node = FakeNode("node", failing_hashes=("aa",))
+    broadcaster = Broadcaster(FakeNetwork([node], FakeNode(LOCAL_HOSTNAME)))
+
+    broadcaster.announce(TRANSACTION, "aa", {"transaction": "aa"})
+    broadcaster.announce(TRANSACTION, "bb", {"transaction": "bb"})
+    relay = broadcaster.relays["node"]
+    broadcaster.stop()
+
+    assert node.received == [("transactions", {"transaction": "bb"})]
+    assert relay.number_of_failed_messages == 1
+
+
+def test_given_full_queue_when_announcing_then_dropped_hash_is_announced_again_later():
+    node = FakeNode("node", is_blocked=True)
+    broadcaster = Broadcaster(FakeNetwork([node], FakeNode(LOCAL_HOSTNAME)), queue_size=1)
+    broadcaster.announce(TRANSACTION, "aa", {"transaction": "aa"})
+    relay = broadcaster.relays["node"]
+    wait_until_taken(relay)
+    broadcaster.announce(TRANSACTION, "bb", {"transaction": "bb"})
+
+    assert broadcaster.announce(TRANSACTION, "cc", {"transaction": "cc"}) == 0
+    node.unblocked.set()
+    wait_until_taken(relay)
+    assert broadcaster.announce(TRANSACTION, "cc", {"transaction": "cc"}) == 1
+    broadcaster.stop()
+    assert [data["transaction"] for _, data in node.received] == ["aa", "bb", "cc"]
+
+
+def test_given_more_peers_than_labels_when_announcing_then_later_peers_share_one_label():
+    nodes = [FakeNode(f"node-{index}") for index in range(MAX_PEER_LABELS + 5)]
+    broadcaster = Broadcaster(FakeNetwork(nodes, FakeNode(LOCAL_HOSTNAME)))
+
+    broadcaster.announce(TRANSACTION, "aa", {"transaction": "aa"})
+    peer_labels = [broadcaster.relays[node.hostname].peer_label for node in nodes]
+    broadcaster.stop()
+
+    assert peer_labels[:MAX_PEER_LABELS] == [node.hostname for node in nodes[:MAX_PEER_LABELS]]
+    assert set(peer_labels[MAX_PEER_LABELS:]) == {OTHER_PEERS_LABEL}
@@ -0,0 +1,92 @@
+import pytest
+import requests
+
+import common.io_blockchain as io_blockchain
+from block.block_header import BlockHeader
+from common.constants import BLOCK_REWARD
+from conftest import FakeNetwork, create_chain_state, mine_block
+from node.chain_sync import ChainSync, ChainSyncException, validate_headers
+
+
+def mine_chain(length: int, blocks: list = (), timestamp: float = 1.0, amount: float = BLOCK_REWARD) -> list:
+    blocks = list(blocks)
+    for _ in range(length):
+        transactions = [{"inputs": [], "outputs": [{"amount": amount, "locking_script": f"OP_DUP {len(blocks)}"}]}]
+        blocks.append(mine_block(transactions, blocks[-1].block_header.hash if blocks else "1111", timestamp))
+    return blocks
+
+
+class FakeNode:
+    def __init__(self, hostname: str, blocks: list = None):
+        self.hostname = hostname
+        self.blocks = blocks
+        self.block_requests = []
+
+    def get_headers(self, from_height: int, timeout: float = None) -> list:
+        if self.blocks is None:
+            raise requests.exceptions.ConnectionError(self.hostname)
+        return [block.block_header.to_dict for block in self.blocks[from_height:]]
+
+    def get_blocks(self, from_height: int, to_height: int, timeout: float = None) -> list:
+        self.block_requests.append((from_height, to_height))
+        return [{"header": block.block_header.to_dict, "transactions": block.transactions}
+                for block in self.blocks[from_height:to_height]]
+
+
+def test_given_headers_not_linked_when_validating_then_exception_is_raised():
+    headers = [block.block_header.to_dict for block in mine_chain(2) + mine_chain(1, timestamp=2.0)]
+
+    with pytest.raises(ChainSyncException):
+        validate_headers(headers)
+
+
+def test_given_unmined_headers_claiming_a_hash_when_validating_then_exception_is_raised():
+    headers = [BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="").to_dict]
+
+    with pytest.raises(ChainSyncException):
+        validate_headers(headers)
+    with pytest.raises(ChainSyncException):
+        validate_headers([dict(headers[0], block_hash="0" * 64)])
+
+
+def test_given_nodes_with_different_chains_when_synchronizing_then_most_work_chain_is_connected(monkeypatch):
+    monkeypatch.setattr("node.chain_sync.BLOCKS_PER_REQUEST", 2)
+    common_blocks = mine_chain(2)
+    chain_state = create_chain_state(mine_chain(1, common_blocks, timestamp=3.0))
+    best_blocks = mine_chain(4, common_blocks, timestamp=2.0)
+    nodes = [FakeNode("a", best_blocks), FakeNode("b", best_blocks), FakeNode("c", mine_chain(5)[:3]),
+             FakeNode("d")]
+
+    assert ChainSync(FakeNetwork(nodes), chain_state).synchronize()
+
+    assert io_blockchain.get_block_hashes_from_memory() == [block.block_header.hash for block in best_blocks]
+    assert chain_state.tip == best_blocks[-1]
+    assert sorted(nodes[0].block_requests + nodes[1].block_requests) == [(2, 4), (4, 6)]
+    assert nodes[2].block_requests == []
+
+
+def test_given_missing_range_when_synchronizing_then_local_chain_is_kept(monkeypatch):
+    monkeypatch.setattr("node.chain_sync.BLOCKS_PER_REQUEST", 2)
+    common_blocks = mine_chain(2)
+    local_blocks = mine_chain(1, common_blocks, timestamp=3.0)
+    chain_state = create_chain_state(local_blocks)
+    best_blocks = mine_chain(4, common_blocks, timestamp=2.0)
+    node = FakeNode("a", best_blocks)
+    node.get_blocks = lambda from_height, to_height, timeout=None: [] if from_height == 4 else \
+        FakeNode.get_blocks(node, from_height, to_height)
+
+    assert not ChainSync(FakeNetwork([node]), chain_state).synchronize()
+
+    assert io_blockchain.get_block_hashes_from_memory() == [block.block_header.hash for block in local_blocks]
+
+
+def test_given_chain_with_invalid_transactions_when_synchronizing_then_local_chain_is_kept():
+    common_blocks = mine_chain(2)
+    local_blocks = mine_chain(1, common_blocks, timestamp=3.0)
+    chain_state = create_chain_state(local_blocks)
+    invalid_blocks = mine_chain(3, common_blocks, timestamp=2.0, amount=1000)
+
+    assert not ChainSync(FakeNetwork([FakeNode("a", invalid_blocks)]), chain_state).synchronize()
+
+    assert chain_state.tip == local_blocks[-1]
+    assert io_blockchain.get_block_hashes_from_memory() == [block.block_header.hash for block in local_blocks]
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from node.chain_writer import ChainWriter
+
+
+def test_given_concurrent_submissions_when_running_then_changes_run_one_at_a_time_in_order():
+    running = []
+    calls = []
+    lock = threading.Lock()
+
+    def change(value: int) -> int:
+        with lock:
+            running.append(value)
+            assert len(running) == 1
+        time.sleep(0.01)
+        calls.append(value)
+        with lock:
+            running.remove(value)
+        if value == 3:
+            raise ValueError(value)
+        return value * 2
+
+    async def submit_all():
+        chain_writer = ChainWriter()
+        chain_writer.start()
+        try:
+            return await asyncio.gather(*[chain_writer.submit(change, value) for value in range(5)],
+                                        return_exceptions=True)
+        finally:
+            await chain_writer.stop()
+
+    results = asyncio.run(submit_all())
+
+    assert calls == [0, 1, 2, 3, 4]
+    assert results[:3] == [0, 2, 4] and results[4] == 8
+    with pytest.raises(ValueError):
+        raise results[3]
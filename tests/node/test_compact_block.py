@@ -0,0 +1,77 @@
+import pytest
+
+from block.block_header import BlockHeader
+from common.serialization import get_transaction_id
+from node.compact_block import CompactBlockException, CompactBlockReceiver, create_compact_block
+from node.merkle_tree import get_merkle_root
+
+
+def make_transaction(amount: float, spent_transaction_hash: str = None) -> dict:
+    inputs = [{"transaction_hash": spent_transaction_hash, "output_index": 0, "unlocking_script": "sig pub"}] \
+        if spent_transaction_hash else []
+    transaction = {"inputs": inputs, "outputs": [{"amount": amount, "locking_script": "OP_DUP"}]}
+    transaction["transaction_hash"] = get_transaction_id(transaction)
+    return transaction
+
+
+def make_block_content(transactions: list) -> (dict, str):
+    block_header = BlockHeader(previous_block_hash="ab" * 32, timestamp=1.0, nonce=0,
+                               merkle_root=get_merkle_root(transactions))
+    return {"header": block_header.to_dict, "transactions": transactions}, block_header.hash
+
+
+def test_given_transactions_in_mem_pool_when_receiving_compact_block_then_only_missing_ones_are_requested():
+    transactions = [make_transaction(index, f"{index:02x}") for index in range(4)] + [make_transaction(6.25)]
+    block_content, block_hash = make_block_content(transactions)
+    compact_block = create_compact_block(block_content, block_hash)
+    receiver = CompactBlockReceiver()
+
+    rebuilt_block_content, missing_indexes = receiver.receive(compact_block, [transactions[0], transactions[2]])
+    assert rebuilt_block_content is None
+    assert missing_indexes == [1, 3]
+
+    rebuilt_block_content, missing_indexes = receiver.receive_transactions(
+        block_hash, [{"index": index, "transaction": transactions[index]} for index in missing_indexes])
+    assert rebuilt_block_content == block_content
+    assert missing_indexes == []
+
+
+def test_given_mem_pool_transaction_with_colliding_short_id_when_receiving_compact_block_then_it_is_requested():
+    transactions = [make_transaction(1, "01"), make_transaction(6.25)]
+    block_content, block_hash = make_block_content(transactions)
+    compact_block = create_compact_block(block_content, block_hash)
+    other_transaction = make_transaction(2, "02")
+    compact_block["short_ids"][0] = create_compact_block({"transactions": [other_transaction], "header": {}},
+                                                         block_hash)["short_ids"][0]
+
+    rebuilt_block_content, missing_indexes = CompactBlockReceiver().receive(compact_block, [other_transaction])
+
+    assert rebuilt_block_content is None
+    assert missing_indexes == [0]
+
+
+def test_given_malformed_block_transactions_when_receiving_them_then_valid_ones_are_used_and_block_stays_pending():
+    transactions = [make_transaction(index, f"{index:02x}") for index in range(2)] + [make_transaction(6.25)]
+    block_content, block_hash = make_block_content(transactions)
+    receiver = CompactBlockReceiver()
+    receiver.receive(create_compact_block(block_content, block_hash), [])
+
+    rebuilt_block_content, missing_indexes = receiver.receive_transactions(
+        block_hash, [{"index": 0, "transaction": transactions[0]}, {"index": "1"}, {"index": 7, "transaction": {}}])
+    assert rebuilt_block_content is None
+    assert missing_indexes == [1]
+
+    rebuilt_block_content, missing_indexes = receiver.receive_transactions(
+        block_hash, [{"index": 1, "transaction": transactions[1]}])
+    assert rebuilt_block_content == block_content
+    assert block_hash not in receiver.pending_blocks
+
+
+def test_given_compact_block_announcing_another_hash_when_receiving_it_then_exception_is_raised():
+    transactions = [make_transaction(6.25)]
+    block_content, block_hash = make_block_content(transactions)
+    compact_block = create_compact_block(block_content, block_hash)
+    compact_block["block_hash"] = "cd" * 32
+
+    with pytest.raises(CompactBlockException):
+        CompactBlockReceiver().receive(compact_block, [])
@@ -0,0 +1,61 @@
+import pytest
+
+import common.io_mem_pool as io_mem_pool
+from node.mem_pool import MemPool
+from transaction.transaction_exception import TransactionException
+
+
+@pytest.fixture(autouse=True)
+def mem_pool_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(io_mem_pool, "FILENAME", str(tmp_path / "mem_pool"))
+    monkeypatch.setattr(io_mem_pool, "JOURNAL_FILENAME", str(tmp_path / "mem_pool.journal"))
+
+
+def make_transaction(transaction_hash: str, spent_transaction_hash: str, output_index: int = 0) -> dict:
+    return {"inputs": [{"transaction_hash": spent_transaction_hash, "output_index": output_index,
+                        "unlocking_script": "sig pub"}],
+            "outputs": [{"amount": 1, "locking_script": "OP_DUP OP_HASH160 abc OP_EQUAL_VERIFY OP_CHECKSIG"}],
+            "transaction_hash": transaction_hash}
+
+
+def test_given_mem_pool_transaction_when_adding_a_double_spend_then_it_is_rejected():
+    mem_pool = MemPool()
+    mem_pool.add(make_transaction("tx1", "tx0"))
+
+    with pytest.raises(TransactionException):
+        mem_pool.add(make_transaction("tx2", "tx0"))
+    assert "tx1" in mem_pool
+    assert "tx2" not in mem_pool
+
+
+def test_given_connected_block_when_removing_its_transactions_then_conflicting_ones_are_removed_too():
+    mem_pool = MemPool()
+    mem_pool.add(make_transaction("tx1", "tx0"))
+    mem_pool.add(make_transaction("tx2", "tx0", output_index=1))
+    mem_pool.remove_transactions([make_transaction("tx3", "tx0")])
+
+    assert [transaction["transaction_hash"] for transaction in mem_pool.transactions] == ["tx2"]
+    assert mem_pool.get_spending_transaction_hash("tx0", 0) is None
+
+
+def test_given_block_transaction_with_several_inputs_when_removing_it_then_every_conflict_and_descendant_is_removed():
+    mem_pool = MemPool()
+    mem_pool.add(make_transaction("tx1", "tx0"))
+    mem_pool.add(make_transaction("tx2", "tx0", output_index=1))
+    mem_pool.add(make_transaction("tx4", "tx2"))
+    mem_pool.add(make_transaction("tx5", "tx4"))
+    mem_pool.add(make_transaction("tx6", "tx0", output_index=2))
+    block_transaction = make_transaction("tx3", "tx0")
+    block_transaction["inputs"].append({"transaction_hash": "tx0", "output_index": 1, "unlocking_script": "sig pub"})
+    mem_pool.remove_transactions([block_transaction])
+
+    assert [transaction["transaction_hash"] for transaction in mem_pool.transactions] == ["tx6"]
+
+
+def test_given_journaled_mem_pool_when_reloading_it_then_same_transactions_are_restored():
+    mem_pool = MemPool()
+    mem_pool.add(make_transaction("tx1", "tx0"))
+    mem_pool.add(make_transaction("tx2", "tx0", output_index=1))
+    mem_pool.remove_transactions([make_transaction("tx1", "tx0")])
+
+    assert MemPool().transactions == mem_pool.transactions
@@ -1,34 +1,29 @@
-from node.merkle_tree import build_merkle_tree, calculate_hash
+import hashlib
 
+from common.serialization import encode_transaction, get_transaction_id
+from node.merkle_tree import MerkleTree, get_merkle_proof, get_merkle_root, verify_merkle_proof
 
-def test_given_2_leaves_when_build_merkle_tree_then_all_leaves_hashes_are_computed_correctly():
-    l1 = "blabla data 0"
-    l2 = "blabla data 1"
-    merkle_tree = build_merkle_tree([l1, l2])
 
-    assert merkle_tree.left_child.value == calculate_hash(l1)
-    assert merkle_tree.right_child.value == calculate_hash(l2)
+def h(data) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).digest()
 
 
-def test_given_2_leaves_when_build_merkle_tree_then_root_hash_is_computed_correctly():
+def test_given_2_leaves_when_build_merkle_tree_then_all_leaves_hashes_are_computed_correctly():
     l1 = "blabla data 0"
     l2 = "blabla data 1"
-    merkle_tree = build_merkle_tree([l1, l2])
+    merkle_tree = MerkleTree([l1, l2])
 
-    assert merkle_tree.value == calculate_hash(calculate_hash(l1) + calculate_hash(l2))
+    assert merkle_tree.levels[0] == [h(l1), h(l2)]
 
 
-def test_given_4_leaves_when_build_merkle_tree_then_all_leaves_hashes_are_computed_correctly():
+def test_given_2_leaves_when_build_merkle_tree_then_root_hash_is_computed_correctly():
     l1 = "blabla data 0"
     l2 = "blabla data 1"
-    l3 = "blabla data 2"
-    l4 = "blabla data 3"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4])
+    merkle_tree = MerkleTree([l1, l2])
 
-    assert merkle_tree.left_child.left_child.value == calculate_hash(l1)
-    assert merkle_tree.left_child.right_child.value == calculate_hash(l2)
-    assert merkle_tree.right_child.left_child.value == calculate_hash(l3)
-    assert merkle_tree.right_child.right_child.value == calculate_hash(l4)
+    assert merkle_tree.root == h(h(l1) + h(l2))
 
 
 def test_given_4_leaves_when_build_merkle_tree_then_middle_childs_are_computed_correctly():
@@ -36,10 +31,9 @@ def test_given_4_leaves_when_build_merkle_tree_then_middle_childs_are_computed_c
     l2 = "blabla data 1"
     l3 = "blabla data 2"
     l4 = "blabla data 3"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4])
+    merkle_tree = MerkleTree([l1, l2, l3, l4])
 
-    assert merkle_tree.left_child.value == calculate_hash(calculate_hash(l1)+calculate_hash(l2))
-    assert merkle_tree.right_child.value == calculate_hash(calculate_hash(l3)+calculate_hash(l4))
+    assert merkle_tree.levels[1] == [h(h(l1) + h(l2)), h(h(l3) + h(l4))]
 
 
 def test_given_4_leaves_when_build_merkle_tree_then_root_is_computed_correctly():
@@ -47,66 +41,57 @@ def test_given_4_leaves_when_build_merkle_tree_then_root_is_computed_correctly()
     l2 = "blabla data 1"
     l3 = "blabla data 2"
     l4 = "blabla data 3"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4])
+    merkle_tree = MerkleTree([l1, l2, l3, l4])
 
-    assert merkle_tree.value == calculate_hash(calculate_hash(calculate_hash(l1)+calculate_hash(l2))+calculate_hash(calculate_hash(l3)+calculate_hash(l4)))
+    assert merkle_tree.root == h(h(h(l1) + h(l2)) + h(h(l3) + h(l4)))
 
 
-def test_given_6_leaves_when_build_merkle_tree_then_all_leaves_hashes_are_computed_correctly():
+def test_given_5_leaves_when_build_merkle_tree_then_last_node_of_odd_levels_is_paired_with_itself():
     l1 = "blabla data 0"
     l2 = "blabla data 1"
     l3 = "blabla data 2"
     l4 = "blabla data 3"
     l5 = "blabla data 4"
-    l6 = "blabla data 5"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4, l5, l6])
+    merkle_tree = MerkleTree([l1, l2, l3, l4, l5])
 
-    assert merkle_tree.left_child.left_child.left_child.value == calculate_hash(l1)
-    assert merkle_tree.left_child.left_child.right_child.value == calculate_hash(l2)
-    assert merkle_tree.left_child.right_child.left_child.value == calculate_hash(l3)
-    assert merkle_tree.left_child.right_child.right_child.value == calculate_hash(l4)
-    assert merkle_tree.right_child.left_child.left_child.value == calculate_hash(l5)
-    assert merkle_tree.right_child.left_child.right_child.value == calculate_hash(l6)
-    assert merkle_tree.right_child.right_child.left_child.value == calculate_hash(l5)
-    assert merkle_tree.right_child.right_child.right_child.value == calculate_hash(l6)
+    left = h(h(h(l1) + h(l2)) + h(h(l3) + h(l4)))
+    right = h(h(h(l5) + h(l5)) + h(h(l5) + h(l5)))
+    assert merkle_tree.root == h(left + right)
 
 
 def test_given_6_leaves_when_build_merkle_tree_then_root_is_computed_correctly():
-    l1 = "blabla data 0"
-    l2 = "blabla data 1"
-    l3 = "blabla data 2"
-    l4 = "blabla data 3"
-    l5 = "blabla data 4"
-    l6 = "blabla data 5"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4, l5, l6])
+    leaves = [f"blabla data {i}" for i in range(6)]
+    merkle_tree = MerkleTree(leaves)
 
-    assert merkle_tree.value == calculate_hash(calculate_hash(calculate_hash(calculate_hash(l1)+calculate_hash(l2))+calculate_hash(calculate_hash(l3)+calculate_hash(l4))) + calculate_hash(calculate_hash(calculate_hash(l5)+calculate_hash(l6))+calculate_hash(calculate_hash(l5)+calculate_hash(l6))))
+    left = h(h(h(leaves[0]) + h(leaves[1])) + h(h(leaves[2]) + h(leaves[3])))
+    right_child = h(h(leaves[4]) + h(leaves[5]))
+    assert merkle_tree.root == h(left + h(right_child + right_child))
 
 
-def test_given_5_leaves_when_build_merkle_tree_then_all_leaves_hashes_are_computed_correctly():
-    l1 = "blabla data 0"
-    l2 = "blabla data 1"
-    l3 = "blabla data 2"
-    l4 = "blabla data 3"
-    l5 = "blabla data 4"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4, l5])
+def test_given_built_tree_when_appending_leaves_then_it_matches_a_tree_built_at_once():
+    leaves = [f"blabla data {i}" for i in range(7)]
+    merkle_tree = MerkleTree(leaves[:1])
+    for leaf in leaves[1:]:
+        merkle_tree.append(leaf)
 
-    assert merkle_tree.left_child.left_child.left_child.value == calculate_hash(l1)
-    assert merkle_tree.left_child.left_child.right_child.value == calculate_hash(l2)
-    assert merkle_tree.left_child.right_child.left_child.value == calculate_hash(l3)
-    assert merkle_tree.left_child.right_child.right_child.value == calculate_hash(l4)
-    assert merkle_tree.right_child.left_child.left_child.value == calculate_hash(l5)
-    assert merkle_tree.right_child.left_child.right_child.value == calculate_hash(l5)
-    assert merkle_tree.right_child.right_child.left_child.value == calculate_hash(l5)
-    assert merkle_tree.right_child.right_child.right_child.value == calculate_hash(l5)
+    assert merkle_tree.levels == MerkleTree(leaves).levels
 
 
-def test_given_5_leaves_when_build_merkle_tree_then_root_is_computed_correctly():
-    l1 = "blabla data 0"
-    l2 = "blabla data 1"
-    l3 = "blabla data 2"
-    l4 = "blabla data 3"
-    l5 = "blabla data 4"
-    merkle_tree = build_merkle_tree([l1, l2, l3, l4, l5])
+def test_given_tree_when_getting_inclusion_proof_of_each_leaf_then_it_verifies_against_the_root():
+    leaves = [f"blabla data {i}" for i in range(5)]
+    merkle_tree = MerkleTree(leaves)
+
+    for leaf_index, leaf in enumerate(leaves):
+        proof = merkle_tree.get_proof(leaf_index)
+        assert len(proof) == 3
+        assert verify_merkle_proof(leaf, proof, merkle_tree.root.hex())
+        assert not verify_merkle_proof("other data", proof, merkle_tree.root.hex())
+
+
+def test_given_transactions_when_getting_proof_by_transaction_hash_then_it_verifies_against_merkle_root():
+    transactions = [{"inputs": [], "outputs": [{"amount": i, "locking_script": "OP_DUP"}]} for i in range(3)]
+    for transaction in transactions:
+        transaction["transaction_hash"] = get_transaction_id(transaction)
+    proof = get_merkle_proof(transactions, transactions[1]["transaction_hash"])
 
-    assert merkle_tree.value == calculate_hash(calculate_hash(calculate_hash(calculate_hash(l1)+calculate_hash(l2))+calculate_hash(calculate_hash(l3)+calculate_hash(l4))) + calculate_hash(calculate_hash(calculate_hash(l5)+calculate_hash(l5))+calculate_hash(calculate_hash(l5)+calculate_hash(l5))))
\ No newline at end of file
+    assert verify_merkle_proof(encode_transaction(transactions[1]), proof, get_merkle_root(transactions))
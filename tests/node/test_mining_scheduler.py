@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from common.constants import BLOCK_REWARD
+from conftest import FakeNetwork, create_chain_state, mine_block
+from node.chain_writer import ChainWriter
+from node.mining_scheduler import MiningScheduler
+from node.proof_of_work import ProofOfWork
+
+
+class FakeMiner:
+    def __init__(self):
+        self.number_of_cancels = 0
+
+    def cancel(self):
+        self.number_of_cancels = self.number_of_cancels + 1
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_given_running_search_when_tip_changes_then_search_is_cancelled_and_template_is_stale():
+    chain_state = create_chain_state()
+    miner = FakeMiner()
+    mining_scheduler = MiningScheduler(chain_state, FakeNetwork(), miner)
+    mining_scheduler.template_is_stale = False
+    coinbase = ProofOfWork.get_coinbase_transaction(0, chain_state.height)
+
+    chain_state.add_block(mine_block([coinbase], chain_state.tip.block_header.hash, 2.0))
+
+    assert miner.number_of_cancels == 1
+    assert mining_scheduler.template_is_stale
+
+
+def test_given_stale_or_invalid_mined_block_when_submitting_then_it_is_discarded():
+    chain_state = create_chain_state()
+    network = FakeNetwork()
+    mining_scheduler = MiningScheduler(chain_state, network, FakeMiner())
+    parent_hash = chain_state.tip.block_header.hash
+    block = mine_block([ProofOfWork.get_coinbase_transaction(0, chain_state.height)], parent_hash, 2.0)
+    greedy_block = mine_block([ProofOfWork.get_coinbase_transaction(BLOCK_REWARD, chain_state.height)], parent_hash,
+                              3.0)
+
+    mining_scheduler.submit(greedy_block)
+    mining_scheduler.submit(block)
+    mining_scheduler.submit(block)
+
+    assert chain_state.tip == block
+    assert chain_state.height == 2
+    assert not chain_state.has_block(greedy_block.block_header.hash)
+    assert network.announced_hashes == [block.block_header.hash]
+
+
+def test_given_chain_writer_when_submitting_mined_block_then_it_is_added_by_the_writer():
+    chain_state = create_chain_state()
+    chain_writer = ChainWriter()
+    mining_scheduler = MiningScheduler(chain_state, FakeNetwork(), FakeMiner(), chain_writer)
+    block = mine_block([ProofOfWork.get_coinbase_transaction(0, chain_state.height)], chain_state.tip.block_header.hash,
+                       2.0)
+    adding_threads = []
+    chain_state.add_tip_listener(lambda tip: adding_threads.append(threading.current_thread().name))
+
+    async def submit():
+        chain_writer.start()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, mining_scheduler.submit, block)
+        finally:
+            await chain_writer.stop()
+
+    asyncio.run(submit())
+
+    assert chain_state.tip == block
+    assert len(adding_threads) == 1 and adding_threads[0].startswith("chain-writer")
@@ -0,0 +1,29 @@
+import pytest
+
+from contract.script_cache import ScriptCache
+from conftest import FakeNetwork, GENESIS_COINBASE_HASH, albert, bertrand, camille, create_chain_state, \
+    create_transaction
+from node.node_transaction import NodeTransaction
+from transaction.transaction_exception import TransactionException
+
+
+def test_given_cached_transaction_when_validating_a_copy_with_other_outputs_then_cache_is_not_used():
+    chain_state = create_chain_state()
+    script_cache = ScriptCache()
+    transaction = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    forged_transaction = create_transaction(albert, GENESIS_COINBASE_HASH, camille)
+    forged_transaction["inputs"] = transaction["inputs"]
+
+    def validate(transaction_data: dict):
+        node_transaction = NodeTransaction(chain_state.tip, FakeNetwork(), chain_state.utxo_set, chain_state.mem_pool,
+                                           script_cache)
+        node_transaction.receive(transaction_data)
+        node_transaction.validate()
+
+    validate(transaction)
+    assert len(script_cache) == 1
+    with pytest.raises(TransactionException):
+        validate(dict(forged_transaction, transaction_hash=transaction["transaction_hash"]))
+    with pytest.raises(TransactionException):
+        validate({"inputs": forged_transaction["inputs"], "outputs": forged_transaction["outputs"]})
+    assert len(script_cache) == 1
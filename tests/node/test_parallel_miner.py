@@ -0,0 +1,24 @@
+import threading
+
+from block.block_header import BlockHeader
+from common.constants import NUMBER_OF_LEADING_ZEROS
+from node import parallel_miner
+from node.parallel_miner import ParallelMiner
+
+
+def test_given_block_header_when_mining_in_parallel_then_nonce_gives_hash_with_leading_zeros():
+    block_header = BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="abcd")
+    with ParallelMiner(number_of_workers=2) as miner:
+        block_header.nonce = miner.get_nonce(block_header)
+
+    assert block_header.get_hash().startswith("0" * NUMBER_OF_LEADING_ZEROS)
+    assert set(miner.hash_rates) == {0, 1}
+
+
+def test_given_unreachable_difficulty_when_miner_is_cancelled_then_no_nonce_is_returned(monkeypatch):
+    monkeypatch.setattr(parallel_miner, "NUMBER_OF_LEADING_ZEROS", 64)
+    block_header = BlockHeader(previous_block_hash="1111", timestamp=1.0, nonce=0, merkle_root="abcd")
+    with ParallelMiner(number_of_workers=2) as miner:
+        threading.Timer(0.5, miner.cancel).start()
+        assert miner.get_nonce(block_header) is None
+    assert miner.pool is None
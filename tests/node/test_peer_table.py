@@ -0,0 +1,32 @@
+import json
+
+from node.peer_table import MAX_PEER_FAILURES, PeerTable
+
+
+def test_given_peers_with_latencies_and_failures_when_getting_hostnames_then_fastest_reachable_peers_come_first(
+        tmp_path):
+    peer_table = PeerTable(str(tmp_path / "known_nodes.json"))
+    for hostname in ("slow", "fast", "down", "fast"):
+        peer_table.add(hostname)
+    peer_table.record_success("slow", 0.5)
+    peer_table.record_success("fast", 0.01)
+    for _ in range(MAX_PEER_FAILURES):
+        peer_table.record_failure("down")
+
+    assert len(peer_table) == 3
+    assert peer_table.get_hostnames() == ["fast", "slow"]
+    assert peer_table.get_hostnames(include_unreachable=True)[-1] == "down"
+
+
+def test_given_changed_peer_table_when_flushing_then_it_is_reloaded_from_the_known_nodes_file(tmp_path):
+    filename = tmp_path / "known_nodes.json"
+    filename.write_text(json.dumps([{"hostname": "127.0.0.1:5000"}]))
+    peer_table = PeerTable(str(filename))
+    peer_table.add("127.0.0.1:5001")
+    peer_table.record_success("127.0.0.1:5001", 0.1)
+    peer_table.flush()
+
+    reloaded_peer_table = PeerTable(str(filename))
+
+    assert reloaded_peer_table.to_dict == peer_table.to_dict
+    assert not peer_table.is_dirty
@@ -0,0 +1,11 @@
+from node.rolling_filter import RollingFilter
+
+
+def test_given_more_items_than_capacity_when_looking_up_then_recent_items_are_found_and_old_ones_forgotten():
+    rolling_filter = RollingFilter(capacity=100)
+    for index in range(300):
+        rolling_filter.add(f"item {index}")
+
+    assert all(f"item {index}" in rolling_filter for index in range(250, 300))
+    assert sum(f"item {index}" in rolling_filter for index in range(100)) < 5
+    assert sum(f"other {index}" in rolling_filter for index in range(1000)) < 5
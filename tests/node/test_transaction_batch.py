@@ -0,0 +1,78 @@
+from block.blockchain import Blockchain
+from common.serialization import get_transaction_id
+from conftest import GENESIS_COINBASE_HASH, FakeNetwork, albert, bertrand, camille, create_chain_state, \
+    create_transaction, mine_block
+from contract.script_cache import script_cache
+from node.block_template import BlockTemplate
+from node.node_service import NodeService
+from node.proof_of_work import ProofOfWork
+from node.transaction_batch import ACCEPTED, REJECTED, TransactionBatch
+from transaction.transaction_output import TransactionOutput
+
+
+def test_given_batch_with_dependent_and_conflicting_transactions_when_submitting_then_results_are_per_transaction():
+    chain_state = create_chain_state()
+    network = FakeNetwork()
+    transaction_1 = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    transaction_2 = create_transaction(bertrand, transaction_1["transaction_hash"], camille)
+    double_spend = create_transaction(albert, GENESIS_COINBASE_HASH, camille)
+
+    results = TransactionBatch(chain_state, network).submit([transaction_1, transaction_2, double_spend,
+                                                             transaction_1])
+
+    assert [result["status"] for result in results] == [ACCEPTED, ACCEPTED, REJECTED, REJECTED]
+    assert results[3]["error"] == "Transaction is already in the batch"
+    assert [transaction["transaction_hash"] for transaction in chain_state.mem_pool.transactions] == \
+        [transaction_1["transaction_hash"], transaction_2["transaction_hash"]]
+    assert network.announced_hashes == [transaction_1["transaction_hash"], transaction_2["transaction_hash"]]
+
+
+def test_given_transaction_with_invalid_signature_when_submitting_then_it_and_its_dependents_are_rejected():
+    chain_state = create_chain_state()
+    forged_transaction = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    forged_transaction["outputs"][0]["locking_script"] = \
+        TransactionOutput(public_key_hash=camille.public_key_hash, amount=40).locking_script
+    forged_transaction["transaction_hash"] = get_transaction_id(forged_transaction)
+    dependent_transaction = create_transaction(camille, forged_transaction["transaction_hash"], bertrand)
+
+    results = TransactionBatch(chain_state, FakeNetwork()).submit([forged_transaction, dependent_transaction])
+
+    assert results[0] == {"transaction_hash": forged_transaction["transaction_hash"], "status": REJECTED,
+                          "error": "Transaction signature validation failed"}
+    assert results[1]["status"] == REJECTED
+    assert len(chain_state.mem_pool) == 0
+
+
+def test_given_child_of_mem_pool_transaction_when_mining_the_template_then_block_is_valid():
+    chain_state = create_chain_state()
+    network = FakeNetwork()
+    parent = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    child = create_transaction(bertrand, parent["transaction_hash"], camille)
+    TransactionBatch(chain_state, network).submit([parent])
+    NodeService(chain_state, network).receive_transaction(child)
+    block_template = BlockTemplate(chain_state.utxo_set)
+    block_template.add_transactions(chain_state.mem_pool.transactions)
+    transactions, _ = block_template.select_transactions()
+    transactions.append(ProofOfWork.get_coinbase_transaction(0, chain_state.height))
+    block = mine_block(transactions, chain_state.tip.block_header.hash, 2.0)
+    blockchain = Blockchain(chain_state, network)
+    blockchain.receive({"header": block.block_header.to_dict, "transactions": transactions})
+    blockchain.validate()
+    blockchain.add()
+
+    assert [transaction["transaction_hash"] for transaction in transactions[:2]] == \
+        [parent["transaction_hash"], child["transaction_hash"]]
+    assert chain_state.height == 2
+    assert len(chain_state.mem_pool) == 0
+
+
+def test_given_accepted_transaction_when_submitting_then_its_verified_input_is_in_the_script_cache():
+    chain_state = create_chain_state()
+    transaction = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+    locking_script = chain_state.utxo_set.get_locking_script(GENESIS_COINBASE_HASH, 0)
+
+    results = TransactionBatch(chain_state, FakeNetwork()).submit([transaction])
+
+    assert results[0]["status"] == ACCEPTED
+    assert script_cache.contains(transaction["transaction_hash"], 0, transaction["inputs"][0]["unlocking_script"],
+                                 locking_script)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from async_main import create_app
+from conftest import FakeNetwork, GENESIS_COINBASE_HASH, albert, bertrand, camille, create_chain_state, \
+    create_transaction, mine_block
+from node.node_service import NodeService
+from node.proof_of_work import ProofOfWork
+from node.transaction_batch import ACCEPTED, REJECTED
+
+
+def run_requests(chain_state, send_requests):
+    """
+    Runs send_requests(client) against the asyncio server of a node holding chain_state and returns its result.
+    """
+    async def run():
+        async with TestClient(TestServer(create_app(NodeService(chain_state, FakeNetwork())))) as client:
+            return await send_requests(client)
+
+    return asyncio.run(run())
+
+
+def test_given_valid_and_malformed_transactions_when_posting_them_then_only_valid_one_is_accepted():
+    chain_state = create_chain_state()
+    transaction = create_transaction(albert, GENESIS_COINBASE_HASH, bertrand)
+
+    async def send_requests(client):
+        response = await client.post("/transactions", json={"transaction": transaction})
+        malformed_response = await client.post("/transactions", json={"transaction": {"inputs": 1}})
+        return response.status, malformed_response.status
+
+    assert run_requests(chain_state, send_requests) == (200, 400)
+    assert transaction["transaction_hash"] in chain_state.mem_pool
+
+
+def test_given_batch_with_double_spend_when_posting_it_then_results_are_per_transaction():
+    chain_state = create_chain_state()
+    transactions = [create_transaction(albert, GENESIS_COINBASE_HASH, bertrand),
+                    create_transaction(albert, GENESIS_COINBASE_HASH, camille)]
+
+    async def send_requests(client):
+        response = await client.post("/transactions/batch", json={"transactions": transactions})
+        return response.status, await response.json()
+
+    status, content = run_requests(chain_state, send_requests)
+
+    assert status == 200
+    assert [result["status"] for result in content["results"]] == [ACCEPTED, REJECTED]
+
+
+def test_given_valid_and_malformed_blocks_when_posting_them_then_only_valid_one_is_added():
+    chain_state = create_chain_state()
+    block = mine_block([ProofOfWork.get_coinbase_transaction(0, chain_state.height)],
+                       chain_state.tip.block_header.hash, 2.0)
+
+    async def send_requests(client):
+        statuses = []
+        for block_content in ({"header": {}, "transactions": []}, {"header": block.block_header.to_dict},
+                              {"header": block.block_header.to_dict, "transactions": block.transactions}):
+            response = await client.post("/block", json={"block": block_content})
+            statuses.append(response.status)
+        return statuses
+
+    assert run_requests(chain_state, send_requests) == [400, 400, 200]
+    assert chain_state.tip.block_header.hash == block.block_header.hash
+
+
+def test_given_chain_when_getting_blocks_then_they_are_streamed_in_requested_format():
+    chain_state = create_chain_state()
+    chain_state.add_block(mine_block([ProofOfWork.get_coinbase_transaction(0, chain_state.height)],
+                                     chain_state.tip.block_header.hash, 2.0))
+
+    async def send_requests(client):
+        response = await client.get("/block")
+        ndjson_response = await client.get("/block", params={"format": "ndjson", "from_height": 1})
+        unknown_format_response = await client.get("/block", params={"format": "xml"})
+        return await response.json(), await ndjson_response.text(), unknown_format_response.status
+
+    blocks, ndjson_blocks, unknown_format_status = run_requests(chain_state, send_requests)
+
+    assert [block["header"] for block in blocks] == \
+        [block.block_header.to_dict for block in reversed(chain_state.blocks)]
+    assert [json.loads(line)["header"] for line in ndjson_blocks.splitlines()] == \
+        [chain_state.blocks[1].block_header.to_dict]
+    assert unknown_format_status == 400
@@ -0,0 +1,15 @@
+from blockchain_user import miner
+from wallet.keystore import get_public_key_hash, get_public_key_hex, import_private_key
+from wallet.owner import Owner
+
+
+def test_given_known_private_key_when_deriving_owner_keys_then_they_match_and_key_is_imported_once():
+    import_private_key.cache_clear()
+    get_public_key_hex.cache_clear()
+    get_public_key_hash.cache_clear()
+    owners = [Owner(private_key=miner.private_key) for _ in range(3)]
+
+    assert import_private_key.cache_info().currsize == 0
+    assert [owner.public_key_hash for owner in owners] == [miner.public_key_hash] * 3
+    assert owners[0].public_key_hex == miner.public_key_hex
+    assert import_private_key.cache_info().misses == 1